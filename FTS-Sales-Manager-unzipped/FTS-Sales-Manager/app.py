@@ -82,6 +82,7 @@ if tk._default_root:
 from core.config_manager import ConfigManager
 from core.db_manager import DatabaseManager
 from core.airtable_manager import AirtableManager, AirtableModel
+from core.dropdown_store import DropdownStore
 from core.user_manager import UserManager
 from core.logger import logger
 from controllers.app_controller import AppController
@@ -133,7 +134,14 @@ def main() -> None:
     config_mgr = ConfigManager(config_path=os.path.join("config", "settings.yaml"))
 
     # 3. تهيئة DatabaseManager (SQLite للكاش المحلي)
-    db_mgr = DatabaseManager(db_path="fts_sales_cache.db")
+    cache_settings = config_mgr.get_cache_settings()
+    db_mgr = DatabaseManager(
+        db_path="fts_sales_cache.db",
+        compress=cache_settings.get("compress_payloads", True),
+        use_dictionary=cache_settings.get("compression_dictionary", True),
+        commit_interval_ms=cache_settings.get("writer_commit_interval_ms", 5),
+        max_batch_size=cache_settings.get("writer_batch_size", 500)
+    )
 
     # 4. تهيئة AirtableModel للمستخدمين
     users_table = config_mgr.get("airtable_users_table", "Users")
@@ -148,11 +156,17 @@ def main() -> None:
     airtable_booking = AirtableModel(
         config_manager=config_mgr,
         db_manager=db_mgr,
-        table_name=booking_table
+        table_name=booking_table,
+        persist_snapshot=True
     )
 
-    # 6. تهيئة UserManager (يستخدم airtable_users فقط)
-    user_mgr = UserManager(airtable_model=airtable_users, db_manager=db_mgr)
+    # 6. تهيئة UserManager (يستخدم airtable_users فقط، مع نسخة مشتركة بين نسخ التطبيق)
+    user_mgr = UserManager(
+        airtable_model=airtable_users,
+        db_manager=db_mgr,
+        shared_store=DropdownStore.for_config(config_mgr),
+        shared_ttl_minutes=cache_settings.get("shared_users_ttl_minutes", 10)
+    )
 
     # 7. تشغيل AppController مع كلا النموذجين
     try:
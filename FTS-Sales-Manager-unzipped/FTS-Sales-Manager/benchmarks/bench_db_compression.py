@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/bench_db_compression.py
+
+قياس أثر ضغط البيانات في كاش SQLite على حجم الملف وزمن القراءة
+لمرآة محلية من الحجوزات (افتراضياً 50,000 حجز).
+
+الاستخدام (من مجلد المشروع):
+    python benchmarks/bench_db_compression.py --records 50000 --reads 5000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.db_manager import DatabaseManager  # noqa: E402
+from core.logger import logger  # noqa: E402
+
+AGENCIES = ["Sun Travel", "Blue Sea Tours", "Nile Holidays", "Desert Safari Co", "Red Sea Dive", "Memphis Tours"]
+HOTELS = ["Steigenberger Al Dau", "Hilton Hurghada Plaza", "Sunrise Holidays Resort", "Titanic Palace",
+          "Jaz Aquamarine", "Albatros Palace", "Baron Palace Sahl Hasheesh", "Rixos Premium Magawish"]
+TRIPS = ["Orange Bay", "Luxor Day Trip", "Cairo by Bus", "Super Safari", "Dolphin House", "Giftun Island"]
+GUIDES = ["English", "German", "Russian", "Polish", "Czech", "Arabic"]
+STATUSES = ["Confirmed", "Pending", "Cancelled", "Completed"]
+
+
+def make_booking(index: int, rng: random.Random) -> dict:
+    """توليد سجل حجز بنفس بنية سجلات Airtable"""
+    return {
+        "id": f"rec{index:014d}",
+        "createdTime": f"2025-0{rng.randint(1, 9)}-{rng.randint(10, 28)}T0{rng.randint(0, 9)}:12:33.000Z",
+        "fields": {
+            "Booking Nr.": f"{rng.choice(AGENCIES)[:3].upper()}-{index:06d}",
+            "Customer Name": f"Customer {rng.randint(1, 999999)}",
+            "Hotel Name": rng.choice(HOTELS),
+            "Agency": rng.choice(AGENCIES),
+            "Room number": str(rng.randint(100, 999)),
+            "trip Name": rng.choice(TRIPS),
+            "Date Trip": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "Option": "Standard",
+            "des": "Hurghada",
+            "Guide": rng.choice(GUIDES),
+            "pickup time": f"{rng.randint(5, 10):02d}:{rng.choice(['00', '15', '30', '45'])}",
+            "ADT": rng.randint(1, 4),
+            "CHD": rng.randint(0, 3),
+            "Customer Phone": f"+49{rng.randint(100000000, 999999999)}",
+            "Customer Email": f"guest{index}@example.com",
+            "Customer Country": "Germany",
+            "Total price USD": round(rng.uniform(20, 400), 2),
+            "Net Rate": round(rng.uniform(10, 300), 2),
+            "Currency": "USD",
+            "Collecting on date Trip": "No",
+            "Booking Status": rng.choice(STATUSES),
+            "Assigned To": {"id": "usrAbCdEfGh123456", "email": "agent@example.com", "name": "Agent"},
+        }
+    }
+
+
+def run_mode(label: str, payloads: list, reads: int, rng: random.Random, **db_kwargs) -> dict:
+    """تعبئة قاعدة بيانات مؤقتة بأسلوب ضغط محدد وقياس الحجم وزمن القراءة"""
+    tmp_dir = tempfile.mkdtemp(prefix="fts_bench_")
+    db_path = os.path.join(tmp_dir, "cache.db")
+    db = DatabaseManager(db_path, **db_kwargs)
+
+    if db_kwargs.get("compress") and db_kwargs.get("use_dictionary") and label.endswith("trained"):
+        db.train_compression_dictionary([data for _, data in payloads[:2000]])
+
+    start = time.perf_counter()
+    db.set_cached_records(payloads, table_name="List V2").result()
+    write_seconds = time.perf_counter() - start
+
+    ids = [record_id for record_id, _ in payloads]
+    sample = [rng.choice(ids) for _ in range(reads)]
+
+    start = time.perf_counter()
+    for record_id in sample:
+        json.loads(db.get_cached_record(record_id, table_name="List V2"))
+    read_seconds = time.perf_counter() - start
+
+    size_info = db.get_cache_size_info()
+    db.close()
+
+    try:
+        os.remove(db_path)
+        os.rmdir(tmp_dir)
+    except OSError:
+        pass
+
+    return {
+        "mode": label,
+        "file_mb": size_info.get("file_bytes", 0) / (1024 * 1024),
+        "payload_mb": size_info["bookings_cache"]["stored_bytes"] / (1024 * 1024),
+        "write_s": write_seconds,
+        "read_us": read_seconds * 1_000_000 / max(reads, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="قياس ضغط كاش الحجوزات")
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--reads", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # إيقاف رسائل DEBUG لكل سجل حتى لا تؤثر على القياس
+    logger.setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    payloads = [(b["id"], json.dumps(b, ensure_ascii=False)) for b in (make_booking(i, rng) for i in range(args.records))]
+
+    modes = [
+        ("raw", {"compress": False}),
+        ("zlib", {"compress": True, "use_dictionary": False}),
+        ("zlib+dict", {"compress": True, "use_dictionary": True}),
+        ("zlib+dict trained", {"compress": True, "use_dictionary": True}),
+    ]
+
+    print(f"{args.records} حجز، {args.reads} قراءة عشوائية")
+    print(f"{'mode':<20}{'file MB':>10}{'payload MB':>12}{'write s':>10}{'read µs':>10}")
+    for label, kwargs in modes:
+        result = run_mode(label, payloads, args.reads, random.Random(args.seed), **kwargs)
+        print(f"{result['mode']:<20}{result['file_mb']:>10.2f}{result['payload_mb']:>12.2f}"
+              f"{result['write_s']:>10.2f}{result['read_us']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
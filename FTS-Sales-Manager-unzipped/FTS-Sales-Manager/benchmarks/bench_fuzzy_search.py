@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/bench_fuzzy_search.py
+
+مقارنة البحث المرن القديم (نسبة الأحرف المشتركة على كل القيم) بالبحث الموحد
+(فهرس المقاطع + مسافة التحرير المحدودة على المرشحين فقط) على قوائم فنادق
+ووكالات واقعية، مع استعلامات فيها أخطاء كتابة (حذف، استبدال، تبديل حرفين).
+كل استعلام مبني من كلمات لا تظهر إلا في القيمة المقصودة، حتى لا يقيس غموض الاستعلام.
+
+يقيس لكل قائمة: زمن الاستعلام، ونسبة ظهور القيمة المقصودة ضمن أفضل النتائج.
+
+الاستخدام (من مجلد المشروع):
+    python benchmarks/bench_fuzzy_search.py --hotels 2000 --agencies 300 --queries 300
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.search_index import SearchIndex  # noqa: E402
+
+CHAINS = ["Steigenberger", "Hilton", "Sunrise", "Titanic", "Jaz", "Albatros", "Baron", "Rixos", "Pickalbatros",
+          "Serenity", "Sentido", "Iberotel", "Marriott", "Sheraton", "Movenpick", "Kempinski", "Tropitel",
+          "Desert Rose", "Makadi Spa", "Continental", "Old Palace", "Premier Le Reve", "Cleopatra", "Three Corners"]
+PLACES = ["Hurghada", "Sahl Hasheesh", "Makadi Bay", "El Gouna", "Soma Bay", "Safaga", "Marsa Alam",
+          "Sharm El Sheikh", "Naama Bay", "Nabq", "Luxor", "Aswan", "Magawish", "Abu Soma"]
+KINDS = ["Resort", "Beach Resort", "Palace", "Aqua Park", "Plaza", "Suites", "Club", "Garden", "Lagoon",
+         "Premium", "Royal", "Village", "Marina", "Sea View"]
+AGENCY_WORDS = ["Sun", "Blue Sea", "Nile", "Desert", "Red Sea", "Memphis", "Pharaoh", "Coral", "Golden",
+                "Sahara", "Oasis", "Lotus", "Falcon", "Horus", "Sphinx", "Dolphin", "Palm", "Pyramids"]
+AGENCY_KINDS = ["Travel", "Tours", "Holidays", "Excursions", "Trips", "Safari Co", "Dive Center", "Transfers"]
+
+
+def make_hotels(count: int, rng: random.Random) -> List[str]:
+    names = set()
+    while len(names) < count:
+        name = f"{rng.choice(CHAINS)} {rng.choice(KINDS)} {rng.choice(PLACES)}"
+        if rng.random() < 0.3:
+            name += f" {rng.randint(1, 9)}"
+        names.add(name)
+    return sorted(names)
+
+
+def make_agencies(count: int, rng: random.Random) -> List[str]:
+    names = set()
+    while len(names) < count:
+        names.add(f"{rng.choice(AGENCY_WORDS)} {rng.choice(AGENCY_KINDS)}" + (
+            f" {rng.choice(PLACES)}" if len(names) >= len(AGENCY_WORDS) * len(AGENCY_KINDS) // 2 else ""))
+    return sorted(names)
+
+
+def add_typo(text: str, rng: random.Random) -> str:
+    """خطأ كتابة واحد: حذف، استبدال، أو تبديل حرفين متجاورين"""
+    position = rng.randrange(1, len(text) - 1)
+    kind = rng.choice(("delete", "replace", "swap"))
+    if kind == "delete":
+        return text[:position] + text[position + 1:]
+    if kind == "replace":
+        return text[:position] + rng.choice("aeiourstn") + text[position + 1:]
+    return text[:position] + text[position + 1] + text[position] + text[position + 2:]
+
+
+def unique_span(target: str, others: List[str]) -> str:
+    """أقصر كلمات متتالية من القيمة لا تظهر في أي قيمة أخرى (وإلا القيمة كاملة)"""
+    words = target.lower().split()
+    for size in range(1, len(words) + 1):
+        for start in range(len(words) - size + 1):
+            span = " ".join(words[start:start + size])
+            if len(span) >= 5 and not any(span in other for other in others):
+                return span
+    return target.lower()
+
+
+def make_queries(values: List[str], count: int, rng: random.Random) -> List[Tuple[str, str]]:
+    """
+    (استعلام فيه خطأ، القيمة المقصودة): الاستعلام كلمات تميز القيمة المقصودة وحدها،
+    فنسبة ظهورها في النتائج تقيس جودة الترتيب وليس غموض الاستعلام
+    """
+    lowered = [value.lower() for value in values]
+    queries = []
+    for position in rng.sample(range(len(values)), min(count, len(values))):
+        others = lowered[:position] + lowered[position + 1:]
+        queries.append((add_typo(unique_span(values[position], others), rng), values[position]))
+    return queries
+
+
+def legacy_search(values: List[str], query: str, limit: int, threshold: float) -> List[str]:
+    """البحث السابق: مسح كل القيم مع نسبة الأحرف المشتركة للبحث المرن"""
+    query_lower = query.lower()
+    results = []
+    for value in values:
+        value_lower = value.lower()
+        if query_lower == value_lower:
+            results.append((value, 1.0))
+        elif value_lower.startswith(query_lower):
+            results.append((value, 0.9))
+        elif query_lower in value_lower:
+            results.append((value, 0.7))
+        else:
+            common = sum(1 for c in query_lower if c in value_lower)
+            similarity = common / max(len(query_lower), len(value_lower))
+            if similarity >= threshold:
+                results.append((value, similarity * 0.6))
+    results.sort(key=lambda x: -x[1])
+    return [value for value, _ in results[:limit]]
+
+
+def measure(label: str, search: Callable[[str], List[str]], queries: List[Tuple[str, str]]) -> None:
+    found = 0
+    start = time.perf_counter()
+    for query, target in queries:
+        if target in search(query):
+            found += 1
+    elapsed_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+    print(f"  {label:<22}{elapsed_ms:>10.3f}{found * 100 / max(len(queries), 1):>12.1f}")
+
+
+def run(name: str, values: List[str], queries: List[Tuple[str, str]], limit: int, threshold: float) -> None:
+    start = time.perf_counter()
+    index = SearchIndex(values)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"\n{name}: {len(values)} قيمة، {len(queries)} استعلام، بناء الفهرس {build_ms:.0f} ms")
+    print(f"  {'method':<22}{'ms/query':>10}{'recall@' + str(limit) + ' %':>12}")
+    measure("legacy char-overlap", lambda q: legacy_search(values, q, limit, threshold), queries)
+    measure("n-gram + edit distance",
+            lambda q: [hit.value for hit in index.search(q, limit, fuzzy_threshold=threshold)], queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="قياس البحث المرن في القوائم المنسدلة")
+    parser.add_argument("--hotels", type=int, default=2_000)
+    parser.add_argument("--agencies", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for name, values in (("Hotels", make_hotels(args.hotels, rng)), ("Agencies", make_agencies(args.agencies, rng))):
+        run(name, values, make_queries(values, args.queries, rng), args.limit, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,11 +18,16 @@ from tkinter import messagebox
 import threading
 import json
 import time
+import requests
 import tkinter as tk
 import customtkinter as ctk
 
 from core.config_manager import ConfigManager
 from core.db_manager import DatabaseManager
+from core.cache_maintenance import CacheMaintenanceService
+from core.booking_query import BookingQueryEngine
+from core.text_normalize import set_transliteration
+from core.usage_ranking import get_usage_ranking
 from core.language_manager import LanguageManager
 from core.theme_manager import ThemeManager
 from core.user_manager import UserManager
@@ -88,9 +93,25 @@ class AppController:
         # كاش أرقام الحجز المستخدمة (للتحقق من عدم التكرار)
         self.used_booking_numbers = set()
 
+        # مفاتيح البحث الموحدة: الإعداد قبل بناء أي فهرس بحث
+        set_transliteration(self.config_mgr.get_search_settings().get('transliterate', False))
+
+        # ترتيب الاقتراحات حسب استخدام كل مستخدم (يُحمّل عند تسجيل الدخول)
+        get_usage_ranking().configure(self.config_mgr.get_search_settings().get('usage_ranking', {}))
+
+        # محرك الاستعلام المحلي فوق الحجوزات المحملة (الإحصائيات والبحث والصلاحيات)
+        self.booking_query = BookingQueryEngine()
+
         # تهيئة مدير القوائم المنسدلة
         self.dropdown_manager = self._initialize_dropdown_manager()
 
+        # صيانة الكاش المحلي في الخلفية (انتهاء الصلاحية، الحجم، التنظيف)
+        self.cache_maintenance = CacheMaintenanceService(
+            self.config_mgr, self.db_mgr,
+            dropdown_store=self.dropdown_manager.store if self.dropdown_manager else None
+        )
+        self.cache_maintenance.start()
+
     def _hide_default_tk_windows(self):
         """إخفاء نوافذ tk الافتراضية"""
         try:
@@ -169,6 +190,9 @@ class AppController:
             logger.warning(f"لا يوجد Airtable Collaborator للمستخدم: {self.current_username}")
             self.current_user_collaborator = None
 
+        # إحصائيات اختيار المستخدم في القوائم المنسدلة
+        get_usage_ranking().set_user(self.current_username)
+
         # تعيين View للمستخدم
         user_view = user_info.get('view')
         if user_view:
@@ -254,12 +278,7 @@ class AppController:
             records = self.airtable_booking.fetch_records(use_cache=False)
             logger.info(f"تم جلب {len(records)} سجل")
 
-            # تحديث كاش أرقام الحجز
-            self.used_booking_numbers.clear()
-            for record in records:
-                booking_nr = record.get('fields', {}).get('Booking Nr.')
-                if booking_nr:
-                    self.used_booking_numbers.add(booking_nr)
+            self._index_records(records)
 
             # طباعة أسماء الحقول (للتطوير)
             if records:
@@ -271,6 +290,50 @@ class AppController:
             logger.error(f"خطأ في جلب السجلات: {e}")
             return []
 
+    def load_cached_records(self) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+        """
+        تحميل آخر لقطة محلية للحجوزات لعرضها فوراً (بدون انتظار الشبكة)
+
+        :return: (السجلات، وقت آخر مزامنة) أو ([], None)
+        """
+        try:
+            records, synced_at = self.airtable_booking.load_snapshot()
+            if records:
+                self._index_records(records)
+            return records, synced_at
+        except Exception as e:
+            logger.error(f"خطأ في تحميل اللقطة المحلية: {e}")
+            return [], None
+
+    def sync_records(self, since: Optional[datetime] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        مزامنة الحجوزات بعد عرض اللقطة المحلية: تفاضلية إذا كانت آخر مزامنة كاملة
+        للقطة حديثة، وإلا كاملة (لحذف السجلات المحذوفة أو الخارجة من العرض)
+
+        :param since: وقت مزامنة اللقطة المعروضة
+        :return: (جميع السجلات، عدد السجلات المتغيرة أو -1 عند المزامنة الكاملة)
+        """
+        full_synced_at = self.airtable_booking.snapshot_full_synced_at
+        if (since and full_synced_at
+                and datetime.now() - full_synced_at < self.airtable_booking.CACHE_DURATION):
+            try:
+                records, changed = self.airtable_booking.sync_changes(since)
+                self._index_records(records)
+                return records, changed
+            except Exception as e:
+                logger.warning(f"فشلت المزامنة التفاضلية، سيتم الجلب الكامل: {e}")
+
+        return self.fetch_all_records(), -1
+
+    def _index_records(self, records: List[Dict[str, Any]]) -> None:
+        """تحديث كاش أرقام الحجز وفهرس الاستعلام المحلي"""
+        self.booking_query.load(records)
+        self.used_booking_numbers.clear()
+        for record in records:
+            booking_nr = record.get('fields', {}).get('Booking Nr.')
+            if booking_nr:
+                self.used_booking_numbers.add(booking_nr)
+
     def refresh_data(self) -> List[Dict[str, Any]]:
         """تحديث البيانات"""
         logger.info("تحديث البيانات من Airtable")
@@ -612,9 +675,13 @@ class AppController:
         unauthorized_count = 0
         old_records_count = 0
 
-        # جلب السجلات للتحقق من الصلاحيات
-        all_records = self.fetch_all_records()
-        records_dict = {record['id']: record for record in all_records}
+        # الصلاحيات تُفحص على حالة السجلات الحالية في Airtable (النسخة المحلية قد تكون لقطة قديمة)،
+        # والنسخة المحلية تُستخدم فقط عند تعذر الاتصال
+        try:
+            records_dict = self.airtable_booking.fetch_records_by_ids(record_ids)
+        except requests.RequestException as e:
+            logger.warning(f"تعذر جلب السجلات المحددة من Airtable، استخدام النسخة المحلية: {e}")
+            records_dict = self.booking_query.get_by_ids(record_ids)
 
         for record_id in record_ids:
             try:
@@ -804,6 +871,7 @@ class AppController:
         self.current_username = None
         self.current_user_info = None
         self.current_user_collaborator = None
+        get_usage_ranking().set_user(None)
         self.selected_record = None
         self.is_loading = False
         self.loading_operations.clear()
@@ -897,16 +965,39 @@ class AppController:
         # مسح الكاش
         self.used_booking_numbers.clear()
 
+        # إيقاف صيانة الكاش
+        self.cache_maintenance.stop()
+
+        # إيقاف مجدول تحديث القوائم المنسدلة
+        if self.dropdown_manager:
+            self.dropdown_manager.stop()
+
         # إيقاف الخيوط
         shutdown_threading()
 
         logger.info("تم تنظيف موارد التطبيق")
 
+    def clear_local_cache(self) -> int:
+        """
+        مسح الكاش المحلي بالكامل (قاعدة البيانات، ملف القوائم، والذاكرة) - يُستدعى من خيط خلفي.
+        :return: عدد البايتات التي تم تحريرها.
+        """
+        freed = self.cache_maintenance.clear_all()
+
+        if hasattr(self.airtable_booking, 'clear_cache'):
+            self.airtable_booking.clear_cache()
+        if self.dropdown_manager:
+            self.dropdown_manager.refresh_all(force=True, full_reload=True)
+
+        return freed
+
     # =============== إدارة القوائم المنسدلة ===============
 
     def refresh_dropdown_manager(self):
         """إعادة تهيئة مدير القوائم المنسدلة"""
         if HAS_AIRTABLE_DROPDOWNS:
+            if self.dropdown_manager:
+                self.dropdown_manager.stop()
             try:
                 self.dropdown_manager = AirtableDropdownManager(
                     config_manager=self.config_mgr,
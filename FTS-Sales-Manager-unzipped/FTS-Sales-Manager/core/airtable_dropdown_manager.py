@@ -4,52 +4,102 @@ core/airtable_dropdown_manager.py - نسخة محسنة للأداء ومنع ا
 
 مدير القوائم المنسدلة المحسن مع:
 - تحميل متوازي للقوائم
-- تخزين مؤقت ذكي
+- تخزين مؤقت ذكي (مخزن SQLite لكل قائمة مع تحميل كسول)
 - معالجة أفضل للأخطاء
-- منع التجمد أثناء التحميل
+- منع التجمد أثناء التحميل: القيم الحالية تُرجع فوراً، والتحديث يتم فقط في الخلفية
+  عبر مجدول يحدّث كل قائمة حسب مدة صلاحيتها مع تفاوت عشوائي (jitter)
+- إشعار المشتركين بالفرق فقط (القيم المضافة والمحذوفة لكل قائمة) عند تحديث القوائم
+- فهرس قيم مرتب وغير قابل للتعديل لكل قائمة (ValueIndex) يُشارك بالمرجع مع الحقول،
+  مع فهرس البحث الخاص به مبنياً مسبقاً في الخلفية حتى لا يُبنى عند أول حرف يكتبه المستخدم
+- سياسة تحميل لكل قائمة: eager (عند البدء)، on_first_use (عند بناء الحقل)،
+  on_field_focus (عند تركيز الحقل) حتى لا تنافس القوائم النادرة جلب الحجوزات
+- مشاركة المخزن بين نسخ التطبيق على نفس الجهاز: نسخة واحدة فقط تجلب القائمة
+  (عقد تحديث)، والبقية تقرأ نتيجتها من المخزن وتُشعر حقولها بالفرق
 """
 
 import os
 import logging
+import random
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
-from typing import Dict, List, Optional, Tuple
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
 from datetime import datetime, timedelta
-import json
 
 from core.airtable_manager import AirtableModel
+from core.dropdown_store import DropdownStore
+from core.value_index import EMPTY_INDEX, ValueIndex
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class DropdownChange:
+    """تغيير قائمة منسدلة واحدة: الفهرس الجديد مع الفرق عن النسخة السابقة"""
+    key: str
+    values: ValueIndex
+    added: List[str]
+    removed: List[str]
+
+
 class AirtableDropdownManager:
     """مدير القوائم المنسدلة المحسن للأداء ومنع التجمد"""
 
-    # ملف التخزين المؤقت
-    CACHE_FILE = "cache/dropdown_cache.json"
-    CACHE_DURATION = timedelta(hours=1)  # مدة الكاش ساعة واحدة
-    LOADING_TIMEOUT = 30  # مهلة زمنية للتحميل (30 ثانية)
+    DEFAULT_REFRESH_MINUTES = 60  # مدة صلاحية القائمة الافتراضية
+    DEFAULT_REFRESH_JITTER = 0.1  # تفاوت عشوائي ±10% حتى لا تُحدّث القوائم في نفس اللحظة
+    DEFAULT_RETRY_SECONDS = 120  # إعادة المحاولة بعد فشل التحميل
+    DEFAULT_FULL_RELOAD_HOURS = 24  # تحميل كامل دوري (لالتقاط القيم المحذوفة)
+    DEFAULT_SHARED_POLL_SECONDS = 5  # فحص تحديثات النسخ الأخرى في المخزن المشترك
+    DEFAULT_LEASE_SECONDS = 120  # أقصى مدة لحجز تحديث قائمة (تحرر تلقائياً إذا توقفت النسخة)
     MAX_WORKERS = 3  # عدد الخيوط المتوازية
 
+    # سياسات التحميل
+    LOAD_EAGER = 'eager'
+    LOAD_ON_FIRST_USE = 'on_first_use'
+    LOAD_ON_FIELD_FOCUS = 'on_field_focus'
+    LOAD_POLICIES = (LOAD_EAGER, LOAD_ON_FIRST_USE, LOAD_ON_FIELD_FOCUS)
+
     def __init__(self, config_manager, db_manager):
         self.config_mgr = config_manager
         self.db_mgr = db_manager
         self.tables = {}
         self.field_names = {}
         self.errors = {}
-        self._cache = {}
+        self._cache: Dict[str, ValueIndex] = {}
         self._cache_timestamps = {}
-        self._loading = False
         self._load_lock = threading.RLock()
-        self._loading_start_time = None
-        self._active_futures = set()
-
-        # إنشاء مجلد الكاش
-        os.makedirs("cache", exist_ok=True)
 
-        # تحميل الكاش من الملف
-        self._load_cache_from_file()
+        # إعدادات المجدول
+        settings = config_manager.get_dropdown_settings()
+        self.refresh_minutes: Dict[str, float] = dict(settings.get('refresh_minutes') or {})
+        self.refresh_jitter = float(settings.get('refresh_jitter', self.DEFAULT_REFRESH_JITTER))
+        self.retry_seconds = float(settings.get('retry_seconds', self.DEFAULT_RETRY_SECONDS))
+        self.full_reload_after = timedelta(hours=float(settings.get('full_reload_hours', self.DEFAULT_FULL_RELOAD_HOURS)))
+        self.load_policies: Dict[str, str] = dict(settings.get('load_policies') or {})
+        self.shared_poll_seconds = float(settings.get('shared_poll_seconds', self.DEFAULT_SHARED_POLL_SECONDS))
+        self.lease_seconds = float(settings.get('refresh_lease_seconds', self.DEFAULT_LEASE_SECONDS))
+
+        # حالة المجدول: موعد التحديث التالي لكل قائمة (time.monotonic) والقوائم الجاري تحديثها
+        self._due: Dict[str, float] = {}
+        self._refreshing: Set[str] = set()
+        self._activated: Set[str] = set()  # القوائم الكسولة التي طُلبت (تُحدّث بعدها حسب مدة صلاحيتها)
+        self._forced: Dict[str, float] = {}  # طلبات التحديث الإجباري: وقت الطلب (لا تكفي نتيجة أقدم منه)
+        self._full_reload: Set[str] = set()  # قوائم تُحمّل بالكامل في تحديثها التالي (بدون الحالة المحفوظة)
+        self._wakeup = threading.Condition(self._load_lock)
+        self._stop_event = threading.Event()
+        self._scheduler_thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="DropdownRefresh")
+        self._observers: List[Callable[[Dict[str, DropdownChange]], None]] = []
+
+        # المخزن الدائم (مشترك بين نسخ التطبيق): تُقرأ أوقات التحديث فقط الآن، والقيم عند أول طلب
+        self.store = DropdownStore.for_config(config_manager)
+        self._instance_id = uuid.uuid4().hex
+        self._revisions: Dict[str, int] = {}  # آخر مراجعة معروفة لكل قائمة في المخزن
+        self._data_version: Optional[int] = None
+        self._next_poll = 0.0
+        self._load_cache_timestamps()
 
         # تهيئة الجداول
         self._setup_tables()
@@ -57,61 +107,115 @@ class AirtableDropdownManager:
         # تحميل القوائم في الخلفية
         self._start_background_loading()
 
-    def _load_cache_from_file(self):
-        """تحميل الكاش من الملف"""
+    def _load_cache_timestamps(self):
+        """تحميل أوقات تحديث القوائم من المخزن (بدون قراءة القيم)"""
         try:
-            if os.path.exists(self.CACHE_FILE):
-                with open(self.CACHE_FILE, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-
-                # التحقق من صلاحية الكاش
-                for key, data in cache_data.items():
-                    try:
-                        timestamp = datetime.fromisoformat(data.get('timestamp', ''))
-                        if datetime.now() - timestamp < self.CACHE_DURATION:
-                            self._cache[key] = data.get('values', [])
-                            self._cache_timestamps[key] = timestamp
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"تعذر تحليل timestamp للمفتاح {key}: {e}")
-                        continue
-
-                if self._cache:
-                    logger.info(f"تم تحميل {len(self._cache)} قائمة من الكاش")
-
+            self._data_version = self.store.data_version()
+            revisions = self.store.get_revisions()
+            self._cache_timestamps = {key: timestamp for key, (_, timestamp) in revisions.items()}
+            self._revisions = {key: revision for key, (revision, _) in revisions.items()}
+            if self._cache_timestamps:
+                logger.info(f"وجد {len(self._cache_timestamps)} قائمة في الكاش المحلي")
         except Exception as e:
             logger.warning(f"فشل تحميل الكاش: {e}")
 
-    def _save_cache_to_file(self):
-        """حفظ الكاش إلى الملف بطريقة آمنة"""
+    def _get_cached(self, key: str) -> ValueIndex:
+        """فهرس قيم القائمة من الذاكرة، أو من المخزن عند أول طلب (تحميل كسول)"""
+        with self._load_lock:
+            if key in self._cache:
+                return self._cache[key]
+
         try:
-            cache_data = {}
-            with self._load_lock:
-                for key in self._cache:
-                    if key in self._cache_timestamps:
-                        cache_data[key] = {
-                            'values': self._cache[key],
-                            'timestamp': self._cache_timestamps[key].isoformat()
-                        }
-
-            # كتابة مؤقتة ثم نقل
-            temp_file = self.CACHE_FILE + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-
-            # نقل الملف المؤقت فوق الأصلي
-            if os.path.exists(self.CACHE_FILE):
-                os.remove(self.CACHE_FILE)
-            os.rename(temp_file, self.CACHE_FILE)
+            values = self.store.load(key)
+        except Exception as e:
+            logger.warning(f"فشل قراءة {key} من الكاش: {e}")
+            values = None
+
+        if values is None:
+            return EMPTY_INDEX
+
+        # المخزن يُرجع القيم مرتبة وبدون تكرار (المراجعة مسجلة من قبل، أو عند الفحص التالي)
+        index = ValueIndex(values, _presorted=True)
+        with self._load_lock:
+            return self._cache.setdefault(key, index)
+
+    def _store_values(self, key: str, values: List[str]) -> Optional[DropdownChange]:
+        """
+        حفظ قائمة محملة في الذاكرة والمخزن (يُكتب الفرق فقط).
+        :return: التغيير (المضاف والمحذوف) أو None إذا لم تتغير القيم.
+        """
+        index = ValueIndex(values)
+        with self._load_lock:
+            old_index = self._cache.get(key)
+            # الإبقاء على نفس الفهرس (ونفس رقم الإصدار) إذا لم تتغير القيم
+            if old_index is None or old_index != index:
+                self._cache[key] = index
+            self._cache_timestamps[key] = datetime.now()
+            current = self._cache[key]
 
+        # بناء فهرس البحث هنا في الخلفية (لا شيء إذا كان مبنياً)
+        current.search_index()
+
+        try:
+            store_diff = self.store.replace(key, index)
+            self._revisions[key] = self.store.get_revision(key)
         except Exception as e:
             logger.warning(f"فشل حفظ الكاش: {e}")
-            # تنظيف الملف المؤقت
-            temp_file = self.CACHE_FILE + '.tmp'
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+            store_diff = (list(index), [])
+
+        # الفرق عن النسخة المعروضة في الذاكرة، أو عن المخزن إذا لم تُحمّل القائمة بعد
+        added, removed = index.diff(old_index) if old_index is not None else store_diff
+        if not added and not removed:
+            return None
+
+        logger.info(f"[Dropdown] تغيرت {key}: +{len(added)} -{len(removed)}")
+        return DropdownChange(key, self._cache.get(key, index), added, removed)
+
+    def _adopt_shared(self, key: str, timestamp: datetime) -> Optional[DropdownChange]:
+        """
+        اعتماد قائمة حدّثتها نسخة أخرى في المخزن المشترك (بدون طلب شبكة).
+        :return: الفرق عن النسخة المعروضة، أو None إذا لم تتغير أو لم تُعرض بعد.
+        """
+        with self._load_lock:
+            known = self._cache_timestamps.get(key)
+            self._cache_timestamps[key] = max(timestamp, known) if known else timestamp
+            old_index = self._cache.get(key)
+        if old_index is None:
+            # القائمة لم تُقرأ بعد في هذه النسخة: تُقرأ من المخزن عند أول طلب
+            return None
+
+        values = self.store.load(key)
+        if values is None:
+            return None
+        index = ValueIndex(values, _presorted=True)
+        added, removed = index.diff(old_index)
+        if not added and not removed:
+            return None
+
+        index.search_index()
+        with self._load_lock:
+            self._cache[key] = index
+        logger.info(f"[Dropdown] تغيرت {key} من نسخة أخرى: +{len(added)} -{len(removed)}")
+        return DropdownChange(key, index, added, removed)
+
+    def _refreshed_elsewhere(self, key: str) -> Optional[datetime]:
+        """
+        وقت تحديث القائمة في المخزن إذا حدّثتها نسخة أخرى بعد آخر تحديث معروف هنا
+        وما زالت صالحة (وبعد طلب التحديث الإجباري إن وُجد)، وإلا None.
+        """
+        timestamp = self.store.get_timestamp(key)
+        if timestamp is None:
+            return None
+        with self._load_lock:
+            known = self._cache_timestamps.get(key)
+            forced_at = self._forced.get(key)
+        if known is not None and timestamp <= known:
+            return None
+        if forced_at is not None and timestamp.timestamp() < forced_at:
+            return None
+        if (datetime.now() - timestamp).total_seconds() >= self._refresh_interval(key):
+            return None
+        return timestamp
 
     def _setup_tables(self):
         """تهيئة جداول القوائم المنسدلة"""
@@ -160,128 +264,268 @@ class AirtableDropdownManager:
                 logger.error(f"[Dropdown Manager] {error_msg}")
                 self.errors[key] = error_msg
 
-    def _start_background_loading(self):
-        """بدء تحميل القوائم في الخلفية"""
-        def load_all():
-            try:
-                self._load_all_dropdowns_parallel()
-            except Exception as e:
-                logger.error(f"خطأ في التحميل الخلفي: {e}")
-
-        thread = threading.Thread(target=load_all, daemon=True, name="DropdownLoader")
-        thread.start()
+    # =============== مجدول التحديث في الخلفية ===============
 
-    def _load_all_dropdowns_parallel(self):
-        """تحميل جميع القوائم بشكل متوازي مع مهلة زمنية"""
-        with self._load_lock:
-            if self._loading:
-                logger.debug("التحميل جاري بالفعل")
-                return
-            self._loading = True
-            self._loading_start_time = datetime.now()
-
-        start_time = time.time()
-        logger.info("[Dropdown Manager] بدء التحميل المتوازي للقوائم")
-
-        # التحقق من وجود جداول للتحميل
+    def _start_background_loading(self):
+        """جدولة تحديث القوائم وتشغيل خيط المجدول"""
         if not self.tables:
             logger.warning("لا توجد جداول للتحميل")
-            with self._load_lock:
-                self._loading = False
-                self._loading_start_time = None
             return
 
-        # تهيئة المتغيرات قبل try block
-        completed = 0
-        failed = 0
-        timeout_count = 0
+        now = time.monotonic()
+        with self._wakeup:
+            for key in self.tables:
+                # القوائم الكسولة لا تُحمّل عند البدء، بل عند أول استخدام أو تركيز الحقل
+                if not self._is_active(key):
+                    continue
 
-        try:
-            # استخدام ThreadPoolExecutor للتحميل المتوازي
-            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
-                futures = {}
-
-                # إطلاق مهام التحميل للجداول التي تحتاج تحديث
-                for key in self.tables:
-                    if self._is_cache_valid(key):
-                        logger.debug(f"تخطي {key} - الكاش صالح")
-                        continue
-
-                    future = executor.submit(self._load_single_dropdown_with_timeout, key)
-                    futures[future] = key
-                    self._active_futures.add(future)
-
-                if not futures:
-                    logger.info("جميع القوائم محدثة في الكاش")
+                # القائمة الصالحة في المخزن تُحدّث عند انتهاء صلاحيتها، والباقي فوراً
+                timestamp = self._cache_timestamps.get(key)
+                remaining = 0.0
+                if timestamp:
+                    age = (datetime.now() - timestamp).total_seconds()
+                    remaining = max(self._refresh_interval(key) - age, 0.0)
+                self._due[key] = now + remaining
+            self._wakeup.notify()
+
+        if self._scheduler_thread and self._scheduler_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True, name="DropdownScheduler")
+        self._scheduler_thread.start()
+
+    def _run_scheduler(self):
+        """حلقة المجدول: إطلاق تحديث القوائم المستحقة في الخلفية والانتظار حتى الموعد التالي"""
+        while not self._stop_event.is_set():
+            if self.shared_poll_seconds > 0 and time.monotonic() >= self._next_poll:
+                self._next_poll = time.monotonic() + self.shared_poll_seconds
+                self._poll_shared_store()
+
+            with self._wakeup:
+                now = time.monotonic()
+                due = [key for key, at in self._due.items() if at <= now and key not in self._refreshing]
+                for key in due:
+                    del self._due[key]
+                    self._refreshing.add(key)
+
+                if not due:
+                    # القوائم الجاري تحديثها تُجدول من جديد عند اكتمالها
+                    next_at = min((at for key, at in self._due.items() if key not in self._refreshing), default=None)
+                    if self.shared_poll_seconds > 0:
+                        next_at = self._next_poll if next_at is None else min(next_at, self._next_poll)
+                    self._wakeup.wait(None if next_at is None else max(next_at - now, 0.0))
+                    continue
+
+            for key in due:
+                try:
+                    self._executor.submit(self._refresh_key, key)
+                except RuntimeError:
+                    # تم إيقاف المنفذ أثناء الإغلاق
                     return
 
-                # انتظار اكتمال المهام مع مهلة زمنية
-
+    def _refresh_key(self, key: str):
+        """
+        تحديث قائمة واحدة في الخلفية ثم جدولة تحديثها التالي.
+        إذا حدّثت نسخة أخرى القائمة في المخزن المشترك تُعتمد نتيجتها بدون طلب شبكة،
+        وإذا كانت نسخة أخرى تحدّثها الآن (عقد محجوز) يُعاد الفحص بعد قليل.
+        """
+        values = None
+        change = None
+        delay = self.retry_seconds
+        lease = f"dropdown:{key}"
+        try:
+            shared_at = self._refreshed_elsewhere(key)
+            if shared_at is not None:
+                change = self._adopt_shared(key, shared_at)
+                delay = self._delay_after(key, shared_at)
+                with self._load_lock:
+                    self._forced.pop(key, None)
+                logger.debug(f"✓ {key} محدثة من نسخة أخرى")
+            elif not self.store.try_acquire_lease(lease, self._instance_id, self.lease_seconds):
+                delay = max(self.shared_poll_seconds, 1.0)
+                logger.debug(f"{key} قيد التحديث في نسخة أخرى، انتظار النتيجة")
+            else:
                 try:
-                    for future in as_completed(futures, timeout=self.LOADING_TIMEOUT):
-                        key = futures[future]
-                        self._active_futures.discard(future)
-
-                        try:
-                            values = future.result(timeout=5)  # مهلة إضافية للحصول على النتيجة
-                            if values is not None:
-                                with self._load_lock:
-                                    self._cache[key] = values
-                                    self._cache_timestamps[key] = datetime.now()
-                                completed += 1
-                                logger.debug(f"✓ تم تحميل {key}: {len(values)} قيمة")
-
-                                # إزالة الخطأ إذا نجح التحميل
-                                self.errors.pop(key, None)
-                            else:
-                                failed += 1
-                                logger.warning(f"✗ فشل تحميل {key}: لم يتم إرجاع بيانات")
-                        except TimeoutError:
-                            timeout_count += 1
-                            logger.error(f"✗ انتهت مهلة تحميل {key}")
-                            self.errors[key] = "انتهت المهلة الزمنية للتحميل"
-                        except Exception as e:
-                            failed += 1
-                            logger.error(f"✗ فشل تحميل {key}: {e}")
-                            self.errors[key] = str(e)
-
-                except TimeoutError:
-                    logger.error("انتهت المهلة الزمنية العامة للتحميل")
-                    # إلغاء المهام المتبقية
-                    for future in futures:
-                        if not future.done():
-                            future.cancel()
-                            key = futures[future]
-                            self.errors[key] = "تم إلغاء التحميل بسبب انتهاء المهلة"
-
-                # تنظيف المهام المكتملة
-                self._active_futures.clear()
+                    values = self._load_single_dropdown(key)
+                finally:
+                    self.store.release_lease(lease, self._instance_id)
+        except Exception as e:
+            logger.error(f"✗ فشل تحميل {key}: {e}")
+
+        # عند الفشل تبقى القيم الحالية كما هي ويُعاد المحاولة لاحقاً
+        if values:
+            change = self._store_values(key, values)
+            self.errors.pop(key, None)
+            delay = self._next_delay(key)
+            with self._load_lock:
+                self._forced.pop(key, None)
+            logger.debug(f"✓ تم تحميل {key}: {len(values)} قيمة")
+
+        with self._wakeup:
+            self._refreshing.discard(key)
+            if key not in self._due:
+                self._due[key] = time.monotonic() + max(delay, 0.0)
+            self._wakeup.notify()
+
+        if change:
+            self._notify_observers({key: change})
+
+    def _refresh_interval(self, key: str) -> float:
+        """مدة صلاحية القائمة بالثواني (من الإعدادات لكل قائمة)"""
+        minutes = self.refresh_minutes.get(key, self.refresh_minutes.get('default', self.DEFAULT_REFRESH_MINUTES))
+        return float(minutes) * 60
+
+    def _next_delay(self, key: str) -> float:
+        """موعد التحديث التالي: مدة الصلاحية مع تفاوت عشوائي"""
+        interval = self._refresh_interval(key)
+        return interval * random.uniform(1 - self.refresh_jitter, 1 + self.refresh_jitter)
+
+    def _delay_after(self, key: str, timestamp: datetime) -> float:
+        """الوقت المتبقي حتى التحديث التالي لقائمة حُدّثت في وقت معين (مع التفاوت العشوائي)"""
+        return max(self._next_delay(key) - (datetime.now() - timestamp).total_seconds(), 0.0)
+
+    def request_refresh(self, key: str, force: bool = False):
+        """
+        طلب تحديث قائمة في الخلفية في أقرب وقت (بدون انتظار).
+        :param force: لا تكفي نسخة أقدم من الطلب حدّثتها نسخة أخرى من التطبيق.
+        """
+        if key not in self.tables:
+            return
+        with self._wakeup:
+            self._activated.add(key)
+            if force:
+                self._forced[key] = time.time()
+            if key not in self._refreshing:
+                self._due[key] = time.monotonic()
+                self._wakeup.notify()
+
+    # =============== سياسات التحميل ===============
+
+    def get_load_policy(self, key: str) -> str:
+        """سياسة تحميل القائمة من الإعدادات (الافتراضي eager)"""
+        policy = self.load_policies.get(key, self.load_policies.get('default', self.LOAD_EAGER))
+        if policy not in self.LOAD_POLICIES:
+            logger.warning(f"سياسة تحميل غير معروفة لـ {key}: {policy}")
+            return self.LOAD_EAGER
+        return policy
+
+    def _is_active(self, key: str) -> bool:
+        """القائمة تُحدّث تلقائياً: تحميل فوري، أو قائمة كسولة طُلبت من قبل"""
+        return self.get_load_policy(key) == self.LOAD_EAGER or key in self._activated
+
+    def request_load(self, key: str) -> bool:
+        """
+        تحميل قائمة كسولة عند تركيز الحقل (أو بناءه) إذا لم تكن صالحة.
+        :return: True إذا بدأ تحميل في الخلفية.
+        """
+        if key not in self.tables:
+            return False
+        with self._load_lock:
+            self._activated.add(key)
+        if self._is_cache_valid(key):
+            return False
+        self.request_refresh(key)
+        return True
+
+    def is_loading(self, key: str) -> bool:
+        """هل القائمة قيد التحميل أو مستحقة التحميل الآن"""
+        with self._load_lock:
+            return key in self._refreshing or self._due.get(key, float('inf')) <= time.monotonic()
+
+    # =============== المخزن المشترك بين النسخ ===============
 
+    def _poll_shared_store(self):
+        """
+        فحص تحديثات النسخ الأخرى في المخزن المشترك.
+        PRAGMA data_version لا يتغير إلا عند كتابة نسخة أخرى، فالفحص الدوري شبه مجاني؛
+        عند تغيره تُقارن مراجعات القوائم وتُعتمد القوائم التي تغيرت.
+        """
+        try:
+            version = self.store.data_version()
+            if version == self._data_version:
+                return
+            self._data_version = version
+            revisions = self.store.get_revisions()
         except Exception as e:
-            logger.error(f"خطأ عام في التحميل المتوازي: {e}")
-            # تأكد من تهيئة المتغيرات في حالة الخطأ
-            if 'completed' not in locals():
-                completed = 0
-            if 'failed' not in locals():
-                failed = len(self.tables)
-            if 'timeout_count' not in locals():
-                timeout_count = 0
-
-        finally:
-            # حفظ الكاش
-            if completed > 0:
-                self._save_cache_to_file()
+            logger.warning(f"فشل فحص المخزن المشترك: {e}")
+            return
 
-            elapsed = time.time() - start_time
-            logger.info(f"[Dropdown Manager] اكتمل التحميل في {elapsed:.2f}ث - "
-                       f"نجح: {completed}, فشل: {failed}, انتهت مهلة: {timeout_count}")
+        changes: Dict[str, DropdownChange] = {}
+        now = time.monotonic()
+        for key, (revision, timestamp) in revisions.items():
+            if key not in self.tables:
+                continue
+
+            with self._wakeup:
+                known = self._cache_timestamps.get(key)
+                newer = known is None or timestamp > known
+                if newer and key in self._due and key not in self._refreshing:
+                    # نسخة أخرى حدّثت القائمة: تأجيل تحديثها هنا حتى انتهاء صلاحية نتيجتها
+                    if key not in self._forced:
+                        self._due[key] = now + self._delay_after(key, timestamp)
+
+            if revision == self._revisions.get(key):
+                if newer:
+                    with self._load_lock:
+                        self._cache_timestamps[key] = timestamp
+                continue
+
+            self._revisions[key] = revision
+            try:
+                change = self._adopt_shared(key, timestamp)
+            except Exception as e:
+                logger.warning(f"فشل قراءة {key} من المخزن المشترك: {e}")
+                continue
+            if change:
+                changes[key] = change
+
+        if changes:
+            self._notify_observers(changes)
+
+    def stop(self):
+        """إيقاف المجدول وخيوط التحميل"""
+        self._stop_event.set()
+        with self._wakeup:
+            self._due.clear()
+            self._wakeup.notify_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # =============== الإشعارات ===============
+
+    def subscribe(self, callback: Callable[[Dict[str, DropdownChange]], None]):
+        """
+        الاشتراك في إشعار "تم تحديث القوائم".
+        يُستدعى callback(changes) بقاموس {key: DropdownChange} للقوائم التي تغيرت فقط،
+        من خيط خلفي، فعلى الواجهة تمرير التحديث عبر after().
+        """
+        with self._load_lock:
+            if callback not in self._observers:
+                self._observers.append(callback)
 
-            with self._load_lock:
-                self._loading = False
-                self._loading_start_time = None
+    def unsubscribe(self, callback: Callable[[Dict[str, DropdownChange]], None]):
+        """إلغاء الاشتراك في إشعار تحديث القوائم"""
+        with self._load_lock:
+            if callback in self._observers:
+                self._observers.remove(callback)
 
-    def _load_single_dropdown_with_timeout(self, key: str) -> Optional[List[str]]:
-        """تحميل قائمة منسدلة واحدة مع مهلة زمنية"""
+    def _notify_observers(self, changes: Dict[str, DropdownChange]):
+        """إشعار المشتركين بتغييرات القوائم"""
+        with self._load_lock:
+            observers = list(self._observers)
+
+        for callback in observers:
+            try:
+                callback(changes)
+            except Exception as e:
+                logger.error(f"خطأ في إشعار تحديث القوائم: {e}")
+
+    def _load_single_dropdown(self, key: str) -> Optional[List[str]]:
+        """
+        تحميل قائمة منسدلة واحدة.
+        يُجلب فقط ما تغير منذ آخر مزامنة (طلب واحد صغير غالباً)، والتحميل الكامل
+        عند أول تحميل على الإطلاق أو كل full_reload_hours. حالة المزامنة محفوظة في
+        المخزن المشترك، فلا يبدأ كل تشغيل (أو كل نسخة) بتحميل كامل.
+        """
         start_time = time.time()
 
         try:
@@ -292,10 +536,16 @@ class AirtableDropdownManager:
             field_name = self.field_names.get(key, 'Name')
             logger.debug(f"بدء تحميل {key} من الحقل {field_name}")
 
-            # تحميل البيانات مع مهلة زمنية
-            values = self.tables[key].get_all_values(field_name=field_name, force_refresh=True)
+            table = self.tables[key]
+            self._restore_sync_state(key, table)
+            records, changed = table.refresh_if_changed(self.full_reload_after)
+            values = table.extract_values(records, field_name)
+            if values:
+                self._save_sync_state(key, table)
 
             elapsed = time.time() - start_time
+            if changed is not None:
+                logger.debug(f"فحص تغييرات {key}: {changed} سجل متغير (استغرق {elapsed:.2f}ث)")
 
             if not values:
                 logger.warning(f"لم يتم العثور على بيانات في {key} (استغرق {elapsed:.2f}ث)")
@@ -311,97 +561,58 @@ class AirtableDropdownManager:
             self.errors[key] = str(e)
             raise
 
-    def _is_cache_valid(self, key: str) -> bool:
-        """التحقق من صلاحية الكاش"""
-        if key not in self._cache or key not in self._cache_timestamps:
-            return False
-
-        age = datetime.now() - self._cache_timestamps[key]
-        return age < self.CACHE_DURATION
-
-    def _cancel_loading_operations(self):
-        """إلغاء جميع عمليات التحميل الجارية"""
-        logger.info("إلغاء عمليات التحميل الجارية...")
-
-        # إلغاء المهام النشطة
-        for future in list(self._active_futures):
-            if not future.done():
-                future.cancel()
-                logger.debug(f"تم إلغاء مهمة تحميل")
-
-        self._active_futures.clear()
-
+    def _restore_sync_state(self, key: str, table: AirtableModel):
+        """
+        بدء المزامنة من الحالة المحفوظة في المخزن (من جلسة سابقة أو من نسخة أخرى
+        حدّثت القائمة بعد هذه النسخة) حتى لا يكون أول تحديث في الجلسة تحميلاً كاملاً
+        """
         with self._load_lock:
-            self._loading = False
-            self._loading_start_time = None
-
-    def get_dropdown_values(self, key: str, force_refresh: bool = False, timeout: float = 20.0) -> List[str]:
-        """الحصول على قيم القائمة المنسدلة مع مهلة زمنية"""
+            if key in self._full_reload:
+                self._full_reload.discard(key)
+                return
         try:
-            # التحقق من وجود الجدول
-            if key not in self.tables:
-                logger.warning(f"الجدول {key} غير موجود في القوائم المنسدلة")
-                return []
-
-            # التحقق من الكاش أولاً
-            if not force_refresh and self._is_cache_valid(key):
-                logger.debug(f"إرجاع قيم {key} من الكاش")
-                return self._cache.get(key, [])
-
-            # إذا كان التحميل جارياً، انتظر قليلاً أو أرجع الكاش القديم
-            if self._loading:
-                logger.debug(f"التحميل جاري - محاولة انتظار {key}")
-
-                # انتظار مع مهلة زمنية
-                start_wait = time.time()
-                while self._loading and (time.time() - start_wait) < timeout:
-                    time.sleep(0.1)
+            state = self.store.load_sync_state(key)
+        except Exception as e:
+            logger.warning(f"فشل قراءة حالة مزامنة {key}: {e}")
+            return
+        if state and table.restore_sync_state(*state):
+            logger.debug(f"استئناف مزامنة {key} من {datetime.fromtimestamp(state[1])}")
 
-                    # إذا أصبحت القيمة متاحة في الكاش أثناء الانتظار
-                    if self._is_cache_valid(key):
-                        logger.debug(f"تم الحصول على {key} من الكاش أثناء الانتظار")
-                        return self._cache.get(key, [])
+    def _save_sync_state(self, key: str, table: AirtableModel):
+        """حفظ سجلات الجدول ووقت المزامنة في المخزن بعد تحديث ناجح"""
+        state = table.get_sync_state()
+        if state is None:
+            return
+        try:
+            self.store.save_sync_state(key, *state)
+        except Exception as e:
+            logger.warning(f"فشل حفظ حالة مزامنة {key}: {e}")
 
-                # إذا انتهت المهلة وما زال التحميل جارياً
-                if self._loading:
-                    logger.warning(f"انتهت مهلة انتظار {key} - إرجاع كاش قديم أو فارغ")
-                    return self._cache.get(key, [])
+    def _is_cache_valid(self, key: str) -> bool:
+        """التحقق من صلاحية الكاش (القيم قد تكون في المخزن ولم تُحمّل للذاكرة بعد)"""
+        if key not in self._cache_timestamps:
+            return False
 
-            # تحميل القائمة في خيط منفصل مع مهلة زمنية
-            try:
-                logger.debug(f"تحميل {key} مباشرة مع مهلة زمنية")
-
-                # استخدام ThreadPoolExecutor لتحميل واحد
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(self._load_single_dropdown_with_timeout, key)
-
-                    try:
-                        values = future.result(timeout=timeout)
-                        if values is not None:
-                            with self._load_lock:
-                                self._cache[key] = values
-                                self._cache_timestamps[key] = datetime.now()
-                            self._save_cache_to_file()
-                            return values
-                        return []
-
-                    except TimeoutError:
-                        logger.warning(f"انتهت مهلة تحميل {key}")
-                        future.cancel()
-                        self.errors[key] = "انتهت المهلة الزمنية"
-                        # إرجاع الكاش القديم إن وجد
-                        return self._cache.get(key, [])
+        age = datetime.now() - self._cache_timestamps[key]
+        return age < timedelta(seconds=self._refresh_interval(key))
+
+    def get_dropdown_values(self, key: str, force_refresh: bool = False, timeout: float = None) -> ValueIndex:
+        """
+        الحصول على فهرس قيم القائمة المنسدلة فوراً (بدون انتظار الشبكة).
+        الفهرس غير قابل للتعديل ويُشارك بالمرجع؛ أي تحديث ينتج فهرساً جديداً برقم إصدار جديد.
+        إذا كانت القائمة قديمة أو غير محملة يُطلب تحديثها في الخلفية، ويصل إشعار عند اكتماله.
+        :param timeout: غير مستخدم (للتوافق مع الاستدعاءات القديمة).
+        """
+        if key not in self.tables:
+            logger.warning(f"الجدول {key} غير موجود في القوائم المنسدلة")
+            return EMPTY_INDEX
 
-            except Exception as e:
-                logger.error(f"خطأ في جلب {key}: {e}")
-                self.errors[key] = str(e)
-                # إرجاع الكاش القديم إن وجد
-                return self._cache.get(key, [])
+        # قوائم on_field_focus لا تبدأ التحميل إلا عند تركيز الحقل (request_load)
+        lazy_until_focus = self.get_load_policy(key) == self.LOAD_ON_FIELD_FOCUS and key not in self._activated
+        if force_refresh or (not lazy_until_focus and not self._is_cache_valid(key)):
+            self.request_refresh(key, force=force_refresh)
 
-        except Exception as e:
-            logger.error(f"خطأ عام في get_dropdown_values لـ {key}: {e}")
-            self.errors[key] = f"خطأ عام: {str(e)}"
-            return []
+        return self._get_cached(key)
 
     def add_value_to_dropdown(self, key: str, value: str) -> bool:
         """إضافة قيمة جديدة إلى القائمة المنسدلة"""
@@ -418,15 +629,20 @@ class AirtableDropdownManager:
             success = self.tables[key].insert_if_not_exists(value.strip(), field_name=field_name)
 
             if success:
-                # تحديث الكاش
+                # إدراج القيمة في موضعها المرتب (فهرس جديد برقم إصدار جديد)
+                clean_value = value.strip()
                 with self._load_lock:
-                    if key in self._cache:
-                        if value.strip() not in self._cache[key]:
-                            self._cache[key].append(value.strip())
-                            self._cache[key].sort()
-                            self._save_cache_to_file()
+                    index = self._get_cached(key).with_value(clean_value)
+                    self._cache[key] = index
+
+                try:
+                    self.store.add_value(key, clean_value)
+                    self._revisions[key] = self.store.get_revision(key)
+                except Exception as e:
+                    logger.warning(f"فشل حفظ الكاش: {e}")
 
                 logger.info(f"[Dropdown] تمت إضافة '{value}' إلى '{key}'")
+                self._notify_observers({key: DropdownChange(key, index, [clean_value], [])})
 
             return success
 
@@ -434,49 +650,35 @@ class AirtableDropdownManager:
             logger.error(f"[Dropdown] فشل إضافة '{value}' إلى '{key}': {e}")
             return False
 
-    def refresh_all(self, force: bool = True):
-        """تحديث جميع القوائم المنسدلة"""
+    def refresh_all(self, force: bool = True, full_reload: bool = False):
+        """
+        تحديث القوائم المنسدلة في الخلفية (القيم الحالية تبقى متاحة حتى وصول الجديدة).
+        :param force: تحديث جميع القوائم، وإلا القوائم منتهية الصلاحية فقط.
+        :param full_reload: إعادة تحميل الجداول بالكامل بدلاً من جلب التغييرات فقط.
+        """
         logger.info("[Dropdown] بدء تحديث جميع القوائم")
 
-        # إيقاف أي تحميل جاري
-        if self._loading:
-            logger.info("إيقاف التحميل الجاري قبل التحديث")
-            self._cancel_loading_operations()
-
-            # انتظار قصير للتأكد من الإيقاف
-            time.sleep(0.5)
-
         if force:
-            # مسح الكاش
             with self._load_lock:
-                self._cache.clear()
-                self._cache_timestamps.clear()
                 self.errors.clear()
 
-        # إعادة التحميل
-        self._start_background_loading()
-
-    def get_all_dropdowns(self, timeout: float = 15.0) -> Dict[str, List[str]]:
-        """الحصول على جميع القوائم المنسدلة مع مهلة زمنية"""
-        # انتظار اكتمال التحميل إذا كان جارياً
-        start_wait = time.time()
-
-        while self._loading and (time.time() - start_wait) < timeout:
-            time.sleep(0.2)
-
-        if self._loading:
-            logger.warning(f"انتهت مهلة انتظار تحميل جميع القوائم ({timeout}s)")
+        if full_reload:
+            with self._load_lock:
+                self._full_reload.update(self.tables)
+            for table in self.tables.values():
+                table.clear_cache()
 
-        result = {}
+        # القوائم الكسولة التي لم تُستخدم بعد تبقى حتى أول استخدام
         for key in self.tables:
-            # محاولة الحصول على القيم مع مهلة زمنية قصيرة
-            try:
-                result[key] = self.get_dropdown_values(key, timeout=3.0)
-            except Exception as e:
-                logger.error(f"خطأ في جلب {key}: {e}")
-                result[key] = []
+            if self._is_active(key) and (force or not self._is_cache_valid(key)):
+                self.request_refresh(key, force=force)
 
-        return result
+    def get_all_dropdowns(self, timeout: float = None) -> Dict[str, ValueIndex]:
+        """
+        الحصول على جميع القوائم المنسدلة فوراً بقيمها الحالية.
+        :param timeout: غير مستخدم (للتوافق مع الاستدعاءات القديمة).
+        """
+        return {key: self.get_dropdown_values(key) for key in self.tables}
 
     def get_field_mapping(self) -> Dict[str, str]:
         """الحصول على خريطة الحقول"""
@@ -490,16 +692,16 @@ class AirtableDropdownManager:
             "Add-on": "addons"
         }
 
-    def get_dropdown_by_field_name(self, field_name: str, timeout: float = 5.0) -> List[str]:
-        """الحصول على قيم القائمة المنسدلة بناءً على اسم الحقل"""
+    def get_dropdown_by_field_name(self, field_name: str, timeout: float = None) -> ValueIndex:
+        """الحصول على قيم القائمة المنسدلة بناءً على اسم الحقل (فوراً)"""
         field_mapping = self.get_field_mapping()
         key = field_mapping.get(field_name)
 
         if key:
-            return self.get_dropdown_values(key, timeout=timeout)
+            return self.get_dropdown_values(key)
 
         logger.warning(f"[Dropdown] لا يوجد ربط للحقل: {field_name}")
-        return []
+        return EMPTY_INDEX
 
     def is_connected(self) -> bool:
         """التحقق من الاتصال"""
@@ -510,30 +712,25 @@ class AirtableDropdownManager:
         try:
             with self._load_lock:
                 # حساب عدد القوائم المحملة بنجاح
-                successful_loads = 0
-                if hasattr(self, '_cache') and self._cache:
-                    successful_loads = len([k for k in self._cache if k not in self.errors])
+                successful_loads = len([k for k in self._cache if k not in self.errors])
 
-                # تقدير وقت التحميل المتبقي
-                estimated_time_remaining = None
-                if self._loading and self._loading_start_time:
-                    elapsed = (datetime.now() - self._loading_start_time).total_seconds()
-                    if elapsed < self.LOADING_TIMEOUT:
-                        estimated_time_remaining = max(0, self.LOADING_TIMEOUT - elapsed)
+                # الثواني المتبقية حتى التحديث التالي لكل قائمة
+                now = time.monotonic()
+                next_refresh = {key: max(at - now, 0.0) for key, at in self._due.items()}
 
                 return {
                     'connected': self.is_connected(),
-                    'loading': getattr(self, '_loading', False),
-                    'tables_count': len(getattr(self, 'tables', {})),
-                    'cached_count': len(getattr(self, '_cache', {})),
+                    'loading': bool(self._refreshing),
+                    'tables_count': len(self.tables),
+                    'cached_count': len(set(self._cache) | set(self._cache_timestamps)),
                     'successful_loads': successful_loads,
-                    'tables': list(getattr(self, 'tables', {}).keys()),
-                    'cached_tables': list(getattr(self, '_cache', {}).keys()),
+                    'tables': list(self.tables.keys()),
+                    'cached_tables': list(self._cache.keys()),
+                    'refreshing': sorted(self._refreshing),
+                    'next_refresh_seconds': next_refresh,
+                    'load_policies': {key: self.get_load_policy(key) for key in self.tables},
                     'api_configured': bool(os.getenv('AIRTABLE_API_KEY') and os.getenv('AIRTABLE_BASE_ID')),
-                    'errors': getattr(self, 'errors', {}).copy(),
-                    'loading_start_time': self._loading_start_time.isoformat() if getattr(self, '_loading_start_time', None) else None,
-                    'estimated_time_remaining': estimated_time_remaining,
-                    'active_futures_count': len(getattr(self, '_active_futures', set()))
+                    'errors': self.errors.copy(),
                 }
         except Exception as e:
             logger.error(f"خطأ في الحصول على حالة مدير القوائم المنسدلة: {e}")
@@ -545,11 +742,10 @@ class AirtableDropdownManager:
                 'successful_loads': 0,
                 'tables': [],
                 'cached_tables': [],
+                'refreshing': [],
+                'next_refresh_seconds': {},
                 'api_configured': False,
                 'errors': {'status_error': str(e)},
-                'loading_start_time': None,
-                'estimated_time_remaining': None,
-                'active_futures_count': 0
             }
 
     def get_error_for_key(self, key: str) -> str:
@@ -573,10 +769,11 @@ class AirtableDropdownManager:
         """الحصول على معلومات الكاش"""
         with self._load_lock:
             cache_info = {}
-            for key in self._cache:
+            for key in self._cache_timestamps:
                 timestamp = self._cache_timestamps.get(key)
                 cache_info[key] = {
-                    'count': len(self._cache[key]),
+                    'count': len(self._cache[key]) if key in self._cache else None,
+                    'loaded': key in self._cache,
                     'timestamp': timestamp.isoformat() if timestamp else None,
                     'age_seconds': (datetime.now() - timestamp).total_seconds() if timestamp else None,
                     'is_valid': self._is_cache_valid(key)
@@ -586,17 +783,16 @@ class AirtableDropdownManager:
     def force_stop_loading(self):
         """إيقاف التحميل بالقوة"""
         logger.warning("إيقاف تحميل القوائم المنسدلة بالقوة")
-        self._cancel_loading_operations()
+        self.stop()
 
         # إضافة رسالة خطأ للجداول التي لم يتم تحميلها
         for key in self.tables:
-            if key not in self._cache:
+            if key not in self._cache and key not in self._cache_timestamps:
                 self.errors[key] = "تم إيقاف التحميل بالقوة"
 
     def __del__(self):
         """تنظيف الموارد عند التدمير"""
         try:
-            if hasattr(self, '_loading') and self._loading:
-                self._cancel_loading_operations()
+            self.stop()
         except:
-            pass
\ No newline at end of file
+            pass
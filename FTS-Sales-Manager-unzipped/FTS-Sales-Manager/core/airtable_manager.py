@@ -33,6 +33,7 @@ class AirtableManager:
 
     # إعدادات الكاش والأداء
     CACHE_DURATION = timedelta(minutes=30)
+    FULL_RELOAD_INTERVAL = timedelta(hours=24)  # تحميل كامل دوري لالتقاط السجلات المحذوفة
     REQUEST_TIMEOUT = 30
     MAX_RETRIES = 3
     RETRY_DELAY = 1.5
@@ -42,7 +43,8 @@ class AirtableManager:
                  config_manager=None,
                  db_manager=None,
                  table_name: str = "",
-                 view_name: str = None):
+                 view_name: str = None,
+                 persist_snapshot: bool = False):
         """
         تهيئة مدير Airtable الموحد
 
@@ -50,17 +52,23 @@ class AirtableManager:
         :param db_manager: مدير قاعدة البيانات
         :param table_name: اسم الجدول
         :param view_name: اسم العرض (اختياري)
+        :param persist_snapshot: حفظ لقطة الجلب الكامل في قاعدة البيانات المحلية
+                                 (للحجوزات فقط: العرض الفوري عند بدء التشغيل)
         """
         self.config = config_manager
         self.db = db_manager
         self.table_name = table_name
         self.view_name = view_name
+        self.persist_snapshot = persist_snapshot
 
         # إعدادات API
         self._setup_api_config()
 
         # إعدادات الكاش
         self.last_fetch = None
+        self.last_full_fetch = None
+        self._last_sync_started = None  # بداية آخر مزامنة ناجحة (نقطة بداية المزامنة التفاضلية)
+        self.snapshot_full_synced_at = None  # وقت آخر مزامنة كاملة للقطة المحلية المحملة
         self.cached_data = []
         self.cache_timestamps = {}
         self._cache_lock = threading.RLock()
@@ -139,8 +147,9 @@ class AirtableManager:
 
         logger.info(f"جلب السجلات من Airtable للجدول: {self.table_name}")
 
-        all_records = []
-        url = self.endpoint
+        # وقت بدء الجلب هو نقطة البداية للمزامنة التفاضلية التالية
+        fetch_started = time.time()
+
         params = {"pageSize": 100}
 
         # إضافة المعاملات
@@ -149,6 +158,37 @@ class AirtableManager:
         if filter_formula:
             params["filterByFormula"] = filter_formula
 
+        try:
+            all_records = self._fetch_all_pages(params)
+        except requests.RequestException:
+            # محاولة إرجاع الكاش القديم
+            if self.cached_data:
+                logger.warning("إرجاع الكاش القديم بسبب فشل الطلب")
+                return self.cached_data
+            raise
+
+        # تحديث الكاش
+        with self._cache_lock:
+            self.cached_data = all_records
+            self.last_fetch = datetime.now()
+            self.cache_timestamps[self.table_name] = datetime.now()
+            if not filter_formula:
+                self.last_full_fetch = self.last_fetch
+                self._last_sync_started = fetch_started
+
+        # حفظ في قاعدة البيانات المحلية (اللقطة الكاملة فقط - وليس نتائج الفلترة)
+        if self.persist_snapshot and self.db and not filter_formula:
+            self._save_to_local_db(all_records, synced_at=fetch_started, view=view or self.view_name)
+
+        logger.info(f"تم جلب {len(all_records)} سجل من {self.table_name}")
+        return all_records
+
+    def _fetch_all_pages(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """جلب جميع صفحات نتيجة الطلب"""
+        all_records = []
+        url = self.endpoint
+        params = dict(params)
+
         while True:
             try:
                 response = requests.get(
@@ -175,24 +215,120 @@ class AirtableManager:
 
             except requests.RequestException as e:
                 logger.error(f"خطأ في جلب السجلات من {self.table_name}: {e}")
-                # محاولة إرجاع الكاش القديم
-                if self.cached_data:
-                    logger.warning("إرجاع الكاش القديم بسبب فشل الطلب")
-                    return self.cached_data
                 raise
 
-        # تحديث الكاش
+        return all_records
+
+    def load_snapshot(self) -> Tuple[List[Dict[str, Any]], Optional[datetime]]:
+        """
+        تحميل آخر لقطة محفوظة محلياً للجدول والعرض الحاليين (بدون اتصال بالشبكة)
+        ووقت آخر مزامنة كاملة لها في snapshot_full_synced_at
+
+        :return: (السجلات، وقت آخر مزامنة) أو ([], None)
+        """
+        if not self.persist_snapshot or not self.db or not hasattr(self.db, 'load_snapshot'):
+            return [], None
+
+        records, synced_at, full_synced_at = self.db.load_snapshot(self.table_name, self.view_name)
+        if not records:
+            return [], None
+
+        # تُستخدم كبديل عند فشل الشبكة، لكنها لا تُعتبر كاشاً صالحاً
         with self._cache_lock:
-            self.cached_data = all_records
+            if not self.cached_data:
+                self.cached_data = records
+            self.snapshot_full_synced_at = datetime.fromtimestamp(full_synced_at) if full_synced_at else None
+
+        return records, datetime.fromtimestamp(synced_at)
+
+    def sync_changes(self, since: datetime) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        مزامنة تفاضلية: جلب السجلات المعدلة/المضافة منذ آخر مزامنة ودمجها مع الكاش
+
+        السجلات المحذوفة لا تظهر في الاستعلام التفاضلي، لذلك يجب إجراء مزامنة كاملة
+        عندما تصبح آخر مزامنة كاملة أقدم من CACHE_DURATION (المزامنة التفاضلية لا تجددها).
+
+        :param since: وقت آخر مزامنة
+        :return: (جميع السجلات بعد الدمج، عدد السجلات المتغيرة)
+        """
+        fetch_started = time.time()
+
+        # هامش دقيقة لتفادي اختلاف الساعة بين الجهاز والخادم
+        since_utc = datetime.utcfromtimestamp(since.timestamp() - 60)
+        params = {
+            "pageSize": 100,
+            "filterByFormula": f"IS_AFTER(LAST_MODIFIED_TIME(), '{since_utc.strftime('%Y-%m-%dT%H:%M:%S.000Z')}')"
+        }
+        if self.view_name:
+            params["view"] = self.view_name
+
+        changed = self._fetch_all_pages(params)
+
+        with self._cache_lock:
+            changed_by_id = {record['id']: record for record in changed}
+            merged = [changed_by_id.pop(record['id'], record) for record in self.cached_data]
+            merged.extend(changed_by_id.values())
+            self.cached_data = merged
             self.last_fetch = datetime.now()
             self.cache_timestamps[self.table_name] = datetime.now()
+            self._last_sync_started = fetch_started
 
-        # حفظ في قاعدة البيانات المحلية
-        if self.db:
-            self._save_to_local_db(all_records)
+        if self.persist_snapshot and self.db and hasattr(self.db, 'save_records'):
+            self.db.save_records(self.table_name, changed, view_name=self.view_name,
+                                 synced_at=fetch_started, replace=False)
 
-        logger.info(f"تم جلب {len(all_records)} سجل من {self.table_name}")
-        return all_records
+        logger.info(f"مزامنة تفاضلية لـ {self.table_name}: {len(changed)} سجل متغير")
+        return merged, len(changed)
+
+    def refresh_if_changed(self, full_reload_after: timedelta = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        تحديث الكاش بأقل عدد من الطلبات:
+        - أول تحميل، أو مرور full_reload_after منذ آخر تحميل كامل: تحميل كامل
+          (واجهة Airtable لا توفر عدد السجلات، فالمحذوف لا يُكتشف إلا بالتحميل الكامل).
+        - غير ذلك: طلب واحد للسجلات المعدلة منذ آخر مزامنة، وغالباً يرجع فارغاً.
+
+        :return: (السجلات، عدد السجلات المتغيرة أو None عند التحميل الكامل)
+        """
+        if full_reload_after is None:
+            full_reload_after = self.FULL_RELOAD_INTERVAL
+
+        with self._cache_lock:
+            last_sync_started = self._last_sync_started
+            last_full_fetch = self.last_full_fetch
+
+        if (last_sync_started is None or last_full_fetch is None
+                or datetime.now() - last_full_fetch >= full_reload_after):
+            return self.fetch_records(force_refresh=True), None
+
+        return self.sync_changes(datetime.fromtimestamp(last_sync_started))
+
+    def get_sync_state(self) -> Optional[Tuple[List[Dict[str, Any]], float, float]]:
+        """
+        حالة المزامنة الحالية لحفظها خارج الجلسة (انظر restore_sync_state)
+
+        :return: (السجلات، بداية آخر مزامنة، وقت آخر تحميل كامل) بثواني epoch،
+                 أو None قبل أول تحميل كامل
+        """
+        with self._cache_lock:
+            if self._last_sync_started is None or self.last_full_fetch is None:
+                return None
+            return self.cached_data, self._last_sync_started, self.last_full_fetch.timestamp()
+
+    def restore_sync_state(self, records: List[Dict[str, Any]], synced_at: float, full_synced_at: float) -> bool:
+        """
+        استئناف المزامنة من حالة محفوظة (من جلسة سابقة أو نسخة أخرى من التطبيق)
+        حتى يكون التحديث التالي في refresh_if_changed تفاضلياً وليس تحميلاً كاملاً.
+        تُتجاهل الحالة إذا كانت أقدم من مزامنة هذه الجلسة.
+
+        :return: True إذا اعتُمدت الحالة
+        """
+        with self._cache_lock:
+            if self._last_sync_started is not None and synced_at <= self._last_sync_started:
+                return False
+            self.cached_data = records
+            self._last_sync_started = synced_at
+            self.last_full_fetch = datetime.fromtimestamp(full_synced_at)
+            return True
 
     def fetch_record(self, record_id: str) -> Optional[Dict[str, Any]]:
         """جلب سجل واحد بواسطة ID"""
@@ -219,6 +355,29 @@ class AirtableManager:
                     logger.error(f"فشل جلب السجل {record_id} نهائياً: {e}")
                     return None
 
+    def fetch_records_by_ids(self, record_ids: List[str], chunk_size: int = 50) -> Dict[str, Dict[str, Any]]:
+        """
+        جلب سجلات محددة بحالتها الحالية على الخادم (طلب لكل chunk_size معرف)
+        دون تغيير الكاش. السجلات المحذوفة أو الخارجة من العرض لا تُرجع.
+
+        :raises requests.RequestException: عند فشل الاتصال
+        :return: {معرف السجل: السجل}
+        """
+        # معرفات Airtable أحرف وأرقام فقط: أي معرف آخر لا يدخل في الصيغة
+        ids = list(dict.fromkeys(record_id for record_id in record_ids if record_id and record_id.isalnum()))
+        records = {}
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            params = {
+                "pageSize": 100,
+                "filterByFormula": "OR(" + ",".join(f"RECORD_ID()='{record_id}'" for record_id in chunk) + ")"
+            }
+            if self.view_name:
+                params["view"] = self.view_name
+            for record in self._fetch_all_pages(params):
+                records[record['id']] = record
+        return records
+
     def create_record(self, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """إنشاء سجل جديد مع معالجة صحيحة لحقل Assigned To"""
         # معالجة خاصة للحقول المعقدة
@@ -400,16 +559,21 @@ class AirtableManager:
     def get_all_values(self, field_name: str = "Name", force_refresh: bool = False) -> List[str]:
         """جلب جميع القيم الفريدة من حقل معين"""
         records = self.fetch_records(force_refresh=force_refresh)
-        values = []
+        return self.extract_values(records, field_name)
+
+    @staticmethod
+    def extract_values(records: List[Dict[str, Any]], field_name: str) -> List[str]:
+        """القيم الفريدة المرتبة لحقل معين من قائمة سجلات (بدون طلبات شبكة)"""
+        values = set()
 
         for record in records:
             fields = record.get('fields', {})
             value = fields.get(field_name)
-            if value and value not in values:
+            if value:
                 # تنظيف القيمة
                 clean_value = str(value).strip()
-                if clean_value and clean_value not in values:
-                    values.append(clean_value)
+                if clean_value:
+                    values.add(clean_value)
 
         return sorted(values)
 
@@ -752,15 +916,17 @@ class AirtableManager:
         """إلغاء الكاش"""
         with self._cache_lock:
             self.last_fetch = None
+            self.last_full_fetch = None
+            self._last_sync_started = None
             self.cached_data = []
             if self.table_name in self.cache_timestamps:
                 del self.cache_timestamps[self.table_name]
 
-    def _save_to_local_db(self, records: List[Dict[str, Any]]):
-        """حفظ البيانات في قاعدة البيانات المحلية"""
+    def _save_to_local_db(self, records: List[Dict[str, Any]], synced_at: float = None, view: str = None):
+        """حفظ البيانات في قاعدة البيانات المحلية (في الخلفية عبر خيط الكتابة)"""
         try:
             if self.db and hasattr(self.db, 'save_records'):
-                self.db.save_records(self.table_name, records)
+                self.db.save_records(self.table_name, records, view_name=view, synced_at=synced_at)
         except Exception as e:
             logger.warning(f"فشل حفظ البيانات محلياً: {e}")
 
@@ -944,8 +1110,9 @@ def create_users_manager(config_manager=None, db_manager=None) -> AirtableManage
 class AirtableModel(AirtableManager):
     """كلاس للتوافق مع الكود القديم - وراثة من AirtableManager"""
 
-    def __init__(self, config_manager, db_manager, table_name: str, view_name: str = None):
-        super().__init__(config_manager, db_manager, table_name, view_name)
+    def __init__(self, config_manager, db_manager, table_name: str, view_name: str = None,
+                 persist_snapshot: bool = False):
+        super().__init__(config_manager, db_manager, table_name, view_name, persist_snapshot)
         logger.info(f"تم إنشاء AirtableModel (توافق) للجدول: {table_name}")
 
     # دوال التوافق
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+core/booking_query.py
+
+محرك استعلام محلي فوق نسخة الحجوزات المحملة.
+
+تُستخرج الحقول المهمة من سجلات Airtable إلى جدول SQLite في الذاكرة بأعمدة
+مفهرسة، وتُترجم الاستعلامات (فلترة، ترتيب، تجميع، مجاميع على Net Rate،
+وتجميع التواريخ على Date Trip) إلى SQL بدلاً من المرور على قوائم القواميس.
+
+البحث النصي يستخدم فهرس FTS5 بمقاطع ثلاثية (trigram) على مفاتيح البحث الموحدة،
+فالبحث عن جزء من كلمة لا يمر على كل الصفوف؛ الكلمات الأقصر من 3 أحرف (ونسخ
+SQLite بدون FTS5) تُفحص بمسح النص.
+
+مثال:
+    engine = BookingQueryEngine()
+    engine.load(records)
+    engine.query().where('Booking Status', '=', 'Pending').count()
+    engine.query().where('Date Trip', '>=', '2025-01-01').sum('Net Rate')
+    engine.query().group_by('Date Trip', bucket='month')
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.logger import logger
+from core.text_normalize import search_key
+
+
+# حقل Airtable -> (اسم العمود، النوع)
+FIELD_COLUMNS: Dict[str, Tuple[str, str]] = {
+    'Booking Nr.': ('booking_nr', 'TEXT'),
+    'Customer Name': ('customer_name', 'TEXT'),
+    'Hotel Name': ('hotel_name', 'TEXT'),
+    'Agency': ('agency', 'TEXT'),
+    'trip Name': ('trip_name', 'TEXT'),
+    'Date Trip': ('date_trip', 'TEXT'),
+    'Booking Status': ('booking_status', 'TEXT'),
+    'Guide': ('guide', 'TEXT'),
+    'des': ('destination', 'TEXT'),
+    'Assigned To': ('assigned_to', 'TEXT'),
+    'Net Rate': ('net_rate', 'REAL'),
+    'Total price USD': ('total_usd', 'REAL'),
+    'ADT': ('adt', 'REAL'),
+    'CHD': ('chd', 'REAL'),
+}
+
+# الأعمدة المفهرسة (الأكثر استخداماً في الفلترة والتجميع)
+INDEXED_FIELDS = ('Date Trip', 'Booking Status', 'Agency', 'Assigned To', 'trip Name')
+
+# تجميع التواريخ (التاريخ مخزن بصيغة YYYY-MM-DD)
+DATE_BUCKETS = {
+    'day': "date_trip",
+    'week': "strftime('%Y-W%W', date_trip)",
+    'month': "substr(date_trip, 1, 7)",
+    'year': "substr(date_trip, 1, 4)",
+}
+
+OPERATORS = {'=', '!=', '<', '<=', '>', '>='}
+
+TRIGRAM = 3  # أقصر كلمة يمكن البحث عنها في فهرس FTS5
+
+
+def _column_for(field_name: str) -> Tuple[str, str]:
+    """اسم العمود ونوعه لحقل Airtable"""
+    if field_name not in FIELD_COLUMNS:
+        raise ValueError(f"الحقل غير مدعوم في الاستعلام المحلي: {field_name}")
+    return FIELD_COLUMNS[field_name]
+
+
+def _to_number(value: Any) -> Optional[float]:
+    """تحويل القيمة إلى رقم إن أمكن"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_text(field_name: str, value: Any) -> Optional[str]:
+    """تحويل قيمة حقل إلى نص قابل للمقارنة"""
+    if value is None:
+        return None
+    if field_name == 'Assigned To':
+        return value.get('id') if isinstance(value, dict) else str(value)
+    if field_name == 'Date Trip':
+        return str(value)[:10]
+    if isinstance(value, list):
+        return ', '.join(str(v) for v in value)
+    return str(value)
+
+
+class BookingQuery:
+    """استعلام قابل للتسلسل يُترجم إلى SQL عند التنفيذ"""
+
+    def __init__(self, engine: 'BookingQueryEngine'):
+        self._engine = engine
+        self._conditions: List[str] = []
+        self._params: List[Any] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+
+    # =============== بناء الاستعلام ===============
+
+    def where(self, field_name: str, op: str, value: Any) -> 'BookingQuery':
+        """
+        إضافة شرط على حقل.
+        :param op: أحد = != < <= > >= أو in أو contains أو startswith
+        """
+        column, col_type = _column_for(field_name)
+        convert = _to_number if col_type == 'REAL' else (lambda v: _to_text(field_name, v))
+
+        if op == 'in':
+            values = [convert(v) for v in value]
+            if not values:
+                self._conditions.append("0")
+                return self
+            self._conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            self._params.extend(values)
+        elif op == 'contains':
+            self._conditions.append(f"instr(lower({column}), ?) > 0")
+            self._params.append(str(value).lower())
+        elif op == 'startswith':
+            self._conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+            escaped = str(value).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            self._params.append(escaped + '%')
+        elif op in OPERATORS:
+            if value is None and op in ('=', '!='):
+                self._conditions.append(f"{column} IS {'NOT ' if op == '!=' else ''}NULL")
+            else:
+                self._conditions.append(f"{column} {op} ?")
+                self._params.append(convert(value))
+        else:
+            raise ValueError(f"عامل غير مدعوم: {op}")
+        return self
+
+    def search(self, text: str) -> 'BookingQuery':
+        """بحث نصي في جميع الحقول (كل كلمة يجب أن تظهر، بمفاتيح البحث الموحدة)"""
+        words = search_key(text or '').split()
+        if self._engine._has_fts:
+            # كل كلمة عبارة FTS5 (مطابقة جزء من النص)، والعبارات المتتالية تعني AND
+            indexed = [word for word in words if len(word) >= TRIGRAM]
+            if indexed:
+                self._conditions.append("pos IN (SELECT rowid FROM bookings_fts WHERE bookings_fts MATCH ?)")
+                self._params.append(' '.join('"' + word.replace('"', '""') + '"' for word in indexed))
+            for word in words:
+                if len(word) < TRIGRAM:
+                    self._conditions.append(
+                        "pos IN (SELECT rowid FROM bookings_fts WHERE instr(search_text, ?) > 0)")
+                    self._params.append(word)
+        else:
+            for word in words:
+                self._conditions.append("instr(search_text, ?) > 0")
+                self._params.append(word)
+        return self
+
+    def order_by(self, field_name: str, descending: bool = False) -> 'BookingQuery':
+        """ترتيب النتائج (يمكن التسلسل لعدة أعمدة)"""
+        column, _ = _column_for(field_name)
+        self._order.append(f"{column} IS NULL, {column} {'DESC' if descending else 'ASC'}")
+        return self
+
+    def limit(self, count: int) -> 'BookingQuery':
+        self._limit = int(count)
+        return self
+
+    # =============== التنفيذ ===============
+
+    def _where_sql(self) -> str:
+        return f" WHERE {' AND '.join(self._conditions)}" if self._conditions else ""
+
+    def _select_sql(self, select: str) -> str:
+        sql = f"SELECT {select} FROM bookings{self._where_sql()}"
+        sql += f" ORDER BY {', '.join(self._order)}" if self._order else " ORDER BY pos"
+        if self._limit is not None:
+            sql += f" LIMIT {self._limit}"
+        return sql
+
+    def records(self) -> List[Dict[str, Any]]:
+        """السجلات المطابقة (نفس كائنات السجلات الأصلية)"""
+        # القفل يضمن أن المواقع والسجلات من نفس النسخة المفهرسة
+        with self._engine._lock:
+            return self._engine._records_at(
+                pos for (pos,) in self._engine._execute(self._select_sql("pos"), self._params))
+
+    def ids(self) -> List[str]:
+        """معرفات السجلات المطابقة"""
+        return [record_id for (record_id,) in self._engine._execute(self._select_sql("id"), self._params)]
+
+    def count(self) -> int:
+        rows = self._engine._execute(f"SELECT COUNT(*) FROM bookings{self._where_sql()}", self._params)
+        return rows[0][0] if rows else 0
+
+    def sum(self, field_name: str = 'Net Rate') -> float:
+        return self._aggregate('SUM', field_name) or 0.0
+
+    def avg(self, field_name: str = 'Net Rate') -> float:
+        return self._aggregate('AVG', field_name) or 0.0
+
+    def _aggregate(self, func: str, field_name: str) -> Optional[float]:
+        column, _ = _column_for(field_name)
+        rows = self._engine._execute(f"SELECT {func}({column}) FROM bookings{self._where_sql()}", self._params)
+        return rows[0][0] if rows else None
+
+    def group_by(self, field_name: str, bucket: str = None, value_field: str = 'Net Rate') -> List[Dict[str, Any]]:
+        """
+        تجميع النتائج حسب حقل مع عدد ومجموع ومتوسط value_field.
+        :param bucket: لحقل Date Trip فقط: day أو week أو month أو year.
+        :return: [{'key', 'count', 'sum', 'avg'}, ...] مرتبة حسب المفتاح.
+        """
+        column, _ = _column_for(field_name)
+        if bucket:
+            if field_name != 'Date Trip' or bucket not in DATE_BUCKETS:
+                raise ValueError(f"تجميع غير مدعوم: {field_name}/{bucket}")
+            column = DATE_BUCKETS[bucket]
+        value_column, _ = _column_for(value_field)
+
+        sql = (f"SELECT {column} AS key, COUNT(*), COALESCE(SUM({value_column}), 0), AVG({value_column}) "
+               f"FROM bookings{self._where_sql()} GROUP BY key ORDER BY key")
+        return [
+            {'key': key, 'count': count, 'sum': total, 'avg': average or 0.0}
+            for key, count, total, average in self._engine._execute(sql, self._params)
+        ]
+
+
+class BookingQueryEngine:
+    """فهرس محلي للحجوزات في SQLite (في الذاكرة) مع واجهة استعلام موحدة"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._records: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._has_fts = False  # نص البحث في bookings_fts (FTS5) وليس في عمود search_text
+
+    def load(self, records: List[Dict[str, Any]]):
+        """
+        إعادة بناء الفهرس من قائمة السجلات.
+        يتم البناء في اتصال جديد ثم التبديل، حتى لا تنتظر الاستعلامات الجارية مدة البناء.
+        """
+        start = time.perf_counter()
+        records = list(records)
+
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        try:
+            conn.execute("CREATE VIRTUAL TABLE bookings_fts USING fts5(search_text, tokenize='trigram')")
+            has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite أقدم من 3.34 أو بدون FTS5: البحث بمسح عمود search_text
+            has_fts = False
+
+        columns = [column for column, _ in FIELD_COLUMNS.values()]
+        conn.execute(
+            "CREATE TABLE bookings (pos INTEGER PRIMARY KEY, id TEXT, search_text TEXT, "
+            + ", ".join(f"{column} {col_type}" + (" COLLATE NOCASE" if col_type == 'TEXT' else "")
+                        for column, col_type in FIELD_COLUMNS.values())
+            + ")"
+        )
+        rows = [self._row_for(pos, record) for pos, record in enumerate(records)]
+        if has_fts:
+            conn.executemany("INSERT INTO bookings_fts (rowid, search_text) VALUES (?, ?)",
+                             ((row[0], row[2]) for row in rows))
+            rows = [(row[0], row[1], None, *row[3:]) for row in rows]
+        conn.executemany(
+            f"INSERT INTO bookings (pos, id, search_text, {', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * (len(columns) + 3))})",
+            rows
+        )
+        conn.execute("CREATE UNIQUE INDEX idx_bookings_id ON bookings(id)")
+        for field_name in INDEXED_FIELDS:
+            column, _ = FIELD_COLUMNS[field_name]
+            conn.execute(f"CREATE INDEX idx_bookings_{column} ON bookings({column})")
+        conn.commit()
+
+        with self._lock:
+            old_conn = self._conn
+            self._conn = conn
+            self._has_fts = has_fts
+            self._records = records
+            self._positions = {record.get('id'): pos for pos, record in enumerate(records)}
+        if old_conn:
+            old_conn.close()
+
+        logger.debug(f"BookingQueryEngine: فهرسة {len(records)} حجز خلال {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    @staticmethod
+    def _row_for(pos: int, record: Dict[str, Any]) -> Tuple:
+        fields = record.get('fields', {})
+        values = []
+        for field_name, (_, col_type) in FIELD_COLUMNS.items():
+            value = fields.get(field_name)
+            values.append(_to_number(value) if col_type == 'REAL' else _to_text(field_name, value))
+        return (pos, record.get('id'), search_key(str(fields)), *values)
+
+    def query(self) -> BookingQuery:
+        """بدء استعلام جديد"""
+        return BookingQuery(self)
+
+    def get_by_ids(self, record_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """السجلات حسب المعرف (المعرفات غير الموجودة تُتجاهل)"""
+        with self._lock:
+            return {record_id: self._records[self._positions[record_id]]
+                    for record_id in record_ids if record_id in self._positions}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _execute(self, sql: str, params: List[Any]) -> List[Tuple]:
+        with self._lock:
+            if not self._conn:
+                return []
+            return self._conn.execute(sql, params).fetchall()
+
+    def _records_at(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = self._records
+            return [records[pos] for pos in positions]
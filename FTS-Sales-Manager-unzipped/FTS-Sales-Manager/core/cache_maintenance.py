@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+core/cache_maintenance.py
+
+خدمة صيانة الكاش المحلي في الخلفية:
+- حذف السجلات منتهية الصلاحية حسب مدة صلاحية كل جدول (table_ttl_hours).
+- إخلاء أقل السجلات استخداماً (LRU) عند تجاوز الحجم المسموح (max_cache_size_mb).
+- تنظيف ملف قاعدة البيانات تدريجياً (incremental vacuum) في وقت الخمول فقط.
+- حذف القوائم المنسدلة القديمة من مخزن القوائم (DropdownStore).
+- تقرير بحجم الكاش لكل جدول.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from core.dropdown_store import DropdownStore
+from core.logger import logger
+
+
+class CacheMaintenanceService:
+    """خدمة صيانة الكاش: انتهاء الصلاحية، الإخلاء حسب الحجم، والتنظيف في وقت الخمول"""
+
+    VACUUM_STEP_PAUSE = 0.5  # مهلة بين خطوات التنظيف حتى لا يُحتكر خيط الكتابة
+
+    def __init__(self, config_manager, db_manager, dropdown_store: Optional[DropdownStore] = None):
+        self.config_mgr = config_manager
+        self.db_mgr = db_manager
+        self.dropdown_store = dropdown_store or DropdownStore.for_config(config_manager)
+
+        settings = config_manager.get_cache_settings()
+        self.max_cache_bytes = int(float(settings.get('max_cache_size_mb', 200)) * 1024 * 1024)
+        self.table_ttl_hours: Dict[str, float] = dict(settings.get('table_ttl_hours') or {})
+        self.dropdown_ttl_seconds = float(settings.get('dropdown_cache_ttl_hours', 24)) * 3600
+        self.interval = float(settings.get('maintenance_interval_seconds', 300))
+        self.initial_delay = float(settings.get('maintenance_initial_delay_seconds', 60))
+        self.idle_after = float(settings.get('idle_vacuum_after_seconds', 60))
+        self.vacuum_pages_per_step = int(settings.get('vacuum_pages_per_step', 256))
+
+        self._stop_event = threading.Event()
+        self._run_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report: Dict[str, Any] = {}
+
+    # =============== التشغيل والإيقاف ===============
+
+    def start(self):
+        """تشغيل خيط الصيانة الدورية"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True, name="CacheMaintenance")
+        self._thread.start()
+        logger.info(f"تم تشغيل خدمة صيانة الكاش (كل {int(self.interval)} ثانية)")
+
+    def stop(self, timeout: float = 5.0):
+        """إيقاف خيط الصيانة"""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _run_loop(self):
+        """حلقة الصيانة: أول تشغيل بعد مهلة حتى لا يتأثر بدء التطبيق"""
+        if self._stop_event.wait(self.initial_delay):
+            return
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"خطأ في صيانة الكاش: {e}", exc_info=True)
+            if self._stop_event.wait(self.interval):
+                break
+
+    # =============== دورة الصيانة ===============
+
+    def run_once(self, vacuum: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        تنفيذ دورة صيانة كاملة.
+        :param vacuum: فرض التنظيف (True) أو منعه (False)، الافتراضي حسب وقت الخمول.
+        :return: تقرير بما تم حذفه وحجم الكاش الحالي.
+        """
+        with self._run_lock:
+            report: Dict[str, Any] = {'expired': {}, 'evicted': 0, 'dropdown_expired': 0, 'vacuumed_pages': 0}
+
+            # أوقات الوصول مطلوبة قبل الإخلاء حسب LRU
+            self._wait(self.db_mgr.flush_access_times())
+
+            for table_name, hours in self.table_ttl_hours.items():
+                if not hours or float(hours) <= 0:
+                    continue
+                # المفتاح default يعني جدول الكاش العام
+                target = None if table_name == 'default' else table_name
+                report['expired'][table_name] = self._wait(
+                    self.db_mgr.evict_expired(target, float(hours) * 3600)) or 0
+
+            if self.max_cache_bytes > 0:
+                report['evicted'] = self._wait(self.db_mgr.evict_to_budget(self.max_cache_bytes)) or 0
+
+            report['dropdown_expired'] = self._prune_dropdown_cache()
+
+            if vacuum is None:
+                vacuum = self.db_mgr.seconds_since_activity() >= self.idle_after
+            if vacuum:
+                report['vacuumed_pages'] = self._vacuum_while_idle()
+
+            report['sizes'] = self.get_size_report()
+            self.last_report = report
+
+        logger.info(
+            f"صيانة الكاش: منتهي الصلاحية={sum(report['expired'].values())}، "
+            f"مُخلى={report['evicted']}، قوائم قديمة={report['dropdown_expired']}، "
+            f"صفحات محررة={report['vacuumed_pages']}، الحجم={self._format_mb(report['sizes'].get('total_bytes', 0))}"
+        )
+        return report
+
+    def _vacuum_while_idle(self) -> int:
+        """تنظيف الملف على خطوات صغيرة طالما التطبيق في وضع الخمول"""
+        total = 0
+        while not self._stop_event.is_set():
+            freed = self._wait(self.db_mgr.incremental_vacuum(self.vacuum_pages_per_step)) or 0
+            total += freed
+            if freed <= 0 or self.db_mgr.seconds_since_activity() < self.idle_after:
+                break
+            if self._stop_event.wait(self.VACUUM_STEP_PAUSE):
+                break
+        return total
+
+    def _prune_dropdown_cache(self) -> int:
+        """حذف القوائم المنسدلة الأقدم من مدة الصلاحية من المخزن"""
+        if self.dropdown_ttl_seconds <= 0:
+            return 0
+
+        try:
+            removed = self.dropdown_store.expire(self.dropdown_ttl_seconds)
+        except Exception as e:
+            logger.warning(f"فشل تنظيف كاش القوائم: {e}")
+            return 0
+
+        if removed:
+            logger.info(f"تم حذف {removed} قائمة منسدلة منتهية الصلاحية من الكاش")
+        return removed
+
+    # =============== التقارير والمسح ===============
+
+    def get_size_report(self) -> Dict[str, Any]:
+        """حجم الكاش لكل جدول بالإضافة لملف القوائم المنسدلة"""
+        info = self.db_mgr.get_cache_size_info()
+        tables = {key: value for key, value in info.items() if isinstance(value, dict)}
+        dropdown_bytes = self.dropdown_store.size_bytes()
+
+        return {
+            'tables': tables,
+            'dropdown_cache_bytes': dropdown_bytes,
+            'database_bytes': info.get('database_bytes', 0),
+            'free_bytes': info.get('free_bytes', 0),
+            'total_bytes': info.get('file_bytes', 0) + dropdown_bytes,
+            'budget_bytes': self.max_cache_bytes,
+        }
+
+    def clear_all(self) -> int:
+        """
+        مسح كامل للكاش المحلي (قاعدة البيانات ومخزن القوائم) وتحرير المساحة.
+        :return: عدد البايتات التي تم تحريرها.
+        """
+        with self._run_lock:
+            before = self.get_size_report()['total_bytes']
+            self._wait(self.db_mgr.clear_cache())
+            self.dropdown_store.clear()
+            self._wait(self.db_mgr.incremental_vacuum(0))
+            freed = max(before - self.get_size_report()['total_bytes'], 0)
+
+        logger.info(f"تم مسح الكاش المحلي بالكامل ({self._format_mb(freed)})")
+        return freed
+
+    @staticmethod
+    def _wait(future) -> Any:
+        """انتظار نتيجة عملية كتابة (خيط الصيانة وحده ينتظر، وليس خيط الواجهة)"""
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=60)
+        except Exception as e:
+            logger.warning(f"فشلت عملية صيانة الكاش: {e}")
+            return None
+
+    @staticmethod
+    def _format_mb(size_bytes: int) -> str:
+        return f"{size_bytes / (1024 * 1024):.1f} MB"
@@ -145,6 +145,23 @@ class ConfigManager:
             'cache_settings': {
                 'enable_cache': True,
                 'default_cache_duration': 15,
+                'compress_payloads': True,
+                'compression_dictionary': True,
+                'writer_commit_interval_ms': 5,
+                'writer_batch_size': 500,
+                'max_cache_size_mb': 200,
+                'table_ttl_hours': {
+                    'List V2': 720,
+                    'Users': 168,
+                    'default': 336
+                },
+                'dropdown_cache_ttl_hours': 24,
+                'maintenance_interval_seconds': 300,
+                'maintenance_initial_delay_seconds': 60,
+                'idle_vacuum_after_seconds': 60,
+                'vacuum_pages_per_step': 256,
+                'shared_cache_dir': 'cache',
+                'shared_users_ttl_minutes': 10,
                 'view_cache_duration': {
                     'All Records': 30,
                     'Today\'s Bookings': 5,
@@ -152,6 +169,32 @@ class ConfigManager:
                     'This Month': 60
                 }
             },
+            'dropdown_settings': {
+                'refresh_minutes': {
+                    'default': 60,
+                    'agencies': 30,
+                    'management_options': 240,
+                    'addons': 240
+                },
+                'refresh_jitter': 0.1,
+                'retry_seconds': 120,
+                'full_reload_hours': 24,
+                'shared_poll_seconds': 5,
+                'refresh_lease_seconds': 120,
+                'load_policies': {
+                    'default': 'eager',
+                    'management_options': 'on_field_focus',
+                    'addons': 'on_field_focus'
+                }
+            },
+            'search_settings': {
+                'transliterate': False,
+                'usage_ranking': {
+                    'enabled': True,
+                    'half_life_days': 30,
+                    'max_entries_per_list': 50
+                }
+            },
             'performance_settings': {
                 'records_per_page': 100,
                 'enable_lazy_loading': True,
@@ -354,7 +397,39 @@ class ConfigManager:
             'enable_cache': True,
             'default_cache_duration': 15,
             'max_cache_size': 1000,
-            'clear_on_logout': True
+            'clear_on_logout': True,
+            'compress_payloads': True,
+            'compression_dictionary': True,
+            'writer_commit_interval_ms': 5,
+            'writer_batch_size': 500,
+            'max_cache_size_mb': 200,
+            'table_ttl_hours': {'List V2': 720, 'Users': 168, 'default': 336},
+            'dropdown_cache_ttl_hours': 24,
+            'maintenance_interval_seconds': 300,
+            'maintenance_initial_delay_seconds': 60,
+            'idle_vacuum_after_seconds': 60,
+            'vacuum_pages_per_step': 256,
+            'shared_cache_dir': 'cache',
+            'shared_users_ttl_minutes': 10
+        })
+
+    def get_dropdown_settings(self) -> Dict[str, Any]:
+        """الحصول على إعدادات تحديث القوائم المنسدلة"""
+        return self.get_setting('dropdown_settings', {
+            'refresh_minutes': {'default': 60, 'agencies': 30, 'management_options': 240, 'addons': 240},
+            'refresh_jitter': 0.1,
+            'retry_seconds': 120,
+            'full_reload_hours': 24,
+            'shared_poll_seconds': 5,
+            'refresh_lease_seconds': 120,
+            'load_policies': {'default': 'eager', 'management_options': 'on_field_focus', 'addons': 'on_field_focus'}
+        })
+
+    def get_search_settings(self) -> Dict[str, Any]:
+        """الحصول على إعدادات البحث (توحيد مفاتيح البحث)"""
+        return self.get_setting('search_settings', {
+            'transliterate': False,
+            'usage_ranking': {'enabled': True, 'half_life_days': 30, 'max_entries_per_list': 50}
         })
 
     def is_cache_enabled(self) -> bool:
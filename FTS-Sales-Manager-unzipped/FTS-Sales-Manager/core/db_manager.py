@@ -4,14 +4,31 @@ core/db_manager.py
 
 تدير هذه الفئة الاتصال بقاعدة بيانات SQLite المحلية لاستخدامها ككاش (Cache) للبيانات
 المستخرجة من Airtable. توفر واجهات لحفظ واسترجاع السجلات المؤقتة مع دعم جداول متعددة.
+
+تُضغط البيانات المخزنة (JSON) بشكل شفاف باستخدام zlib مع قاموس مشترك اختياري
+مبني على أسماء حقول Airtable، وتبقى السجلات القديمة المخزنة كنص قابلة للقراءة.
+القواميس المدرَّبة محفوظة في قاعدة البيانات نفسها، فالقاموس الذي درّبته نسخة
+أخرى من التطبيق تشارك الملف يُحمَّل عند أول سجل يحتاجه.
+
+جميع عمليات الكتابة تمر عبر خيط كتابة وحيد (CacheWriter) يجمع العمليات المتزامنة
+في معاملة واحدة (Group Commit)، فلا ينتظر خيط الواجهة تنفيذ الـ commit أبداً.
+القراءة تتم عبر اتصال مستقل في وضع WAL فلا تنتظر معاملة الكتابة الجارية.
 """
 
 # ------------------------------------------------------------
 # استيرادات المكتبات القياسية
 # ------------------------------------------------------------
+import json
+import os
+import queue
 import sqlite3
 import threading
-from typing import Any, Dict, List, Optional
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 # ------------------------------------------------------------
 # استيرادات وحدات المشروع
@@ -19,24 +36,148 @@ from typing import Any, Dict, List, Optional
 from core.logger import logger
 
 
+# ------------------------------------------------------------
+# إعدادات ضغط البيانات
+# ------------------------------------------------------------
+# بايت الترويسة الأول يحدد طريقة الترميز
+CODEC_ZLIB = 0x01           # zlib بدون قاموس
+CODEC_ZLIB_DICT = 0x02      # zlib مع قاموس مشترك (يتبعه رقم القاموس في بايتين)
+
+COMPRESSION_LEVEL = 6
+MIN_COMPRESS_SIZE = 64      # لا فائدة من ضغط البيانات الأصغر من ذلك (بالبايت)
+BUILTIN_DICTIONARY_ID = 1
+MAX_DICTIONARY_SIZE = 32 * 1024  # الحد الأقصى لنافذة zlib
+
+# جداول الكاش المحلية
+CACHE_TABLES = ("users_cache", "bookings_cache", "records_cache")
+
+# حقول بيانات الدخول: لا تُكتب أبداً في الكاش المحلي أو المشترك
+CREDENTIAL_FIELDS = ("Password", "PasswordHash", "password")
+
+# أسماء الحقول الأكثر تكراراً في سجلات Airtable (الحجوزات والمستخدمين)
+CACHE_FIELD_NAMES = [
+    "Customer Name", "Hotel Name", "Agency", "Booking Nr.", "Room number",
+    "trip Name", "Date Trip", "Option", "des", "Guide", "Product ID",
+    "pickup time", "Remarks", "Add - Ons", "ADT", "CHD", "STD", "Youth", "Inf",
+    "CHD Age", "Customer Phone", "Customer Email", "Customer Country",
+    "Total price USD", "Total price EUR", "Total price GBP", "Net Rate",
+    "Currency", "Cost EGP", "Collecting on date Trip", "Management Option",
+    "Add-on", "Booking Status", "Assigned To",
+    "Username", "Password", "Role", "Airtable View", "Airtable Collaborator",
+]
+
+
+def build_compression_dictionary(field_names: Iterable[str] = CACHE_FIELD_NAMES,
+                                 extra_fragments: Iterable[str] = ()) -> bytes:
+    """
+    بناء قاموس zlib مشترك من أسماء الحقول.
+    zlib يفضّل المقاطع الأقرب لنهاية القاموس، لذا توضع الأكثر تكراراً في النهاية.
+
+    :param field_names: أسماء الحقول مرتبة من الأقل إلى الأكثر تكراراً.
+    :param extra_fragments: مقاطع إضافية (قيم متكررة) تسبق أسماء الحقول.
+    :return: القاموس كبايتات.
+    """
+    parts = [fragment for fragment in extra_fragments]
+    for name in field_names:
+        parts.append(json.dumps(name, ensure_ascii=False) + ": ")
+    parts.append('{"id": "rec", "createdTime": "", "fields": {')
+
+    dictionary = "".join(parts).encode("utf-8")
+    return dictionary[-MAX_DICTIONARY_SIZE:]
+
+
+def strip_credential_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    نسخة من سجل Airtable بدون حقول بيانات الدخول (السجل نفسه إذا لم يحتوِ عليها).
+    """
+    fields = record.get('fields')
+    if not isinstance(fields, dict) or not any(name in fields for name in CREDENTIAL_FIELDS):
+        return record
+    return {**record, 'fields': {name: value for name, value in fields.items() if name not in CREDENTIAL_FIELDS}}
+
+
+@dataclass
+class _WriteOp:
+    """عملية كتابة واحدة في طابور خيط الكتابة"""
+    kind: str                       # upsert | bulk_upsert | delete | clear | call | barrier
+    cache_table: Optional[str]
+    table_name: Optional[str]
+    record_id: Optional[str] = None
+    data: Optional[str] = None
+    items: List[Tuple[str, str]] = field(default_factory=list)
+    func: Optional[Callable[[sqlite3.Cursor], Any]] = None
+    seq: int = 0
+    future: Future = field(default_factory=Future)
+
+
 class DatabaseManager:
     """
     فئة DatabaseManager تتولى:
     - إنشاء اتصال بقاعدة بيانات SQLite (ملف db_path).
     - تهيئة جداول الكاش المتعددة (users_cache, bookings_cache, records_cache).
     - إتاحة طرق للحفظ والاسترجاع من الكاش لكل جدول.
+    - ضغط البيانات المخزنة بشكل شفاف وتوفير إحصائيات الحجم والضغط.
+    - تنفيذ جميع الكتابات في خيط واحد مع تجميعها في معاملات (Group Commit).
     """
 
-    def __init__(self, db_path: str) -> None:
+    def __init__(self, db_path: str, compress: bool = True, use_dictionary: bool = True,
+                 commit_interval_ms: int = 5, max_batch_size: int = 500) -> None:
         """
         تهيئة DatabaseManager.
 
         :param db_path: مسار ملف قاعدة بيانات SQLite (مثل "fts_sales_cache.db").
+        :param compress: ضغط البيانات عند التخزين.
+        :param use_dictionary: استخدام القاموس المشترك لأسماء الحقول أثناء الضغط.
+        :param commit_interval_ms: أقصى مدة لتجميع الكتابات قبل تنفيذ الـ commit.
+        :param max_batch_size: أقصى عدد عمليات في معاملة واحدة.
         """
         self.db_path: str = db_path
+        self.compress: bool = compress
+        self.use_dictionary: bool = use_dictionary
+        self.commit_interval: float = max(commit_interval_ms, 0) / 1000.0
+        self.max_batch_size: int = max(max_batch_size, 1)
         self._conn: Optional[sqlite3.Connection] = None
         self._lock: threading.Lock = threading.Lock()
+
+        # اتصال القراءة: في وضع WAL يرى آخر commit دون انتظار قفل خيط الكتابة
+        self._read_conn: Optional[sqlite3.Connection] = None
+        self._read_lock: threading.Lock = threading.Lock()
+
+        # خيط الكتابة وطابوره، والكتابات المرسلة التي لم تُثبت بعد
+        self._write_queue: "queue.Queue[Optional[_WriteOp]]" = queue.Queue()
+        self._writer_thread: Optional[threading.Thread] = None
+        self._pending_lock = threading.Lock()
+        self._pending_writes: Dict[Tuple[str, str], Tuple[int, Optional[str]]] = {}
+        self._pending_clears: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+        self._write_seq: int = 0
+
+        # أوقات الوصول للسجلات (تُكتب دورياً عبر flush_access_times للإخلاء حسب LRU)
+        self._access_lock = threading.Lock()
+        self._access_times: Dict[Tuple[str, str], float] = {}
+        self._last_activity: float = time.monotonic()
+
+        # قواميس الضغط المعروفة (رقم القاموس -> البايتات)
+        self._dictionaries: Dict[int, bytes] = {BUILTIN_DICTIONARY_ID: build_compression_dictionary()}
+        self._active_dictionary_id: int = BUILTIN_DICTIONARY_ID
+
+        # إحصائيات الضغط
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            'writes': 0,
+            'compressed_writes': 0,
+            'raw_bytes': 0,
+            'stored_bytes': 0,
+            'encode_seconds': 0.0,
+            'reads': 0,
+            'decode_seconds': 0.0,
+            'commits': 0,
+            'batched_ops': 0,
+            'commit_seconds': 0.0,
+        }
+
         self._connect_and_init()
+        if self._conn:
+            self._start_writer()
 
     def _connect_and_init(self) -> None:
         """
@@ -46,13 +187,20 @@ class DatabaseManager:
             self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
             cursor = self._conn.cursor()
 
+            # يسري فقط على قواعد البيانات الجديدة، القديمة تُحوَّل لاحقاً في وقت الخمول
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+            # WAL: القراءة من اتصال آخر لا تنتظر الكتابة ولا الـ commit
+            cursor.execute("PRAGMA journal_mode = WAL;")
+
             # إنشاء جدول منفصل لكل نوع من البيانات
             # جدول للمستخدمين
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS users_cache (
                     id TEXT PRIMARY KEY,
                     data TEXT NOT NULL,
-                    table_name TEXT DEFAULT 'Users'
+                    table_name TEXT DEFAULT 'Users',
+                    updated_at REAL NOT NULL DEFAULT 0,
+                    accessed_at REAL NOT NULL DEFAULT 0
                 );
             """)
 
@@ -61,7 +209,9 @@ class DatabaseManager:
                 CREATE TABLE IF NOT EXISTS bookings_cache (
                     id TEXT PRIMARY KEY,
                     data TEXT NOT NULL,
-                    table_name TEXT DEFAULT 'List V2'
+                    table_name TEXT DEFAULT 'List V2',
+                    updated_at REAL NOT NULL DEFAULT 0,
+                    accessed_at REAL NOT NULL DEFAULT 0
                 );
             """)
 
@@ -70,15 +220,63 @@ class DatabaseManager:
                 CREATE TABLE IF NOT EXISTS records_cache (
                     id TEXT PRIMARY KEY,
                     data TEXT NOT NULL,
-                    table_name TEXT
+                    table_name TEXT,
+                    updated_at REAL NOT NULL DEFAULT 0,
+                    accessed_at REAL NOT NULL DEFAULT 0
                 );
             """)
 
+            # حالة آخر مزامنة لكل جدول (لعرض اللقطة المحلية فوراً عند بدء التشغيل):
+            # synced_at آخر مزامنة (كاملة أو تفاضلية)، full_synced_at آخر مزامنة كاملة
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    table_name TEXT PRIMARY KEY,
+                    view_name TEXT,
+                    synced_at REAL NOT NULL,
+                    full_synced_at REAL NOT NULL DEFAULT 0,
+                    record_count INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+            # قواعد أقدم: full_synced_at = 0 يفرض مزامنة كاملة في التشغيل التالي
+            cursor.execute("PRAGMA table_info(sync_state);")
+            if 'full_synced_at' not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute("ALTER TABLE sync_state ADD COLUMN full_synced_at REAL NOT NULL DEFAULT 0;")
+
+            # جدول قواميس الضغط المدرَّبة
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS compression_dicts (
+                    id INTEGER PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                );
+            """)
+
+            self._ensure_maintenance_columns(cursor)
+
             self._conn.commit()
+            self._read_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._load_trained_dictionaries()
             logger.info(f"DatabaseManager: متصل بقاعدة البيانات '{self.db_path}' وتم تهيئة جداول الكاش.")
         except Exception as exc:
             logger.error(f"DatabaseManager: فشل في إنشاء/تهيئة قاعدة البيانات '{self.db_path}': {exc}", exc_info=True)
 
+    def _ensure_maintenance_columns(self, cursor: sqlite3.Cursor) -> None:
+        """
+        إضافة عمودي وقت التحديث وآخر وصول لقواعد البيانات القديمة (مطلوبة للإخلاء حسب العمر/LRU).
+        السجلات الموجودة تُعامل كأنها حُدّثت الآن حتى لا تُحذف فور الترقية.
+        """
+        now = time.time()
+        for cache_table in CACHE_TABLES:
+            cursor.execute(f"PRAGMA table_info({cache_table});")
+            columns = {row[1] for row in cursor.fetchall()}
+            missing = [column for column in ("updated_at", "accessed_at") if column not in columns]
+            for column in missing:
+                cursor.execute(f"ALTER TABLE {cache_table} ADD COLUMN {column} REAL NOT NULL DEFAULT 0;")
+            if missing:
+                cursor.execute(f"UPDATE {cache_table} SET updated_at = ?, accessed_at = ?;", (now, now))
+                logger.info(f"DatabaseManager: تمت ترقية جدول {cache_table} بأعمدة الصيانة.")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{cache_table}_accessed ON {cache_table}(accessed_at);")
+
     def get_cached_record(self, record_id: str, table_name: str = None) -> Optional[str]:
         """
         استرجاع السجل المؤقت المخزن في الكاش من الجدول المناسب.
@@ -86,13 +284,19 @@ class DatabaseManager:
         :param table_name: اسم الجدول (اختياري)
         :return: البيانات (json) كسلسلة نصية إذا وُجدت، وإلا None.
         """
-        if not self._conn:
+        if not self._read_conn:
             logger.warning("DatabaseManager: محاولة استرجاع سجل قبل وجود اتصال بقاعدة البيانات.")
             return None
 
+        # آخر قيمة مكتوبة لم تُثبت بعد لها الأولوية
+        self._last_activity = time.monotonic()
+        has_pending, pending_data = self._get_pending_write(self._get_cache_table(table_name), record_id, table_name)
+        if has_pending:
+            return pending_data
+
         try:
-            with self._lock:
-                cursor = self._conn.cursor()
+            with self._read_lock:
+                cursor = self._read_conn.cursor()
 
                 # تحديد الجدول المناسب بناءً على table_name
                 if table_name == "Users":
@@ -106,63 +310,48 @@ class DatabaseManager:
 
             if result:
                 logger.debug(f"DatabaseManager: وجد السجل '{record_id}' في الكاش (جدول: {table_name}).")
-                return result[0]
+                with self._access_lock:
+                    self._access_times[(self._get_cache_table(table_name), record_id)] = time.time()
+                return self._decode_payload(result[0])
             logger.debug(f"DatabaseManager: السجل '{record_id}' غير موجود في الكاش.")
             return None
         except Exception as exc:
             logger.error(f"DatabaseManager: خطأ أثناء استرجاع السجل '{record_id}' من الكاش: {exc}", exc_info=True)
             return None
 
-    def set_cached_record(self, record_id: str, data: str, table_name: str = None) -> None:
+    def set_cached_record(self, record_id: str, data: str, table_name: str = None,
+                          callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
         """
         تخزين السجل المؤقت في جدول الكاش المناسب.
+        الكتابة تتم في خيط الكتابة (CacheWriter) ولا ينتظر المستدعي تنفيذ الـ commit.
         :param record_id: معرف السجل.
         :param data: البيانات المراد تخزينها كسلسلة نصية (عادة JSON).
         :param table_name: اسم الجدول (اختياري)
+        :param callback: دالة تُستدعى (من خيط الكتابة) بعد تثبيت الكتابة على القرص.
+        :return: Future يكتمل بعد الـ commit، أو None إذا لم يوجد اتصال.
         """
         if not self._conn:
             logger.warning("DatabaseManager: محاولة تخزين سجل قبل وجود اتصال بقاعدة البيانات.")
-            return
-
-        try:
-            with self._lock:
-                cursor = self._conn.cursor()
+            return None
 
-                # تحديد الجدول المناسب
-                if table_name == "Users":
-                    cursor.execute("""
-                        INSERT INTO users_cache (id, data) VALUES (?, ?)
-                        ON CONFLICT(id) DO UPDATE SET data=excluded.data;
-                    """, (record_id, data))
-                elif table_name == "List V2":
-                    cursor.execute("""
-                        INSERT INTO bookings_cache (id, data) VALUES (?, ?)
-                        ON CONFLICT(id) DO UPDATE SET data=excluded.data;
-                    """, (record_id, data))
-                else:
-                    cursor.execute("""
-                        INSERT INTO records_cache (id, data, table_name) VALUES (?, ?, ?)
-                        ON CONFLICT(id) DO UPDATE SET data=excluded.data, table_name=excluded.table_name;
-                    """, (record_id, data, table_name))
-
-                self._conn.commit()
-            logger.debug(f"DatabaseManager: تم تخزين/تحديث السجل '{record_id}' في الكاش (جدول: {table_name}).")
-        except Exception as exc:
-            logger.error(f"DatabaseManager: خطأ أثناء تخزين السجل '{record_id}' في الكاش: {exc}", exc_info=True)
+        op = _WriteOp('upsert', self._get_cache_table(table_name), table_name,
+                      record_id=record_id, data=data)
+        return self._submit_write(op, callback)
 
     def get_all_cached_ids(self, table_name: str = None) -> List[str]:
         """
         إرجاع قائمة بجميع معرفات السجلات المخزنة في جدول الكاش المحدد.
+        ملاحظة: تعكس الحالة المثبتة على القرص فقط (استخدم flush() قبلها عند الحاجة).
         :param table_name: اسم الجدول (اختياري)
         :return: قائمة معرفات كسلاسل نصية.
         """
-        if not self._conn:
+        if not self._read_conn:
             logger.warning("DatabaseManager: محاولة جلب جميع معرفات قبل وجود اتصال بقاعدة البيانات.")
             return []
 
         try:
-            with self._lock:
-                cursor = self._conn.cursor()
+            with self._read_lock:
+                cursor = self._read_conn.cursor()
 
                 if table_name == "Users":
                     cursor.execute("SELECT id FROM users_cache;")
@@ -180,77 +369,785 @@ class DatabaseManager:
             logger.error(f"DatabaseManager: خطأ أثناء جلب جميع المعرفات من الكاش: {exc}", exc_info=True)
             return []
 
-    def clear_cache(self, table_name: str = None) -> None:
+    def clear_cache(self, table_name: str = None,
+                    callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
         """
         حذف جميع السجلات من جدول الكاش المحدد.
         :param table_name: اسم الجدول (None = حذف الكل)
+        :param callback: دالة تُستدعى بعد تثبيت الحذف.
+        :return: Future يكتمل بعد الـ commit، أو None إذا لم يوجد اتصال.
         """
         if not self._conn:
             logger.warning("DatabaseManager: محاولة مسح الكاش قبل وجود اتصال بقاعدة البيانات.")
-            return
-
-        try:
-            with self._lock:
-                cursor = self._conn.cursor()
-
-                if table_name == "Users":
-                    cursor.execute("DELETE FROM users_cache;")
-                elif table_name == "List V2":
-                    cursor.execute("DELETE FROM bookings_cache;")
-                elif table_name is None:
-                    # حذف جميع الجداول
-                    cursor.execute("DELETE FROM users_cache;")
-                    cursor.execute("DELETE FROM bookings_cache;")
-                    cursor.execute("DELETE FROM records_cache;")
-                else:
-                    cursor.execute("DELETE FROM records_cache WHERE table_name = ?;", (table_name,))
+            return None
 
-                self._conn.commit()
-            logger.info(f"DatabaseManager: تم مسح السجلات من الكاش (جدول: {table_name or 'الكل'}).")
-        except Exception as exc:
-            logger.error(f"DatabaseManager: خطأ أثناء مسح الكاش: {exc}", exc_info=True)
+        cache_table = self._get_cache_table(table_name) if table_name is not None else None
+        return self._submit_write(_WriteOp('clear', cache_table, table_name), callback)
 
-    def delete_cached_record(self, record_id: str, table_name: str = None) -> bool:
+    def delete_cached_record(self, record_id: str, table_name: str = None,
+                             callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
         """
         حذف سجل محدد من جدول الكاش.
         :param record_id: معرف السجل المراد حذفه.
         :param table_name: اسم الجدول (اختياري)
-        :return: True إذا تم الحذف بنجاح، False خلاف ذلك.
+        :param callback: دالة تُستدعى بعد تثبيت الحذف.
+        :return: Future نتيجته True إذا كان السجل موجوداً وحُذف، False خلاف ذلك.
         """
         if not self._conn:
             logger.warning("DatabaseManager: محاولة حذف سجل قبل وجود اتصال بقاعدة البيانات.")
+            return None
+
+        op = _WriteOp('delete', self._get_cache_table(table_name), table_name, record_id=record_id)
+        return self._submit_write(op, callback)
+
+    def set_cached_records(self, items: List[Tuple[str, str]], table_name: str = None,
+                           callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
+        """
+        تخزين مجموعة سجلات دفعة واحدة داخل معاملة (transaction) واحدة.
+        :param items: قائمة أزواج (معرف السجل، البيانات كسلسلة JSON).
+        :param table_name: اسم الجدول (اختياري)
+        :param callback: دالة تُستدعى بعد تثبيت الكتابة.
+        :return: Future نتيجته عدد السجلات المخزنة.
+        """
+        if not self._conn:
+            logger.warning("DatabaseManager: محاولة تخزين سجلات قبل وجود اتصال بقاعدة البيانات.")
+            return None
+
+        op = _WriteOp('bulk_upsert', self._get_cache_table(table_name), table_name, items=list(items))
+        return self._submit_write(op, callback)
+
+    def save_records(self, table_name: str, records: List[Dict[str, Any]], view_name: str = None,
+                     synced_at: Optional[float] = None, replace: bool = True,
+                     callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
+        """
+        حفظ لقطة سجلات Airtable كاملة (أو دفعة تغييرات) مع تسجيل وقت المزامنة.
+        التحويل إلى JSON والضغط يتمان في خيط الكتابة، وحقول بيانات الدخول لا تُحفظ.
+        :param records: سجلات Airtable كما وصلت من الـ API.
+        :param view_name: العرض الذي جُلبت منه السجلات (تُعرض اللقطة فقط لنفس العرض).
+        :param synced_at: وقت بدء الجلب (epoch)، الافتراضي الآن.
+        :param replace: استبدال محتوى الجدول بالكامل (مزامنة كاملة) أو دمج التغييرات فقط.
+                        الدمج لا يغيّر وقت آخر مزامنة كاملة، ولا ينشئ لقطة غير موجودة.
+        :return: Future بعدد السجلات المحفوظة.
+        """
+        cache_table = self._get_cache_table(table_name)
+        records = list(records)
+        synced_at = synced_at or time.time()
+
+        def write_snapshot(cursor: sqlite3.Cursor) -> int:
+            if replace:
+                if cache_table == "records_cache":
+                    cursor.execute("DELETE FROM records_cache WHERE table_name = ?;", (table_name,))
+                else:
+                    cursor.execute(f"DELETE FROM {cache_table};")
+
+            items = [(record['id'], json.dumps(strip_credential_fields(record), ensure_ascii=False))
+                     for record in records if record.get('id')]
+            self._upsert_rows(cursor, cache_table, table_name, items)
+
+            if cache_table == "records_cache":
+                cursor.execute("SELECT COUNT(*) FROM records_cache WHERE table_name = ?;", (table_name,))
+            else:
+                cursor.execute(f"SELECT COUNT(*) FROM {cache_table};")
+            record_count = cursor.fetchone()[0]
+
+            if replace:
+                cursor.execute("""
+                    INSERT INTO sync_state (table_name, view_name, synced_at, full_synced_at, record_count)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(table_name) DO UPDATE SET view_name=excluded.view_name, synced_at=excluded.synced_at,
+                        full_synced_at=excluded.full_synced_at, record_count=excluded.record_count;
+                """, (table_name, view_name, synced_at, synced_at, record_count))
+            else:
+                cursor.execute("""
+                    UPDATE sync_state SET synced_at = ?, record_count = ? WHERE table_name = ? AND view_name IS ?;
+                """, (synced_at, record_count, table_name, view_name))
+            logger.debug(f"DatabaseManager: تم حفظ {len(items)} سجل في لقطة {table_name} ({record_count} إجمالاً).")
+            return len(items)
+
+        return self._submit_write(_WriteOp('call', cache_table, table_name, func=write_snapshot), callback)
+
+    def load_snapshot(self, table_name: str,
+                      view_name: str = None) -> Tuple[List[Dict[str, Any]], Optional[float], Optional[float]]:
+        """
+        تحميل آخر لقطة محفوظة لجدول بنفس ترتيب آخر مزامنة.
+        :return: (السجلات، وقت آخر مزامنة، وقت آخر مزامنة كاملة) بثواني epoch،
+                 أو ([], None, None) إن لم توجد لقطة لهذا العرض.
+        """
+        if not self._read_conn:
+            return [], None, None
+
+        cache_table = self._get_cache_table(table_name)
+        start = time.perf_counter()
+        try:
+            with self._read_lock:
+                cursor = self._read_conn.cursor()
+                cursor.execute("SELECT view_name, synced_at, full_synced_at FROM sync_state WHERE table_name = ?;",
+                               (table_name,))
+                state = cursor.fetchone()
+                if not state or state[0] != view_name:
+                    return [], None, None
+
+                if cache_table == "records_cache":
+                    cursor.execute("SELECT data FROM records_cache WHERE table_name = ? ORDER BY rowid;", (table_name,))
+                else:
+                    cursor.execute(f"SELECT data FROM {cache_table} ORDER BY rowid;")
+                rows = cursor.fetchall()
+
+            records = []
+            for (stored,) in rows:
+                data = self._decode_payload(stored)
+                if data:
+                    records.append(json.loads(data))
+
+            logger.info(f"DatabaseManager: تم تحميل لقطة {table_name} ({len(records)} سجل) "
+                        f"خلال {(time.perf_counter() - start) * 1000:.0f} ms.")
+            return records, state[1], state[2]
+        except Exception as exc:
+            logger.error(f"DatabaseManager: خطأ أثناء تحميل لقطة {table_name}: {exc}", exc_info=True)
+            return [], None, None
+
+    def drop_snapshot(self, table_name: str,
+                      callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
+        """
+        حذف لقطة محفوظة سابقاً لجدول لم تعد لقطته تُحفظ (مع سجلاتها).
+        لا يفعل شيئاً إذا لم توجد حالة مزامنة للجدول.
+        :return: Future نتيجته True إذا حُذفت لقطة.
+        """
+        cache_table = self._get_cache_table(table_name)
+
+        def delete_snapshot(cursor: sqlite3.Cursor) -> bool:
+            cursor.execute("SELECT 1 FROM sync_state WHERE table_name = ?;", (table_name,))
+            if not cursor.fetchone():
+                return False
+            if cache_table == "records_cache":
+                cursor.execute("DELETE FROM records_cache WHERE table_name = ?;", (table_name,))
+            else:
+                cursor.execute(f"DELETE FROM {cache_table};")
+            self._invalidate_snapshot(cursor, cache_table, table_name)
+            logger.info(f"DatabaseManager: حُذفت اللقطة المحفوظة للجدول {table_name}.")
+            return True
+
+        return self._submit_write(_WriteOp('call', cache_table, table_name, func=delete_snapshot), callback)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        انتظار تثبيت جميع الكتابات المرسلة حتى الآن.
+        لا تُستدعى من خيط الواجهة إلا عند الإغلاق.
+        :param timeout: أقصى مدة انتظار بالثواني.
+        :return: True إذا ثُبتت جميع الكتابات خلال المهلة.
+        """
+        future = self._submit_write(_WriteOp('barrier', None, None))
+        if future is None:
+            return False
+        try:
+            future.result(timeout=timeout)
+            return True
+        except Exception:
             return False
 
+    # ------------------------------------------------------------
+    # خيط الكتابة (Group Commit)
+    # ------------------------------------------------------------
+
+    def _start_writer(self) -> None:
+        """
+        تشغيل خيط الكتابة الوحيد المسؤول عن جميع التعديلات.
+        """
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True, name="CacheWriter")
+        self._writer_thread.start()
+
+    def _submit_write(self, op: "_WriteOp",
+                      callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
+        """
+        إرسال عملية كتابة إلى طابور خيط الكتابة وتسجيلها في طبقة الكتابات المعلقة.
+        """
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            logger.warning("DatabaseManager: خيط الكتابة غير متاح - تم تجاهل عملية الكتابة.")
+            return None
+
+        if callback:
+            op.future.add_done_callback(callback)
+
+        self._last_activity = time.monotonic()
+        with self._pending_lock:
+            self._write_seq += 1
+            op.seq = self._write_seq
+
+            if op.kind in ('upsert', 'delete'):
+                self._pending_writes[(op.cache_table, op.record_id)] = (op.seq, op.data)
+            elif op.kind == 'bulk_upsert':
+                for record_id, data in op.items:
+                    self._pending_writes[(op.cache_table, record_id)] = (op.seq, data)
+            elif op.kind == 'clear':
+                self._pending_clears[(op.cache_table, op.table_name)] = op.seq
+
+        self._write_queue.put(op)
+        return op.future
+
+    def _writer_loop(self) -> None:
+        """
+        حلقة خيط الكتابة: تجميع العمليات المتزامنة في معاملة واحدة كل
+        commit_interval أو عند بلوغ max_batch_size عملية.
+        """
+        stopping = False
+        while not stopping:
+            op = self._write_queue.get()
+            if op is None:
+                break
+
+            batch = [op]
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    next_op = self._write_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if next_op is None:
+                    stopping = True
+                    break
+                batch.append(next_op)
+
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List["_WriteOp"]) -> None:
+        """
+        تنفيذ دفعة عمليات في معاملة واحدة. عند فشل الدفعة تُعاد كل عملية
+        بمفردها حتى لا تُفشل عملية واحدة بقية العمليات.
+        """
+        start = time.perf_counter()
         try:
             with self._lock:
                 cursor = self._conn.cursor()
+                results = [self._apply_write(cursor, op) for op in batch]
+                self._conn.commit()
+        except Exception as exc:
+            logger.warning(f"DatabaseManager: فشلت دفعة الكتابة ({len(batch)} عملية) - إعادة المحاولة فردياً: {exc}")
+            self._rollback()
+            for op in batch:
+                try:
+                    with self._lock:
+                        result = self._apply_write(self._conn.cursor(), op)
+                        self._conn.commit()
+                    self._finish_write(op, result)
+                except Exception as op_exc:
+                    self._rollback()
+                    logger.error(f"DatabaseManager: فشلت عملية الكتابة '{op.kind}' ({op.record_id}): {op_exc}")
+                    self._finish_write(op, error=op_exc)
+            return
 
-                # تحديد الجدول المناسب وحذف السجل
-                if table_name == "Users":
-                    cursor.execute("DELETE FROM users_cache WHERE id = ?;", (record_id,))
-                elif table_name == "List V2":
-                    cursor.execute("DELETE FROM bookings_cache WHERE id = ?;", (record_id,))
-                else:
-                    cursor.execute("DELETE FROM records_cache WHERE id = ?;", (record_id,))
+        for op, result in zip(batch, results):
+            self._finish_write(op, result)
 
-                self._conn.commit()
+        with self._stats_lock:
+            self._stats['commits'] += 1
+            self._stats['batched_ops'] += len(batch)
+            self._stats['commit_seconds'] += time.perf_counter() - start
+        logger.debug(f"DatabaseManager: تم تثبيت {len(batch)} عملية في معاملة واحدة.")
 
-                # التحقق من أن السجل تم حذفه فعلاً
-                if cursor.rowcount > 0:
-                    logger.debug(f"DatabaseManager: تم حذف السجل '{record_id}' من الكاش (جدول: {table_name}).")
-                    return True
-                else:
-                    logger.debug(f"DatabaseManager: السجل '{record_id}' لم يكن موجوداً في الكاش.")
-                    return False
+    def _apply_write(self, cursor: sqlite3.Cursor, op: "_WriteOp") -> Any:
+        """
+        تنفيذ عملية كتابة واحدة (داخل معاملة خيط الكتابة).
+        """
+        if op.kind in ('upsert', 'bulk_upsert'):
+            items = [(op.record_id, op.data)] if op.kind == 'upsert' else op.items
+            self._upsert_rows(cursor, op.cache_table, op.table_name, items)
+            return True if op.kind == 'upsert' else len(items)
+
+        if op.kind == 'delete':
+            cursor.execute(f"DELETE FROM {op.cache_table} WHERE id = ?;", (op.record_id,))
+            return cursor.rowcount > 0
+
+        if op.kind == 'clear':
+            if op.table_name is None:
+                # حذف جميع الجداول
+                for cache_table in CACHE_TABLES:
+                    cursor.execute(f"DELETE FROM {cache_table};")
+                cursor.execute("DELETE FROM sync_state;")
+            elif op.cache_table == "records_cache":
+                cursor.execute("DELETE FROM records_cache WHERE table_name = ?;", (op.table_name,))
+            else:
+                cursor.execute(f"DELETE FROM {op.cache_table};")
+            if op.table_name is not None:
+                self._invalidate_snapshot(cursor, op.cache_table, op.table_name)
+            logger.info(f"DatabaseManager: تم مسح السجلات من الكاش (جدول: {op.table_name or 'الكل'}).")
+            return True
+
+        if op.kind == 'call':
+            return op.func(cursor)
+
+        # barrier: لا شيء للتنفيذ، يكتمل بعد تثبيت ما قبله
+        return True
+
+    def _upsert_rows(self, cursor: sqlite3.Cursor, cache_table: str, table_name: Optional[str],
+                     items: Iterable[Tuple[str, str]]) -> None:
+        """
+        إدراج/تحديث مجموعة سجلات مع ضغطها وتحديث أوقات التحديث والوصول.
+        """
+        now = time.time()
+        if cache_table == "records_cache":
+            cursor.executemany("""
+                INSERT INTO records_cache (id, data, table_name, updated_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET data=excluded.data, table_name=excluded.table_name,
+                    updated_at=excluded.updated_at, accessed_at=excluded.accessed_at;
+            """, [(record_id, self._encode_payload(data), table_name, now, now) for record_id, data in items])
+        else:
+            cursor.executemany(f"""
+                INSERT INTO {cache_table} (id, data, updated_at, accessed_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET data=excluded.data,
+                    updated_at=excluded.updated_at, accessed_at=excluded.accessed_at;
+            """, [(record_id, self._encode_payload(data), now, now) for record_id, data in items])
 
+    def _finish_write(self, op: "_WriteOp", result: Any = None, error: Optional[BaseException] = None) -> None:
+        """
+        إزالة العملية من طبقة الكتابات المعلقة وإكمال الـ Future الخاص بها.
+        """
+        with self._pending_lock:
+            if op.kind in ('upsert', 'delete'):
+                keys = [(op.cache_table, op.record_id)]
+            elif op.kind == 'bulk_upsert':
+                keys = [(op.cache_table, record_id) for record_id, _ in op.items]
+            else:
+                keys = []
+
+            for key in keys:
+                entry = self._pending_writes.get(key)
+                if entry and entry[0] == op.seq:
+                    del self._pending_writes[key]
+
+            if op.kind == 'clear' and self._pending_clears.get((op.cache_table, op.table_name)) == op.seq:
+                del self._pending_clears[(op.cache_table, op.table_name)]
+
+        if error is not None:
+            op.future.set_exception(error)
+        else:
+            op.future.set_result(result)
+
+    def _get_pending_write(self, cache_table: str, record_id: str, table_name: str = None) -> Tuple[bool, Optional[str]]:
+        """
+        البحث عن كتابة معلقة (لم تُثبت بعد) لسجل ما لضمان قراءة آخر قيمة مكتوبة.
+        :return: (هل توجد كتابة معلقة، البيانات أو None إذا كانت حذفاً).
+        """
+        with self._pending_lock:
+            if not self._pending_writes and not self._pending_clears:
+                return False, None
+
+            entry = self._pending_writes.get((cache_table, record_id))
+            clear_seq = max(
+                self._pending_clears.get((None, None), 0),
+                self._pending_clears.get((cache_table, table_name), 0),
+            )
+
+        if entry and entry[0] > clear_seq:
+            return True, entry[1]
+        if clear_seq:
+            return True, None
+        return False, None
+
+    def _rollback(self) -> None:
+        """التراجع عن المعاملة الحالية بأمان"""
+        try:
+            with self._lock:
+                self._conn.rollback()
+        except Exception:
+            pass
+
+    def _get_cache_table(self, table_name: str = None) -> str:
+        """
+        تحديد جدول الكاش المحلي المناسب لاسم جدول Airtable.
+        :param table_name: اسم جدول Airtable.
+        :return: اسم جدول SQLite.
+        """
+        if table_name == "Users":
+            return "users_cache"
+        if table_name == "List V2":
+            return "bookings_cache"
+        return "records_cache"
+
+    # ------------------------------------------------------------
+    # ضغط البيانات
+    # ------------------------------------------------------------
+
+    def _encode_payload(self, data: str) -> Any:
+        """
+        ترميز البيانات قبل التخزين: ضغطها إذا كان ذلك مفيداً، وإلا إبقاؤها كنص.
+        :param data: البيانات كسلسلة نصية (JSON).
+        :return: bytes للبيانات المضغوطة أو النص الأصلي.
+        """
+        start = time.perf_counter()
+        raw = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+        stored: Any = data
+
+        if self.compress and len(raw) >= MIN_COMPRESS_SIZE:
+            if self.use_dictionary:
+                dict_id = self._active_dictionary_id
+                compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=self._dictionaries[dict_id])
+                header = bytes([CODEC_ZLIB_DICT]) + dict_id.to_bytes(2, "big")
+            else:
+                compressor = zlib.compressobj(COMPRESSION_LEVEL)
+                header = bytes([CODEC_ZLIB])
+
+            blob = header + compressor.compress(raw) + compressor.flush()
+            if len(blob) < len(raw):
+                stored = blob
+
+        with self._stats_lock:
+            self._stats['writes'] += 1
+            self._stats['raw_bytes'] += len(raw)
+            if isinstance(stored, bytes):
+                self._stats['compressed_writes'] += 1
+                self._stats['stored_bytes'] += len(stored)
+            else:
+                self._stats['stored_bytes'] += len(raw)
+            self._stats['encode_seconds'] += time.perf_counter() - start
+
+        return stored
+
+    def _decode_payload(self, stored: Any) -> Optional[str]:
+        """
+        فك ترميز البيانات المخزنة. النصوص (السجلات القديمة) تُرجع كما هي.
+        :param stored: القيمة كما خزنت في SQLite.
+        :return: البيانات كسلسلة نصية (JSON).
+        """
+        if stored is None or isinstance(stored, str):
+            return stored
+
+        start = time.perf_counter()
+        blob = bytes(stored)
+        codec = blob[0] if blob else None
+
+        if codec == CODEC_ZLIB:
+            raw = zlib.decompress(blob[1:])
+        elif codec == CODEC_ZLIB_DICT:
+            dict_id = int.from_bytes(blob[1:3], "big")
+            dictionary = self._dictionaries.get(dict_id)
+            if dictionary is None:
+                # ربما درّبته نسخة أخرى تشارك قاعدة البيانات بعد بدء هذه النسخة
+                self._load_trained_dictionaries(activate=False)
+                dictionary = self._dictionaries.get(dict_id)
+            if dictionary is None:
+                raise ValueError(f"قاموس الضغط رقم {dict_id} غير معروف")
+            decompressor = zlib.decompressobj(zdict=dictionary)
+            raw = decompressor.decompress(blob[3:]) + decompressor.flush()
+        else:
+            raw = blob
+
+        with self._stats_lock:
+            self._stats['reads'] += 1
+            self._stats['decode_seconds'] += time.perf_counter() - start
+
+        return raw.decode("utf-8")
+
+    def _load_trained_dictionaries(self, activate: bool = True) -> None:
+        """
+        تحميل القواميس المدرَّبة المحفوظة وتفعيل أحدثها.
+        :param activate: استخدام أحدث قاموس للكتابات القادمة (عند بدء التشغيل فقط).
+        """
+        try:
+            with self._read_lock:
+                cursor = self._read_conn.cursor()
+                cursor.execute("SELECT id, data FROM compression_dicts ORDER BY id;")
+                rows = cursor.fetchall()
+
+            for dict_id, data in rows:
+                self._dictionaries[dict_id] = bytes(data)
+                if activate:
+                    self._active_dictionary_id = dict_id
+
+            if rows:
+                logger.debug(f"DatabaseManager: تم تحميل {len(rows)} قاموس ضغط (النشط: {self._active_dictionary_id}).")
         except Exception as exc:
-            logger.error(f"DatabaseManager: خطأ أثناء حذف السجل '{record_id}' من الكاش: {exc}", exc_info=True)
-            return False
+            logger.warning(f"DatabaseManager: تعذر تحميل قواميس الضغط: {exc}")
+
+    def train_compression_dictionary(self, samples: List[str], max_values: int = 200) -> Optional[int]:
+        """
+        تدريب قاموس ضغط جديد من عينات سجلات فعلية وتفعيله للكتابات القادمة.
+        يعتمد على تكرار أسماء الحقول والقيم القصيرة المتكررة (مثل أسماء الوكالات والحالات).
+        السجلات المضغوطة بقواميس سابقة تبقى قابلة للقراءة.
+
+        :param samples: عينات سجلات كسلاسل JSON.
+        :param max_values: الحد الأقصى للقيم المتكررة المضافة للقاموس.
+        :return: رقم القاموس الجديد أو None عند الفشل.
+        """
+        if not self._conn or not samples:
+            return None
+
+        field_counter: Counter = Counter()
+        value_counter: Counter = Counter()
+
+        for sample in samples:
+            try:
+                record = json.loads(sample)
+            except (TypeError, ValueError):
+                continue
+            fields = record.get('fields', record) if isinstance(record, dict) else {}
+            if not isinstance(fields, dict):
+                continue
+            for name, value in fields.items():
+                field_counter[name] += 1
+                if isinstance(value, str) and 0 < len(value) <= 40:
+                    value_counter[value] += 1
+
+        if not field_counter:
+            return None
+
+        # القيم التي تتكرر أكثر من مرة فقط، والأكثر تكراراً في النهاية
+        repeated_values = [v for v, c in value_counter.most_common(max_values) if c > 1]
+        value_fragments = [json.dumps(v, ensure_ascii=False) + ", " for v in reversed(repeated_values)]
+        field_names = [name for name, _ in reversed(field_counter.most_common())]
+        dictionary = build_compression_dictionary(field_names, value_fragments)
+
+        def insert_dictionary(cursor: sqlite3.Cursor) -> int:
+            # الأرقام تبدأ بعد رقم القاموس المدمج لتجنّب التعارض معه
+            cursor.execute("SELECT COALESCE(MAX(id), ?) + 1 FROM compression_dicts;", (BUILTIN_DICTIONARY_ID,))
+            new_id = cursor.fetchone()[0]
+            cursor.execute(
+                "INSERT INTO compression_dicts (id, data, created_at) VALUES (?, ?, ?);",
+                (new_id, dictionary, time.time())
+            )
+            return new_id
+
+        future = self._submit_write(_WriteOp('call', None, None, func=insert_dictionary))
+        if future is None:
+            return None
+
+        try:
+            dict_id = future.result()
+            self._dictionaries[dict_id] = dictionary
+            self._active_dictionary_id = dict_id
+            logger.info(f"DatabaseManager: تم تدريب قاموس ضغط جديد ({dict_id}) بحجم {len(dictionary)} بايت.")
+            return dict_id
+        except Exception as exc:
+            logger.error(f"DatabaseManager: فشل حفظ قاموس الضغط: {exc}", exc_info=True)
+            return None
+
+    # =============== صيانة الكاش ===============
+
+    def seconds_since_activity(self) -> float:
+        """
+        عدد الثواني منذ آخر قراءة أو كتابة على الكاش (لتحديد وقت الخمول).
+        """
+        return time.monotonic() - self._last_activity
+
+    def flush_access_times(self) -> Optional[Future]:
+        """
+        كتابة أوقات الوصول المتراكمة في الذاكرة إلى قاعدة البيانات (دفعة واحدة).
+        القراءة نفسها لا تكتب شيئاً حتى لا تتحول كل قراءة إلى عملية كتابة.
+        """
+        with self._access_lock:
+            access_times, self._access_times = self._access_times, {}
+        if not access_times:
+            return None
+
+        def update_access(cursor: sqlite3.Cursor) -> int:
+            for cache_table in CACHE_TABLES:
+                rows = [(accessed_at, record_id) for (table, record_id), accessed_at in access_times.items()
+                        if table == cache_table]
+                if rows:
+                    cursor.executemany(f"UPDATE {cache_table} SET accessed_at = ? WHERE id = ?;", rows)
+            return len(access_times)
+
+        return self._submit_write(_WriteOp('call', None, None, func=update_access))
+
+    def evict_expired(self, table_name: str = None, max_age_seconds: float = 0,
+                      callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
+        """
+        حذف السجلات التي لم تُحدَّث منذ أكثر من max_age_seconds.
+        :param table_name: اسم جدول Airtable، أو None لجدول الكاش العام (records_cache) بالكامل.
+        :return: Future بعدد السجلات المحذوفة.
+        """
+        cache_table = self._get_cache_table(table_name)
+
+        def delete_expired(cursor: sqlite3.Cursor) -> int:
+            cutoff = time.time() - max_age_seconds
+            if cache_table == "records_cache" and table_name is not None:
+                cursor.execute("DELETE FROM records_cache WHERE table_name = ? AND updated_at < ?;",
+                               (table_name, cutoff))
+            else:
+                cursor.execute(f"DELETE FROM {cache_table} WHERE updated_at < ?;", (cutoff,))
+            deleted = max(cursor.rowcount, 0)
+            if deleted:
+                self._invalidate_snapshot(cursor, cache_table, table_name)
+                logger.info(f"DatabaseManager: حُذف {deleted} سجل منتهي الصلاحية (جدول: {table_name or cache_table}).")
+            return deleted
+
+        return self._submit_write(_WriteOp('call', cache_table, table_name, func=delete_expired), callback)
+
+    def evict_to_budget(self, max_bytes: int,
+                        callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
+        """
+        إخلاء أقل السجلات استخداماً (LRU حسب accessed_at) من جميع الجداول حتى
+        يصبح حجم البيانات المخزنة ضمن max_bytes.
+        :return: Future بعدد السجلات المحذوفة.
+        """
+        def evict(cursor: sqlite3.Cursor) -> int:
+            total = 0
+            for cache_table in CACHE_TABLES:
+                cursor.execute(f"SELECT COALESCE(SUM(LENGTH(CAST(data AS BLOB))), 0) FROM {cache_table};")
+                total += cursor.fetchone()[0]
+            excess = total - max_bytes
+            if excess <= 0:
+                return 0
+
+            cursor.execute(" UNION ALL ".join(
+                f"SELECT '{cache_table}', id, LENGTH(CAST(data AS BLOB)), accessed_at FROM {cache_table}"
+                for cache_table in CACHE_TABLES
+            ) + " ORDER BY 4;")
+
+            victims: Dict[str, List[Tuple[str]]] = {}
+            freed = 0
+            while freed < excess:
+                rows = cursor.fetchmany(500)
+                if not rows:
+                    break
+                for cache_table, record_id, size, _ in rows:
+                    victims.setdefault(cache_table, []).append((record_id,))
+                    freed += size
+                    if freed >= excess:
+                        break
+
+            evicted = 0
+            for cache_table, ids in victims.items():
+                cursor.executemany(f"DELETE FROM {cache_table} WHERE id = ?;", ids)
+                self._invalidate_snapshot(cursor, cache_table)
+                evicted += len(ids)
+            logger.info(f"DatabaseManager: تم إخلاء {evicted} سجل ({freed} بايت) للبقاء ضمن حجم الكاش المسموح.")
+            return evicted
+
+        return self._submit_write(_WriteOp('call', None, None, func=evict), callback)
+
+    def _invalidate_snapshot(self, cursor: sqlite3.Cursor, cache_table: str, table_name: str = None) -> None:
+        """
+        إلغاء حالة المزامنة لجدول فقد جزءاً من سجلاته، حتى لا تُعرض لقطة ناقصة عند بدء التشغيل.
+        """
+        if cache_table == "users_cache":
+            cursor.execute("DELETE FROM sync_state WHERE table_name = 'Users';")
+        elif cache_table == "bookings_cache":
+            cursor.execute("DELETE FROM sync_state WHERE table_name = 'List V2';")
+        elif table_name is not None:
+            cursor.execute("DELETE FROM sync_state WHERE table_name = ?;", (table_name,))
+        else:
+            cursor.execute("DELETE FROM sync_state WHERE table_name NOT IN ('Users', 'List V2');")
+
+    def incremental_vacuum(self, max_pages: int = 0,
+                           callback: Optional[Callable[[Future], None]] = None) -> Optional[Future]:
+        """
+        تحرير الصفحات الفارغة من ملف قاعدة البيانات على دفعات صغيرة.
+        قواعد البيانات القديمة (بدون auto_vacuum) تُحوَّل مرة واحدة بعملية VACUUM كاملة.
+        :param max_pages: أقصى عدد صفحات في هذه الخطوة (0 = جميع الصفحات الفارغة).
+        :return: Future بعدد الصفحات المحررة.
+        """
+        def vacuum(cursor: sqlite3.Cursor) -> int:
+            cursor.execute("PRAGMA freelist_count;")
+            free_before = cursor.fetchone()[0]
+            cursor.execute("PRAGMA auto_vacuum;")
+            if cursor.fetchone()[0] != 2:
+                # VACUUM لا يعمل داخل معاملة - يُؤجَّل إن كانت الدفعة تحتوي على كتابات أخرى
+                if self._conn.in_transaction:
+                    return 0
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+                cursor.execute("VACUUM;")
+                logger.info("DatabaseManager: تم تحويل قاعدة البيانات إلى وضع التنظيف التدريجي.")
+                return free_before
+
+            # وحدة sqlite3 تنفذ خطوة واحدة فقط للـ PRAGMA (صفحة واحدة)، لذا نكررها صفحة بصفحة
+            pages = min(int(max_pages), free_before) if max_pages > 0 else free_before
+            for _ in range(pages):
+                cursor.execute("PRAGMA incremental_vacuum(1);")
+            cursor.execute("PRAGMA freelist_count;")
+            return free_before - cursor.fetchone()[0]
+
+        return self._submit_write(_WriteOp('call', None, None, func=vacuum), callback)
+
+    def get_compression_stats(self) -> Dict[str, Any]:
+        """
+        إحصائيات الضغط منذ بدء التشغيل.
+        :return: قاموس بعدد الكتابات والقراءات والأحجام ونسبة الضغط والأزمنة.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        stats['compression_ratio'] = (stats['raw_bytes'] / stats['stored_bytes']) if stats['stored_bytes'] else 1.0
+        stats['avg_encode_ms'] = (stats['encode_seconds'] * 1000 / stats['writes']) if stats['writes'] else 0.0
+        stats['avg_decode_ms'] = (stats['decode_seconds'] * 1000 / stats['reads']) if stats['reads'] else 0.0
+        stats['avg_batch_size'] = (stats['batched_ops'] / stats['commits']) if stats['commits'] else 0.0
+        stats['pending_writes'] = self._write_queue.qsize()
+        stats['compress'] = self.compress
+        stats['use_dictionary'] = self.use_dictionary
+        stats['active_dictionary_id'] = self._active_dictionary_id
+        return stats
+
+    def get_cache_size_info(self) -> Dict[str, Any]:
+        """
+        حجم الكاش لكل جدول محلي بالإضافة لحجم ملف قاعدة البيانات والمساحة الفارغة فيه.
+        :return: قاموس {اسم الجدول: {rows, stored_bytes, compressed_rows, oldest_update, oldest_access}, ...}.
+        """
+        info: Dict[str, Any] = {}
+        if not self._read_conn:
+            return info
+
+        try:
+            with self._read_lock:
+                cursor = self._read_conn.cursor()
+                for cache_table in ("users_cache", "bookings_cache", "records_cache"):
+                    cursor.execute(f"""
+                        SELECT COUNT(*),
+                               COALESCE(SUM(LENGTH(CAST(data AS BLOB))), 0),
+                               COALESCE(SUM(typeof(data) = 'blob'), 0),
+                               MIN(updated_at),
+                               MIN(accessed_at)
+                        FROM {cache_table};
+                    """)
+                    rows, stored_bytes, compressed_rows, oldest_update, oldest_access = cursor.fetchone()
+                    info[cache_table] = {
+                        'rows': rows,
+                        'stored_bytes': stored_bytes,
+                        'compressed_rows': compressed_rows,
+                        'oldest_update': oldest_update,
+                        'oldest_access': oldest_access,
+                    }
+
+                cursor.execute("PRAGMA page_count;")
+                page_count = cursor.fetchone()[0]
+                cursor.execute("PRAGMA page_size;")
+                page_size = cursor.fetchone()[0]
+                cursor.execute("PRAGMA freelist_count;")
+                free_pages = cursor.fetchone()[0]
+
+            info['database_bytes'] = page_count * page_size
+            info['free_bytes'] = free_pages * page_size
+            if os.path.exists(self.db_path):
+                info['file_bytes'] = os.path.getsize(self.db_path)
+            return info
+        except Exception as exc:
+            logger.error(f"DatabaseManager: خطأ أثناء حساب حجم الكاش: {exc}", exc_info=True)
+            return info
 
     def close(self) -> None:
         """
         إغلاق اتصال قاعدة البيانات عند إنهاء التطبيق.
+        يتم أولاً تنفيذ الكتابات المتبقية في الطابور وإيقاف خيط الكتابة.
         """
+        if self._writer_thread and self._writer_thread.is_alive():
+            self._write_queue.put(None)
+            self._writer_thread.join(timeout=5)
+            if self._writer_thread.is_alive():
+                # إغلاق الاتصال تحت خيط كتابة يعمل يُفشل الدفعة الجارية: ننتظر انتهاءه
+                logger.warning("DatabaseManager: لم يتوقف خيط الكتابة خلال المهلة المحددة - انتظار إنهاء الكتابات.")
+                self._writer_thread.join()
+        self._writer_thread = None
+
+        if self._read_conn:
+            with self._read_lock:
+                try:
+                    self._read_conn.close()
+                except Exception as exc:
+                    logger.error(f"DatabaseManager: خطأ أثناء إغلاق اتصال القراءة: {exc}", exc_info=True)
+                finally:
+                    self._read_conn = None
+
         if self._conn:
             try:
                 self._conn.close()
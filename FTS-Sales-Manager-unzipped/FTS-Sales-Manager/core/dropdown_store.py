@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+core/dropdown_store.py
+
+مخزن دائم للقوائم المنسدلة لكل مفتاح على حدة (SQLite) بدلاً من ملف JSON واحد:
+- تحديث ذري لكل قائمة (معاملة واحدة) دون إعادة كتابة بقية القوائم.
+- إضافة قيمة واحدة دون إعادة كتابة القائمة (القيم مخزنة مرتبة في فهرس B-tree).
+- تحميل كسول: قراءة أوقات التحديث فقط عند البدء، وقيم القائمة عند أول طلب.
+- مشاركة بين عدة نسخ من التطبيق على نفس الجهاز (shared_cache_dir):
+  رقم مراجعة لكل قائمة، عقود تحديث (lease) حتى تجلب نسخة واحدة فقط القائمة من
+  Airtable، وكشف رخيص لتغييرات النسخ الأخرى عبر PRAGMA data_version.
+- نسخة مشتركة من سجلات جداول البحث الصغيرة (مثل المستخدمين).
+- حالة مزامنة كل قائمة (سجلات الجدول ووقت آخر مزامنة وآخر تحميل كامل) حتى تبدأ
+  النسخة التالية بمزامنة تفاضلية بدلاً من تحميل الجدول بالكامل.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DropdownStore:
+    """مخزن القوائم المنسدلة (قائمة لكل مفتاح)"""
+
+    DEFAULT_PATH = "cache/dropdown_cache.db"
+    LEGACY_JSON_FILE = "cache/dropdown_cache.json"
+
+    DB_FILE_NAME = "dropdown_cache.db"
+
+    def __init__(self, db_path: str = DEFAULT_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # timeout: انتظار قفل الكتابة عند الكتابة المتزامنة من نسخة أخرى
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._init_schema()
+        self._migrate_legacy_json()
+
+    @classmethod
+    def for_config(cls, config_manager) -> 'DropdownStore':
+        """المخزن في مجلد الكاش المشترك من الإعدادات (cache_settings.shared_cache_dir)"""
+        settings = config_manager.get_cache_settings()
+        shared_dir = settings.get('shared_cache_dir') or os.path.dirname(cls.DEFAULT_PATH)
+        return cls(os.path.join(shared_dir, cls.DB_FILE_NAME))
+
+    def _init_schema(self):
+        """إنشاء الجداول"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("PRAGMA journal_mode = WAL;")
+            cursor.execute("PRAGMA synchronous = NORMAL;")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dropdown_lists (
+                    key TEXT PRIMARY KEY,
+                    updated_at REAL NOT NULL,
+                    revision INTEGER NOT NULL DEFAULT 0
+                );
+            """)
+            # مخازن أقدم بدون عمود المراجعة
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(dropdown_lists);")}
+            if 'revision' not in columns:
+                cursor.execute("ALTER TABLE dropdown_lists ADD COLUMN revision INTEGER NOT NULL DEFAULT 0;")
+            # WITHOUT ROWID: القيم مخزنة فعلياً مرتبة حسب (key, value)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dropdown_values (
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (key, value)
+                ) WITHOUT ROWID;
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS refresh_leases (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS shared_records (
+                    name TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    synced_at REAL NOT NULL,
+                    full_synced_at REAL NOT NULL
+                );
+            """)
+            self._conn.commit()
+
+    def _migrate_legacy_json(self):
+        """نقل محتوى ملف dropdown_cache.json القديم (مرة واحدة) ثم حذفه"""
+        if not os.path.exists(self.LEGACY_JSON_FILE):
+            return
+
+        try:
+            with open(self.LEGACY_JSON_FILE, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+
+            migrated = 0
+            for key, data in cache_data.items():
+                try:
+                    timestamp = datetime.fromisoformat(data.get('timestamp', '')).timestamp()
+                except (ValueError, TypeError, AttributeError):
+                    continue
+                if self.get_timestamp(key) is None:
+                    self.replace(key, data.get('values', []), updated_at=timestamp)
+                    migrated += 1
+
+            os.remove(self.LEGACY_JSON_FILE)
+            logger.info(f"تم نقل {migrated} قائمة من ملف الكاش القديم إلى {self.db_path}")
+        except Exception as e:
+            logger.warning(f"فشل نقل ملف كاش القوائم القديم: {e}")
+
+    # =============== القراءة ===============
+
+    def get_timestamps(self) -> Dict[str, datetime]:
+        """أوقات آخر تحديث لجميع القوائم (بدون قراءة القيم)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, updated_at FROM dropdown_lists;").fetchall()
+        return {key: datetime.fromtimestamp(updated_at) for key, updated_at in rows}
+
+    def get_timestamp(self, key: str) -> Optional[datetime]:
+        """وقت آخر تحديث لقائمة واحدة"""
+        with self._lock:
+            row = self._conn.execute("SELECT updated_at FROM dropdown_lists WHERE key = ?;", (key,)).fetchone()
+        return datetime.fromtimestamp(row[0]) if row else None
+
+    def get_revisions(self) -> Dict[str, Tuple[int, datetime]]:
+        """رقم المراجعة ووقت التحديث لكل قائمة (المراجعة تزيد فقط عند تغير القيم)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, revision, updated_at FROM dropdown_lists;").fetchall()
+        return {key: (revision, datetime.fromtimestamp(updated_at)) for key, revision, updated_at in rows}
+
+    def get_revision(self, key: str) -> Optional[int]:
+        """رقم مراجعة قائمة واحدة"""
+        with self._lock:
+            row = self._conn.execute("SELECT revision FROM dropdown_lists WHERE key = ?;", (key,)).fetchone()
+        return row[0] if row else None
+
+    def data_version(self) -> int:
+        """
+        رقم يتغير فقط عند حفظ تغييرات من اتصال آخر (نسخة أخرى من التطبيق).
+        فحص رخيص جداً (بدون قراءة الجداول) يُستخدم للاستطلاع الدوري.
+        """
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version;").fetchone()[0]
+
+    def load(self, key: str) -> Optional[List[str]]:
+        """
+        قيم قائمة مرتبة (بترتيب الفهرس، بدون فرز إضافي).
+        :return: None إذا لم تُحفظ القائمة من قبل.
+        """
+        with self._lock:
+            if not self._conn.execute("SELECT 1 FROM dropdown_lists WHERE key = ?;", (key,)).fetchone():
+                return None
+            rows = self._conn.execute(
+                "SELECT value FROM dropdown_values WHERE key = ? ORDER BY value;", (key,)
+            ).fetchall()
+        return [value for (value,) in rows]
+
+    # =============== الكتابة ===============
+
+    def replace(self, key: str, values: Iterable[str], updated_at: float = None) -> Tuple[List[str], List[str]]:
+        """
+        استبدال قائمة بالكامل في معاملة واحدة، مع كتابة الفرق فقط.
+        :return: (القيم المضافة، القيم المحذوفة)
+        """
+        new_values = set(values)
+        with self._lock:
+            try:
+                cursor = self._conn.cursor()
+                cursor.execute("SELECT value FROM dropdown_values WHERE key = ?;", (key,))
+                old_values = {value for (value,) in cursor.fetchall()}
+
+                added = sorted(new_values - old_values)
+                removed = sorted(old_values - new_values)
+
+                if removed:
+                    cursor.executemany("DELETE FROM dropdown_values WHERE key = ? AND value = ?;",
+                                       [(key, value) for value in removed])
+                if added:
+                    cursor.executemany("INSERT INTO dropdown_values (key, value) VALUES (?, ?);",
+                                       [(key, value) for value in added])
+                self._touch(cursor, key, updated_at, changed=bool(added or removed))
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+        return added, removed
+
+    def add_value(self, key: str, value: str) -> bool:
+        """إضافة قيمة واحدة (بدون إعادة كتابة القائمة)"""
+        with self._lock:
+            try:
+                cursor = self._conn.cursor()
+                cursor.execute("INSERT OR IGNORE INTO dropdown_values (key, value) VALUES (?, ?);", (key, value))
+                inserted = cursor.rowcount > 0
+                if inserted:
+                    cursor.execute("""
+                        INSERT INTO dropdown_lists (key, updated_at, revision) VALUES (?, ?, 1)
+                        ON CONFLICT(key) DO UPDATE SET revision = revision + 1;
+                    """, (key, time.time()))
+                self._conn.commit()
+                return inserted
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def touch(self, key: str):
+        """تحديث وقت القائمة دون تغيير قيمها (عند التأكد من عدم تغير الجدول)"""
+        with self._lock:
+            self._touch(self._conn.cursor(), key)
+            self._conn.commit()
+
+    @staticmethod
+    def _touch(cursor: sqlite3.Cursor, key: str, updated_at: float = None, changed: bool = False):
+        cursor.execute("""
+            INSERT INTO dropdown_lists (key, updated_at, revision) VALUES (?, ?, 1)
+            ON CONFLICT(key) DO UPDATE SET updated_at = excluded.updated_at,
+                                           revision = revision + ?;
+        """, (key, updated_at or time.time(), 1 if changed else 0))
+
+    # =============== عقود التحديث بين النسخ ===============
+
+    def try_acquire_lease(self, name: str, owner: str, seconds: float) -> bool:
+        """
+        حجز عقد تحديث (مثلاً قائمة أو جدول) حتى لا تجلبه عدة نسخ في نفس الوقت.
+        ينجح إذا لم يكن العقد محجوزاً، أو انتهت مدته، أو كان لنفس المالك.
+        عبارة واحدة ذرية، فلا تنجح نسختان في حجز نفس العقد.
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                cursor = self._conn.execute("""
+                    INSERT INTO refresh_leases (name, owner, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                    WHERE refresh_leases.expires_at < ? OR refresh_leases.owner = excluded.owner;
+                """, (name, owner, now + seconds, now))
+                acquired = cursor.rowcount > 0
+                self._conn.commit()
+                return acquired
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def release_lease(self, name: str, owner: str):
+        """تحرير عقد تحديث (فقط إذا كان لنفس المالك)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM refresh_leases WHERE name = ? AND owner = ?;", (name, owner))
+            self._conn.commit()
+
+    # =============== سجلات مشتركة ===============
+
+    def save_records(self, name: str, records: List[Dict[str, Any]]):
+        """حفظ نسخة مشتركة من سجلات جدول (JSON مضغوط)"""
+        payload = zlib.compress(json.dumps(records, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO shared_records (name, payload, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at;
+            """, (name, payload, time.time()))
+            self._conn.commit()
+
+    def load_records(self, name: str) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """
+        النسخة المشتركة من سجلات جدول.
+        :return: (السجلات، وقت الحفظ بثواني epoch) أو None إذا لم تُحفظ.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, updated_at FROM shared_records WHERE name = ?;", (name,)).fetchone()
+        if not row:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode('utf-8')), row[1]
+
+    def delete_records(self, name: str):
+        """حذف النسخة المشتركة (حتى تجلبها النسخة التالية من المصدر)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_records WHERE name = ?;", (name,))
+            self._conn.commit()
+
+    # =============== حالة المزامنة ===============
+
+    def save_sync_state(self, key: str, records: List[Dict[str, Any]], synced_at: float, full_synced_at: float):
+        """
+        حفظ سجلات جدول القائمة مع وقت بداية آخر مزامنة وآخر تحميل كامل (بثواني epoch)
+        """
+        payload = zlib.compress(json.dumps(records, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO sync_state (key, payload, synced_at, full_synced_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET payload = excluded.payload, synced_at = excluded.synced_at,
+                                               full_synced_at = excluded.full_synced_at
+                WHERE excluded.synced_at >= sync_state.synced_at;
+            """, (key, payload, synced_at, full_synced_at))
+            self._conn.commit()
+
+    def load_sync_state(self, key: str) -> Optional[Tuple[List[Dict[str, Any]], float, float]]:
+        """
+        حالة مزامنة قائمة.
+        :return: (السجلات، وقت آخر مزامنة، وقت آخر تحميل كامل) أو None إذا لم تُحفظ.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, synced_at, full_synced_at FROM sync_state WHERE key = ?;", (key,)).fetchone()
+        if not row:
+            return None
+        return json.loads(zlib.decompress(row[0]).decode('utf-8')), row[1], row[2]
+
+    def delete(self, key: str):
+        """حذف قائمة"""
+        with self._lock:
+            self._conn.execute("DELETE FROM dropdown_values WHERE key = ?;", (key,))
+            self._conn.execute("DELETE FROM dropdown_lists WHERE key = ?;", (key,))
+            self._conn.execute("DELETE FROM sync_state WHERE key = ?;", (key,))
+            self._conn.commit()
+
+    def expire(self, max_age_seconds: float) -> int:
+        """حذف القوائم الأقدم من المدة المحددة"""
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            keys = [key for (key,) in self._conn.execute(
+                "SELECT key FROM dropdown_lists WHERE updated_at < ?;", (cutoff,)).fetchall()]
+            for key in keys:
+                self._conn.execute("DELETE FROM dropdown_values WHERE key = ?;", (key,))
+                self._conn.execute("DELETE FROM dropdown_lists WHERE key = ?;", (key,))
+                self._conn.execute("DELETE FROM sync_state WHERE key = ?;", (key,))
+            self._conn.commit()
+        return len(keys)
+
+    def clear(self):
+        """حذف جميع القوائم"""
+        with self._lock:
+            self._conn.execute("DELETE FROM dropdown_values;")
+            self._conn.execute("DELETE FROM dropdown_lists;")
+            self._conn.execute("DELETE FROM shared_records;")
+            self._conn.execute("DELETE FROM sync_state;")
+            self._conn.commit()
+            self._conn.execute("VACUUM;")
+
+    def size_bytes(self) -> int:
+        """حجم ملفات المخزن على القرص (بما فيها ملف WAL)"""
+        return sum(os.path.getsize(path) for path in (self.db_path, self.db_path + "-wal")
+                   if os.path.exists(path))
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
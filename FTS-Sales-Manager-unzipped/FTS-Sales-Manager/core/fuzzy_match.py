@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+core/fuzzy_match.py
+
+مطابقة مرنة بمسافة التحرير المحدودة (Damerau-Levenshtein بصيغة optimal string
+alignment): إدراج، حذف، استبدال، وتبديل حرفين متجاورين.
+
+- المسافة تُحسب للاستعلام مقابل أفضل جزء من القيمة (البحث التقريبي داخل النص)،
+  فالاستعلام "hurgada" يطابق "Hilton Hurghada Plaza" بمسافة 1.
+- الحساب متوازٍ على مستوى البتات (Myers، مع التبديل حسب Hyyrö): عمود كامل من
+  جدول المسافات في بضع عمليات على عدد صحيح لكل حرف من القيمة، بدلاً من خلية لكل
+  حرفين، ويتوقف مبكراً عندما لا يمكن أن تنزل المسافة إلى الحد المسموح.
+- تُستخدم على المرشحين الذين اختارهم فهرس البحث (SearchIndex) فقط وليس كل القيم،
+  مع أقنعة الاستعلام (pattern_masks) محسوبة مرة واحدة لكل استعلام وليس لكل مرشح.
+
+مثال:
+    bounded_edit_distance("hurgada", "hilton hurghada plaza", 2)   # 1
+    edit_similarity("hurgada", "hilton hurghada plaza", 0.6)      # 0.857...
+"""
+
+
+def pattern_masks(pattern: str) -> dict:
+    """قناع مواضع كل حرف في الاستعلام (يُعاد استخدامه لكل القيم المقارنة به)"""
+    masks = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def bounded_edit_distance(pattern: str, text: str, max_distance: int, masks: dict = None) -> int:
+    """
+    أقل مسافة تحرير بين pattern وأي جزء متصل من text.
+    :param masks: نتيجة pattern_masks(pattern) إن كانت محسوبة مسبقاً.
+    :return: المسافة، أو max_distance + 1 إذا تجاوزت الحد (بدون إكمال الحساب).
+    """
+    m = len(pattern)
+    if m == 0:
+        return 0
+    n = len(text)
+    if n < m - max_distance:
+        return max_distance + 1
+
+    if masks is None:
+        masks = pattern_masks(pattern)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    positive, negative = full, 0  # فروق عمودية +1 / -1 في العمود الحالي
+    previous_match, previous_diagonal = 0, 0
+    score = best = m  # مسافة الاستعلام كاملاً حتى الموضع الحالي، وأقلها
+
+    for j, char in enumerate(text):
+        match = masks.get(char, 0)
+        transposition = (((~previous_diagonal) & match) << 1) & previous_match
+        diagonal = ((((match & positive) + positive) ^ positive) | match | negative | transposition) & full
+        horizontal_positive = negative | (~(diagonal | positive) & full)
+        horizontal_negative = positive & diagonal
+
+        if horizontal_positive & last:
+            score += 1
+        elif horizontal_negative & last:
+            score -= 1
+            if score < best:
+                best = score
+
+        # المسافة تنزل 1 على الأكثر لكل حرف متبقٍ
+        if best > max_distance and score - (n - 1 - j) > max_distance:
+            return max_distance + 1
+
+        # البحث داخل النص: الصف صفر ثابت (المطابقة قد تبدأ من أي موضع)
+        horizontal_positive = (horizontal_positive << 1) & full
+        horizontal_negative = (horizontal_negative << 1) & full
+        positive = horizontal_negative | (~(diagonal | horizontal_positive) & full)
+        negative = horizontal_positive & diagonal
+        previous_match, previous_diagonal = match, diagonal
+
+    return best if best <= max_distance else max_distance + 1
+
+
+def max_distance_for(query_length: int, threshold: float) -> int:
+    """أقصى عدد أخطاء مسموح لطول الاستعلام حتى يبقى التشابه >= threshold"""
+    return int((1.0 - threshold) * query_length + 1e-9)
+
+
+def edit_similarity(query_key: str, value_key: str, threshold: float = 0.6) -> float:
+    """
+    التشابه بين الاستعلام والقيمة: 1 - (المسافة / طول الاستعلام).
+    :return: 0.0 إذا كان التشابه أقل من threshold (بدون حساب المسافة كاملة).
+    """
+    if not query_key or not value_key:
+        return 0.0
+    max_distance = max_distance_for(len(query_key), threshold)
+    distance = bounded_edit_distance(query_key, value_key, max_distance)
+    if distance > max_distance:
+        return 0.0
+    return 1.0 - distance / len(query_key)
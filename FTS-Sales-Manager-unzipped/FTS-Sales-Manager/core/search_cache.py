@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+core/search_cache.py
+
+تخزين مؤقت مشترك (LRU) لنتائج البحث في فهارس البحث (core.search_index).
+
+- المفتاح (إصدار الفهرس، مفتاح البحث الموحد للاستعلام): كل تغيير في قائمة القيم
+  ينتج فهرساً بإصدار جديد، فلا تُستخدم نتائج قائمة قديمة أبداً؛ مداخلها تخرج
+  من التخزين تلقائياً مع الاستخدام.
+- المخزن هو مواقع كل القيم المحتوية على الاستعلام (وليس أفضل k فقط)، فيمكن
+  إجابة "الاستعلام + حرف" بتصفية نتيجة الاستعلام السابق بدلاً من البحث من جديد:
+  كل قيمة تحتوي "abcd" تحتوي "abc". يُخزن المسح الذي اكتمل فقط؛ المسح الذي توقف
+  عند اكتمال النتائج كان رخيصاً أصلاً.
+- الذاكرة محدودة بعدد المداخل وبمجموع المواقع المخزنة؛ الأقدم استخداماً يُحذف أولاً.
+- آمن للاستخدام من خيط الواجهة والخيط العامل للبحث معاً.
+- إحصائيات: إصابات مباشرة، إجابات بالتصفية، إخفاقات، ونسبة الإصابة (stats).
+
+مثال:
+    cache = get_search_cache()
+    positions, base = cache.lookup(index.version, "hurg")
+    if positions is None:
+        positions = scan(base)  # تصفية base (نتيجة "hur" مثلاً) أو البحث في الفهرس
+        cache.store(index.version, "hurg", positions)
+    cache.stats()  # {'hits': 12, 'narrowed': 30, 'misses': 5, 'hit_rate': 0.89, ...}
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+MAX_ENTRIES = 256
+MAX_POSITIONS = 500_000  # مجموع المواقع المخزنة (4 بايت لكل موقع ≈ 2 ميجابايت)
+
+
+class SearchResultCache:
+    """تخزين LRU لمواقع القيم المطابقة لكل (إصدار فهرس، استعلام)"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_positions: int = MAX_POSITIONS):
+        self.max_entries = max_entries
+        self.max_positions = max_positions
+        self._entries: 'OrderedDict[Tuple[int, str], array]' = OrderedDict()
+        self._positions = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._narrowed = 0
+        self._misses = 0
+
+    def lookup(self, version: int, query_key: str) -> Tuple[Optional[array], Optional[array]]:
+        """
+        (مواقع الاستعلام المخزنة، None) عند الإصابة، وإلا (None، نتيجة أطول بادئة مخزنة
+        للاستعلام لتصفيتها أو None للبحث الكامل في الفهرس).
+        """
+        key = (version, query_key)
+        with self._lock:
+            positions = self._entries.get(key)
+            if positions is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return positions, None
+            base = self._longest_prefix(version, query_key)
+            if base is not None:
+                self._narrowed += 1
+            else:
+                self._misses += 1
+            return None, base
+
+    def store(self, version: int, query_key: str, positions: array):
+        """حفظ مواقع كل القيم المحتوية على الاستعلام (بترتيب القيم)"""
+        with self._lock:
+            self._store((version, query_key), positions)
+
+    def _longest_prefix(self, version: int, query_key: str) -> Optional[array]:
+        """نتيجة أطول بادئة مخزنة للاستعلام (بدون تحديث ترتيب الاستخدام)"""
+        for length in range(len(query_key) - 1, 0, -1):
+            positions = self._entries.get((version, query_key[:length]))
+            if positions is not None:
+                return positions
+        return None
+
+    def _store(self, key: Tuple[int, str], positions: array):
+        size = len(positions)
+        if size > self.max_positions:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._positions -= len(previous)
+        self._entries[key] = positions
+        self._positions += size
+        while len(self._entries) > self.max_entries or self._positions > self.max_positions:
+            _, evicted = self._entries.popitem(last=False)
+            self._positions -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._positions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """عدد الإصابات والتصفيات والإخفاقات ونسبة الإصابة وحجم التخزين الحالي"""
+        with self._lock:
+            lookups = self._hits + self._narrowed + self._misses
+            return {
+                'hits': self._hits,
+                'narrowed': self._narrowed,
+                'misses': self._misses,
+                'hit_rate': round((self._hits + self._narrowed) / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'positions': self._positions,
+            }
+
+
+_search_cache = SearchResultCache()
+
+
+def get_search_cache() -> SearchResultCache:
+    """التخزين المؤقت المشترك لنتائج البحث"""
+    return _search_cache
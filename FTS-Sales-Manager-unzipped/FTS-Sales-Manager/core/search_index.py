@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+core/search_index.py
+
+محرك بحث موحد لحقول القوائم المنسدلة والإكمال التلقائي.
+
+يُبنى الفهرس مرة واحدة لكل قائمة قيم ثم يجيب عن الاستعلامات بمستويات مرتبة:
+- تطابق تام ومن البداية: بحث ثنائي في مفاتيح البحث المرتبة.
+- تطابق في أي مكان: فهرس مقلوب للمقاطع الثنائية والثلاثية (n-grams)؛ المرشحون
+  هم أقصر قائمة مواقع لمقاطع الاستعلام، ثم يُتحقق من احتوائهم على الاستعلام.
+  مواقع الاستعلامات الأطول تُخزن مؤقتاً (core.search_cache) بإصدار الفهرس، فإضافة
+  حرف للاستعلام تصفّي نتيجة الاستعلام السابق فقط.
+- بحث مرن: القيم التي تشترك مع الاستعلام في أكبر عدد من المقاطع الثلاثية فقط
+  تُقيّم بمسافة التحرير المحدودة (core.fuzzy_match) بدلاً من تقييم كل القيم.
+
+مفاتيح البحث موحدة (core.text_normalize): حالة الأحرف، التشكيل، صيغ الألف والياء
+والتاء المربوطة؛ تُحسب مرة واحدة لكل قيمة عند البناء ومرة للاستعلام.
+
+النتائج أفضل k قيمة مع نوع التطابق والنقاط.
+
+مثال:
+    index = SearchIndex(["Hurghada", "Cairo", "Sharm El Sheikh"])
+    index.search("har", limit=5)
+    # [SearchHit(value='Sharm El Sheikh', kind='contains', score=0.7)]
+"""
+
+import bisect
+import heapq
+import itertools
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from core.fuzzy_match import bounded_edit_distance, max_distance_for, pattern_masks
+from core.search_cache import get_search_cache
+from core.text_normalize import search_key
+
+# أنواع التطابق ونقاطها (بنفس ترتيب الأولوية المستخدم في الحقول)
+MATCH_EXACT = 'exact'
+MATCH_PREFIX = 'prefix'
+MATCH_CONTAINS = 'contains'
+MATCH_FUZZY = 'fuzzy'
+
+SCORE_EXACT = 1.0
+SCORE_PREFIX = 0.9
+SCORE_CONTAINS = 0.7
+FUZZY_WEIGHT = 0.6  # نقاط البحث المرن = التشابه × 0.6 (دائماً أقل من التطابق في أي مكان)
+
+# أعلى محرف في Unicode: نهاية نطاق البادئة
+_PREFIX_END = chr(0x10FFFF)
+
+# أرقام إصدارات الفهارس فريدة على مستوى العملية (مفتاح التخزين المؤقت للنتائج)
+_versions = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    """نتيجة بحث واحدة"""
+    value: str
+    kind: str
+    score: float
+
+
+def _grams(text: str, size: int) -> set:
+    """المقاطع المتتالية بطول size (بدون تكرار)"""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def build_search_index(values: Iterable[str]) -> 'SearchIndex':
+    """فهرس البحث لقائمة قيم: المشترك إذا كانت ValueIndex، وإلا فهرس جديد"""
+    shared = getattr(values, 'search_index', None)
+    return shared() if callable(shared) else SearchIndex(values)
+
+
+class SearchIndex:
+    """فهرس بحث غير قابل للتعديل لقائمة قيم واحدة"""
+
+    GRAM_SIZES = (2, 3)
+    FUZZY_CANDIDATES = 100  # أقصى عدد قيم تُقيّم بدالة التشابه
+    FUZZY_STOP_RATIO = 0.2  # المقاطع الشائعة جداً (في أكثر من 20% من القيم) لا تميز المرشحين
+
+    __slots__ = ('_key_func', '_values', '_keys', '_sorted_keys', '_sorted_positions', '_postings', 'version')
+
+    def __init__(self, values: Iterable[str], key_func: Callable[[str], str] = search_key,
+                 keys: Optional[Sequence[str]] = None):
+        """:param keys: مفاتيح بحث محسوبة مسبقاً بنفس key_func وبترتيب القيم (اختياري)"""
+        self._key_func = key_func
+        self._values: Tuple[str, ...] = tuple(values)
+        self._keys: Tuple[str, ...] = tuple(keys) if keys is not None else tuple(
+            key_func(value) for value in self._values)
+
+        # مفاتيح مرتبة مع موقع كل قيمة (للتطابق التام ومن البداية)
+        pairs = sorted((key, position) for position, key in enumerate(self._keys))
+        self._sorted_keys: Tuple[str, ...] = tuple(key for key, _ in pairs)
+        self._sorted_positions: Tuple[int, ...] = tuple(position for _, position in pairs)
+
+        # الفهرس المقلوب: مقطع -> مواقع القيم (تصاعدياً، أي بترتيب القيم الأصلي)
+        postings: Dict[str, array] = {}
+        for position, key in enumerate(self._keys):
+            for size in self.GRAM_SIZES:
+                grams = _grams(key, size)
+                for gram in grams:
+                    posting = postings.get(gram)
+                    if posting is None:
+                        posting = postings[gram] = array('I')
+                    posting.append(position)
+        self._postings = postings
+        self.version = next(_versions)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    # =============== البحث ===============
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True, fuzzy_threshold: float = 0.6,
+               similarity: Optional[Callable[[str, str], float]] = None, boosts=None) -> List[SearchHit]:
+        """
+        أفضل limit نتيجة للاستعلام مرتبة حسب نوع التطابق ثم ترتيب القيم.
+        :param similarity: دالة تشابه بديلة للبحث المرن تُستدعى بمفتاحي البحث للاستعلام
+                           والقيمة (الافتراضي مسافة التحرير المحدودة بالحد fuzzy_threshold).
+        :param boosts: اختيارات المستخدم المرتبة (core.usage_ranking.UsageBoosts): تأتي
+                       أولاً داخل كل نوع تطابق.
+        """
+        query_key = self._key_func((query or '').strip())
+        if not query_key or limit <= 0:
+            return []
+
+        hits: List[SearchHit] = []
+        seen = set()
+        preferred = self._preferred_positions(query_key, boosts) if boosts else {}
+
+        # التطابق التام ومن البداية
+        start = bisect.bisect_left(self._sorted_keys, query_key)
+        end = bisect.bisect_left(self._sorted_keys, query_key + _PREFIX_END, start)
+        exact, prefix = list(preferred.get(MATCH_EXACT, ())), list(preferred.get(MATCH_PREFIX, ()))
+        for i in range(start, end):
+            position = self._sorted_positions[i]
+            (exact if self._sorted_keys[i] == query_key else prefix).append(position)
+        for position in exact:
+            if position in seen:
+                continue
+            hits.append(SearchHit(self._values[position], MATCH_EXACT, SCORE_EXACT))
+            seen.add(position)
+        for position in prefix:
+            if len(hits) >= limit:
+                return hits
+            if position in seen:
+                continue
+            hits.append(SearchHit(self._values[position], MATCH_PREFIX, SCORE_PREFIX))
+            seen.add(position)
+        if len(hits) >= limit:
+            return hits[:limit]
+
+        # التطابق في أي مكان
+        matches = itertools.chain(preferred.get(MATCH_CONTAINS, ()), self._matching_positions(query_key))
+        for position in matches:
+            if position in seen:
+                continue
+            hits.append(SearchHit(self._values[position], MATCH_CONTAINS, SCORE_CONTAINS))
+            seen.add(position)
+            if len(hits) >= limit:
+                return hits
+
+        # البحث المرن على المرشحين فقط
+        if fuzzy:
+            needed = limit - len(hits)
+            if similarity is None:
+                ranked = self._edit_distance_matches(query_key, seen, needed, fuzzy_threshold)
+            else:
+                ranked = self._similarity_matches(query_key, seen, needed, fuzzy_threshold, similarity)
+            for value_score, position in ranked:
+                hits.append(SearchHit(self._values[position], MATCH_FUZZY, value_score * FUZZY_WEIGHT))
+
+        return hits
+
+    def _edit_distance_matches(self, query_key: str, exclude: set, needed: int,
+                               threshold: float) -> List[Tuple[float, int]]:
+        """
+        أفضل needed قيمة بمسافة التحرير المحدودة: (التشابه، الموقع) مرتبة.
+        كل خطأ يُفسد 3 مقاطع ثلاثية على الأكثر، فعدد المقاطع المشتركة يعطي حداً أدنى
+        للمسافة؛ المرشحون مرتبون تنازلياً حسبه فيتوقف التقييم عندما لا يمكن لمرشح
+        تالٍ أن يكون أفضل، ويضيق الحد المسموح كلما اكتملت النتائج.
+        """
+        max_errors = max_distance_for(len(query_key), threshold)
+        candidates, counted = self._fuzzy_candidates(query_key, exclude)
+        min_shared = counted - 3 * max_errors
+        masks = pattern_masks(query_key)
+
+        found: List[Tuple[int, int, int]] = []  # (المسافة، ترتيب المرشح، الموقع) مرتبة
+        for rank, (position, shared) in enumerate(candidates):
+            if shared < min_shared:
+                break
+            lower_bound = -(-(counted - shared) // 3)
+            bound = max_errors if len(found) < needed else found[-1][0] - 1
+            if lower_bound > bound:
+                break
+
+            distance = bounded_edit_distance(query_key, self._keys[position], bound, masks)
+            if distance <= bound:
+                bisect.insort(found, (distance, rank, position))
+                del found[needed:]
+
+        return [(1.0 - distance / len(query_key), position) for distance, _, position in found]
+
+    def _similarity_matches(self, query_key: str, exclude: set, needed: int, threshold: float,
+                            similarity: Callable[[str, str], float]) -> List[Tuple[float, int]]:
+        """أفضل needed قيمة بدالة تشابه مخصصة على كل المرشحين"""
+        candidates, _ = self._fuzzy_candidates(query_key, exclude)
+        scored = []
+        for position, _ in candidates:
+            value_score = similarity(query_key, self._keys[position])
+            if value_score >= threshold:
+                scored.append((-value_score, position))
+        scored.sort()
+        return [(-negative_score, position) for negative_score, position in scored[:needed]]
+
+    def _preferred_positions(self, query_key: str, boosts) -> Dict[str, List[int]]:
+        """
+        مواقع اختيارات المستخدم المطابقة للاستعلام حسب نوع التطابق (بترتيب الأرجحية).
+        القائمة صغيرة ومفاتيحها محسوبة مسبقاً، فالكلفة ثابتة لكل استعلام.
+        """
+        keys = boosts.keys if self._key_func is search_key else [self._key_func(value) for value in boosts.values]
+        preferred: Dict[str, List[int]] = {}
+        for value, key in zip(boosts.values, keys):
+            if key == query_key:
+                kind = MATCH_EXACT
+            elif key.startswith(query_key):
+                kind = MATCH_PREFIX
+            elif query_key in key:
+                kind = MATCH_CONTAINS
+            else:
+                continue
+            position = self._position_of(value, key)
+            if position is not None:
+                preferred.setdefault(kind, []).append(position)
+        return preferred
+
+    def _position_of(self, value: str, key: str) -> Optional[int]:
+        """موقع القيمة في الفهرس (بحث ثنائي بمفتاحها) أو None إذا لم تعد موجودة"""
+        i = bisect.bisect_left(self._sorted_keys, key)
+        while i < len(self._sorted_keys) and self._sorted_keys[i] == key:
+            position = self._sorted_positions[i]
+            if self._values[position] == value:
+                return position
+            i += 1
+        return None
+
+    def _matching_positions(self, query_key: str) -> Iterator[int]:
+        """
+        مواقع القيم المحتوية على الاستعلام بترتيب القيم (تُنتج تدريجياً حتى يكتفي البحث).
+        استعلام بطول مقطع هو قائمة مواقعه مباشرة؛ الأطول من التخزين المؤقت المشترك أو
+        بتصفية نتيجة بادئته المخزنة، ويُخزن إذا اكتمل المسح.
+        """
+        keys = self._keys
+        if len(query_key) < min(self.GRAM_SIZES):
+            # استعلام بحرف واحد: مسح مباشر (يتوقف عند اكتمال النتائج)
+            yield from (position for position in range(len(keys)) if query_key in keys[position])
+            return
+        if len(query_key) in self.GRAM_SIZES:
+            yield from self._postings.get(query_key, ())
+            return
+
+        cache = get_search_cache()
+        positions, base = cache.lookup(self.version, query_key)
+        if positions is not None:
+            yield from positions
+            return
+
+        found = array('I')
+        for position in (base if base is not None else self._contains_candidates(query_key)):
+            if query_key in keys[position]:
+                found.append(position)
+                yield position
+        cache.store(self.version, query_key, found)
+
+    def _contains_candidates(self, query_key: str) -> Iterable[int]:
+        """المواقع المحتمل احتواؤها على الاستعلام: أقصر قائمة مواقع لمقاطعه"""
+        size = min(len(query_key), max(self.GRAM_SIZES))
+        best = None
+        for gram in _grams(query_key, size):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return ()
+            if best is None or len(posting) < len(best):
+                best = posting
+        return best or ()
+
+    def _fuzzy_candidates(self, query_key: str, exclude: set) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        القيم التي تشترك مع الاستعلام في أكبر عدد من المقاطع الثلاثية (غير الشائعة جداً).
+        :return: ([(الموقع، عدد المقاطع المشتركة)] تنازلياً، عدد مقاطع الاستعلام المحتسبة)
+        """
+        query_grams = _grams(query_key, 3)
+        stop_length = max(self.FUZZY_CANDIDATES, int(len(self._values) * self.FUZZY_STOP_RATIO))
+        shared = Counter()
+        counted = 0
+        for gram in query_grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                counted += 1
+            elif len(posting) <= stop_length:
+                counted += 1
+                shared.update(posting)
+        for position in exclude:
+            shared.pop(position, None)
+
+        return shared.most_common(self.FUZZY_CANDIDATES), counted
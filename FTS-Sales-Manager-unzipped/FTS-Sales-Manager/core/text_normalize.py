@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+core/text_normalize.py
+
+توحيد النصوص العربية واللاتينية لمفاتيح البحث.
+
+يُطبق مرة واحدة لكل قيمة عند تحميل القائمة (ويُخزن المفتاح بجانب القيمة)،
+ومرة واحدة للاستعلام، فتتطابق الصيغ المختلفة لنفس الاسم:
+- توحيد حالة الأحرف (casefold) وإزالة علامات اللاتينية (é -> e).
+- حذف التشكيل والتطويل.
+- توحيد الألف (أ إ آ ٱ -> ا)، والياء (ى ئ -> ي)، والواو (ؤ -> و)، والتاء المربوطة (ة -> ه).
+- الأرقام العربية الهندية إلى أرقام لاتينية، وضغط المسافات.
+- نقل حرفي اختياري للعربية إلى اللاتينية (search_settings.transliterate).
+
+مثال:
+    normalize_search_key("مَدِينَةُ الأَقْصُر")   # 'مدينه الاقصر'
+    normalize_search_key("Café  Royal")        # 'cafe royal'
+"""
+
+import re
+import unicodedata
+
+# التشكيل (الفتحة ... السكون، وعلامات القرآن) والألف الخنجرية والتطويل
+_TASHKEEL = re.compile('[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+_SPACES = re.compile(r'\s+')
+
+_LETTER_FORMS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ی': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+    'ک': 'ك',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+    '۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4',
+    '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9',
+})
+
+# نقل حرفي تقريبي (بالنطق المصري الشائع في أسماء الفنادق والمدن: ج -> g)
+_TRANSLITERATION = str.maketrans({
+    'ا': 'a', 'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'g', 'ح': 'h', 'خ': 'kh',
+    'د': 'd', 'ذ': 'z', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh', 'ص': 's',
+    'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': 'a', 'غ': 'gh', 'ف': 'f', 'ق': 'q',
+    'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h', 'و': 'o', 'ي': 'i',
+    'ء': '',
+})
+
+_transliterate_enabled = False
+
+
+def set_transliteration(enabled: bool):
+    """
+    تفعيل النقل الحرفي في مفاتيح البحث.
+    يُستدعى مرة واحدة عند بدء التطبيق قبل بناء أي فهرس بحث، لأن المفاتيح
+    المخزنة يجب أن تُبنى بنفس الإعداد المستخدم للاستعلام.
+    """
+    global _transliterate_enabled
+    _transliterate_enabled = bool(enabled)
+
+
+def _strip_latin_marks(text: str) -> str:
+    """إزالة علامات الحروف اللاتينية (é -> e) مع إبقاء الحروف العربية كما هي"""
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_search_key(text: str, transliterate: bool = False) -> str:
+    """مفتاح البحث الموحد لنص واحد"""
+    if not text:
+        return ''
+    key = _strip_latin_marks(str(text)).casefold()
+    key = _TASHKEEL.sub('', key).translate(_LETTER_FORMS)
+    if transliterate:
+        key = key.translate(_TRANSLITERATION)
+    return _SPACES.sub(' ', key).strip()
+
+
+def search_key(text: str) -> str:
+    """مفتاح البحث حسب إعداد التطبيق (دالة المفاتيح الافتراضية لفهارس البحث)"""
+    return normalize_search_key(text, _transliterate_enabled)
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+core/usage_ranking.py
+
+ترتيب شخصي لاقتراحات الحقول حسب استخدام كل مستخدم (الأحدث والأكثر تكراراً).
+
+- كل اختيار من قائمة منسدلة يُسجل للمستخدم الحالي: نقاط القيمة تتضاعف نزولاً
+  (نصف عمر HALF_LIFE_DAYS) ثم يُضاف 1، فالاختيار الحديث يرجح على القديم.
+- الإحصائيات محفوظة محلياً (SQLite صغير)، وتُحمّل مرة واحدة عند تسجيل الدخول.
+- لكل قائمة ترتيب محسوب مسبقاً (UsageBoosts) بمفاتيح بحث جاهزة؛ يُعاد حسابه
+  فقط عند اختيار جديد في نفس القائمة. التضاؤل يضرب كل النقاط بنفس المعامل،
+  فالترتيب لا يتغير مع الوقت ولا يحتاج إعادة حساب.
+- سياسة التضاؤل تبقي البيانات صغيرة: القيم التي نزلت نقاطها تحت MIN_SCORE
+  تُحذف، ولا يُحتفظ بأكثر من MAX_ENTRIES قيمة لكل قائمة.
+
+الاستخدام في الحقول:
+    boosts = get_usage_ranking().boosts("Agency")
+    index.search("ho", limit=10, boosts=boosts)   # اختيارات المستخدم أولاً في كل مستوى
+    boosts.pin_to_front(values)                   # القائمة الكاملة للنص الفارغ
+    get_usage_ranking().record("Agency", value)   # عند الاختيار
+"""
+
+import bisect
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Sequence as SequenceABC
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from core.logger import logger
+from core.text_normalize import search_key
+
+HALF_LIFE_DAYS = 30
+MAX_ENTRIES = 50  # أقصى عدد قيم محفوظة لكل قائمة ولكل مستخدم
+MIN_SCORE = 0.05  # اختيار واحد يُنسى بعد ~4 أنصاف عمر بدون استخدام
+
+
+class UsageBoosts:
+    """ترتيب ثابت لاختيارات المستخدم في قائمة واحدة (الأرجح أولاً)"""
+
+    __slots__ = ('values', 'keys', '_rank', '_pinned')
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: Tuple[str, ...] = tuple(values)
+        # مفاتيح البحث تُحسب هنا مرة واحدة وليس عند كل ضغطة مفتاح
+        self.keys: Tuple[str, ...] = tuple(search_key(value) for value in self.values)
+        self._rank = {value: rank for rank, value in enumerate(self.values)}
+        self._pinned = None  # (القائمة، العرض) لآخر قائمة طُلب لها pin_to_front
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def rank(self, value: str) -> Optional[int]:
+        """ترتيب القيمة بين اختيارات المستخدم (0 = الأرجح) أو None"""
+        return self._rank.get(value)
+
+    def pin_to_front(self, values: Sequence[str]) -> Sequence[str]:
+        """القائمة الكاملة مع اختيارات المستخدم الموجودة فيها أولاً (بدون نسخ القائمة)"""
+        if not self.values or not values:
+            return values
+        cached = self._pinned
+        if cached is not None and cached[0] is values:
+            return cached[1]
+
+        pinned, positions = [], []
+        for value in self.values:
+            if value in values:
+                pinned.append(value)
+                positions.append(values.index(value))
+        view = PinnedValues(pinned, sorted(positions), values) if pinned else values
+        self._pinned = (values, view)
+        return view
+
+
+EMPTY_BOOSTS = UsageBoosts()
+
+
+class PinnedValues(SequenceABC):
+    """عرض للقراءة فقط: قيم مثبتة في البداية ثم بقية القائمة بترتيبها بدون تكرار"""
+
+    __slots__ = ('_pinned', '_positions', '_values')
+
+    def __init__(self, pinned: List[str], positions: List[int], values: Sequence[str]):
+        """:param positions: مواقع القيم المثبتة في values (تصاعدياً)"""
+        self._pinned = pinned
+        self._positions = positions
+        self._values = values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        if item < len(self._pinned):
+            return self._pinned[item]
+
+        # الموقع الأصلي للعنصر رقم rest بين غير المثبتة: أصغر j حيث j = rest + عدد المثبتة حتى j
+        rest = item - len(self._pinned)
+        position = rest
+        while True:
+            shifted = rest + bisect.bisect_right(self._positions, position)
+            if shifted == position:
+                return self._values[position]
+            position = shifted
+
+    def copy(self) -> List[str]:
+        return list(self)
+
+
+def _rank_key(score: float, updated_at: float, half_life: float) -> float:
+    """مفتاح ترتيب لا يتغير مع الوقت: لوغاريتم النقاط منقولاً إلى زمن مرجعي واحد"""
+    return math.log2(score) + updated_at / half_life
+
+
+class UsageRanking:
+    """إحصائيات اختيار المستخدم الحالي لكل قائمة مع ترتيب محسوب مسبقاً"""
+
+    DEFAULT_PATH = "cache/usage_stats.db"
+
+    def __init__(self, db_path: str = DEFAULT_PATH, half_life_days: float = HALF_LIFE_DAYS,
+                 max_entries: int = MAX_ENTRIES, enabled: bool = True):
+        self.db_path = db_path
+        self.half_life = half_life_days * 86400
+        self.max_entries = max_entries
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._username: Optional[str] = None
+        # القائمة -> القيمة -> (النقاط عند آخر اختيار، وقت آخر اختيار)
+        self._scores: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        self._boosts: Dict[str, UsageBoosts] = {}
+
+    def configure(self, settings: Dict):
+        """تطبيق search_settings.usage_ranking من الإعدادات (قبل تسجيل الدخول)"""
+        self.enabled = bool(settings.get('enabled', True))
+        self.half_life = float(settings.get('half_life_days', HALF_LIFE_DAYS)) * 86400
+        self.max_entries = int(settings.get('max_entries_per_list', MAX_ENTRIES))
+
+    # =============== المستخدم ===============
+
+    def set_user(self, username: Optional[str]):
+        """تحميل إحصائيات المستخدم (عند تسجيل الدخول) أو مسحها من الذاكرة (None)"""
+        username = (username or '').strip().lower() or None
+        scores: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        if username and self.enabled:
+            try:
+                scores = self._load(username)
+            except sqlite3.Error as e:
+                logger.warning(f"تعذر تحميل إحصائيات الاستخدام: {e}")
+
+        self._username = username
+        self._scores = scores
+        self._boosts = {list_key: self._build_boosts(values) for list_key, values in scores.items()}
+
+    def _load(self, username: str) -> Dict[str, Dict[str, Tuple[float, float]]]:
+        """قراءة إحصائيات المستخدم بعد حذف ما انتهى بالتضاؤل"""
+        self.prune(username)
+        scores: Dict[str, Dict[str, Tuple[float, float]]] = {}
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT list_key, value, score, updated_at FROM usage_stats WHERE username = ?;",
+                (username,)).fetchall()
+        for list_key, value, score, updated_at in rows:
+            scores.setdefault(list_key, {})[value] = (score, updated_at)
+        return scores
+
+    # =============== التسجيل والقراءة ===============
+
+    def record(self, list_key: str, value: str):
+        """تسجيل اختيار قيمة من قائمة (من خيط الواجهة عند الاختيار)"""
+        if not self.enabled or not self._username or not list_key or not value:
+            return
+
+        now = time.time()
+        values = dict(self._scores.get(list_key, {}))
+        score, updated_at = values.get(value, (0.0, now))
+        values[value] = (self._decayed(score, updated_at, now) + 1.0, now)
+
+        dropped = []
+        if len(values) > self.max_entries:
+            ranked = sorted(values, key=lambda item: _rank_key(*values[item], self.half_life))
+            dropped = ranked[:len(values) - self.max_entries]
+            for item in dropped:
+                del values[item]
+
+        self._scores[list_key] = values
+        self._boosts[list_key] = self._build_boosts(values)
+
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("""
+                    INSERT INTO usage_stats (username, list_key, value, score, updated_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(username, list_key, value) DO UPDATE SET score = excluded.score,
+                                                                         updated_at = excluded.updated_at;
+                """, (self._username, list_key, value, values[value][0], now))
+                if dropped:
+                    conn.executemany(
+                        "DELETE FROM usage_stats WHERE username = ? AND list_key = ? AND value = ?;",
+                        [(self._username, list_key, item) for item in dropped])
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"تعذر حفظ إحصائيات الاستخدام: {e}")
+
+    def boosts(self, list_key: Optional[str]) -> UsageBoosts:
+        """الترتيب المحسوب مسبقاً لقائمة (فارغ إذا لم توجد اختيارات)؛ آمن من أي خيط"""
+        if not list_key:
+            return EMPTY_BOOSTS
+        return self._boosts.get(list_key, EMPTY_BOOSTS)
+
+    def _build_boosts(self, values: Dict[str, Tuple[float, float]]) -> UsageBoosts:
+        ranked = sorted(values, key=lambda value: _rank_key(*values[value], self.half_life), reverse=True)
+        return UsageBoosts(ranked)
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * 0.5 ** (max(0.0, now - updated_at) / self.half_life)
+
+    # =============== سياسة التضاؤل ===============
+
+    def prune(self, username: Optional[str] = None) -> int:
+        """
+        حذف القيم التي نزلت نقاطها تحت MIN_SCORE، والإبقاء على أفضل max_entries
+        قيمة لكل قائمة. :return: عدد الصفوف المحذوفة
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            query = "SELECT username, list_key, value, score, updated_at FROM usage_stats"
+            rows = conn.execute(query + (" WHERE username = ?;" if username else ";"),
+                                (username,) if username else ()).fetchall()
+
+            groups: Dict[Tuple[str, str], List[Tuple[float, str]]] = {}
+            expired = []
+            for user, list_key, value, score, updated_at in rows:
+                if self._decayed(score, updated_at, now) < MIN_SCORE:
+                    expired.append((user, list_key, value))
+                else:
+                    groups.setdefault((user, list_key), []).append(
+                        (_rank_key(score, updated_at, self.half_life), value))
+            for (user, list_key), ranked in groups.items():
+                if len(ranked) > self.max_entries:
+                    ranked.sort(reverse=True)
+                    expired.extend((user, list_key, value) for _, value in ranked[self.max_entries:])
+
+            if expired:
+                conn.executemany(
+                    "DELETE FROM usage_stats WHERE username = ? AND list_key = ? AND value = ?;", expired)
+                conn.commit()
+        if expired:
+            logger.debug(f"حذف {len(expired)} من إحصائيات الاستخدام القديمة")
+        return len(expired)
+
+    # =============== التخزين ===============
+
+    def _connection(self) -> sqlite3.Connection:
+        """الاتصال بملف الإحصائيات (يُفتح عند أول استخدام)"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS usage_stats (
+                    username TEXT NOT NULL,
+                    list_key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (username, list_key, value)
+                ) WITHOUT ROWID;
+            """)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+
+
+_usage_ranking = UsageRanking()
+
+
+def get_usage_ranking() -> UsageRanking:
+    """إحصائيات الاستخدام المشتركة بين جميع الحقول"""
+    return _usage_ranking
@@ -3,30 +3,51 @@
 core/user_manager.py - نسخة محسنة
 
 مدير المستخدمين المحسن مع إصلاح مشكلة get_field_value
+ونسخة مشتركة من جدول المستخدمين بين نسخ التطبيق على نفس الجهاز
+(بدون كلمات المرور: تُجلب كلمة مرور المستخدم من Airtable عند تسجيل دخوله)
 """
 
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 import hashlib
 import hmac
 import secrets
 import base64
+import time
+import uuid
 from datetime import datetime, timedelta
 
 from core.airtable_manager import AirtableModel
-from core.db_manager import DatabaseManager
+from core.db_manager import DatabaseManager, strip_credential_fields
+from core.dropdown_store import DropdownStore
 from core.logger import logger
 
 
 class UserManager:
     """مدير المستخدمين المحسن"""
 
-    def __init__(self, airtable_model: AirtableModel, db_manager: DatabaseManager) -> None:
+    SHARED_LEASE_SECONDS = 60  # أقصى مدة لحجز جلب المستخدمين من Airtable
+    SHARED_WAIT_SECONDS = 15  # انتظار نتيجة نسخة أخرى تجلب المستخدمين الآن
+    SHARED_RECHECK_SECONDS = 60  # أقل عمر للنسخة المشتركة قبل إعادة الجلب عند فشل الدخول
+
+    def __init__(self, airtable_model: AirtableModel, db_manager: DatabaseManager,
+                 shared_store: Optional[DropdownStore] = None, shared_ttl_minutes: float = 10) -> None:
         self.airtable_model: AirtableModel = airtable_model
         self.db: DatabaseManager = db_manager
 
+        # النسخة المشتركة بين نسخ التطبيق (None: الجلب من Airtable دائماً)
+        self.shared_store = shared_store
+        self.shared_ttl_seconds = float(shared_ttl_minutes) * 60
+        self._shared_name = f"users:{airtable_model.table_name}"
+        self._instance_id = uuid.uuid4().hex
+        self._shared_loaded_at: Optional[float] = None  # وقت حفظ النسخة المشتركة المستخدمة حالياً
+
         # تخزين المستخدمين في الذاكرة
         self._users_cache: Dict[str, Dict[str, Any]] = {}
 
+        # إصدارات سابقة حفظت سجلات المستخدمين كاملة (مع كلمات المرور) في الكاش المحلي
+        if self.db and not getattr(airtable_model, 'persist_snapshot', False):
+            self.db.drop_snapshot(airtable_model.table_name)
+
         # حماية ضد هجمات القوة الغاشمة
         self._failed_attempts: Dict[str, list] = {}
         self._max_attempts = 5
@@ -106,12 +127,102 @@ class UserManager:
         if username in self._failed_attempts:
             del self._failed_attempts[username]
 
-    def _load_users(self) -> None:
-        """جلب جميع سجلات المستخدمين من Airtable"""
-        logger.info("UserManager: بدء جلب المستخدمين من Airtable")
+    def _fetch_user_records(self, force: bool = False) -> List[Dict[str, Any]]:
+        """
+        سجلات المستخدمين: من النسخة المشتركة إذا كانت حديثة، وإلا من Airtable.
+        نسخة واحدة فقط تجلب من Airtable في نفس الوقت (عقد في المخزن المشترك)،
+        والبقية تنتظر نتيجتها بدلاً من تكرار الطلب.
+        """
+        self._shared_loaded_at = None
+        store = self.shared_store
+        if store is None:
+            return self.airtable_model.fetch_records(use_cache=False)
+
+        requested_at = time.time()
+        try:
+            if not force:
+                shared = store.load_records(self._shared_name)
+                # نسخة حفظها إصدار سابق مع كلمات المرور تُستبدل فوراً
+                if (shared and requested_at - shared[1] < self.shared_ttl_seconds
+                        and all(strip_credential_fields(rec) is rec for rec in shared[0])):
+                    logger.info("UserManager: استخدام نسخة المستخدمين المشتركة")
+                    self._shared_loaded_at = shared[1]
+                    return shared[0]
+
+            if not store.try_acquire_lease(self._shared_name, self._instance_id, self.SHARED_LEASE_SECONDS):
+                deadline = time.monotonic() + self.SHARED_WAIT_SECONDS
+                while time.monotonic() < deadline:
+                    time.sleep(0.5)
+                    shared = store.load_records(self._shared_name)
+                    if shared and shared[1] >= requested_at:
+                        logger.info("UserManager: استخدام المستخدمين الذين جلبتهم نسخة أخرى")
+                        self._shared_loaded_at = shared[1]
+                        return shared[0]
+                logger.warning("UserManager: انتهت مهلة انتظار نسخة أخرى، الجلب من Airtable")
+        except Exception as e:
+            logger.warning(f"UserManager: فشل قراءة النسخة المشتركة: {e}")
 
         try:
             records = self.airtable_model.fetch_records(use_cache=False)
+            try:
+                # المجلد المشترك مقروء لكل مستخدمي الجهاز: لا تُشارك بيانات الدخول
+                store.save_records(self._shared_name, [strip_credential_fields(rec) for rec in records])
+            except Exception as e:
+                logger.warning(f"UserManager: فشل حفظ النسخة المشتركة: {e}")
+            return records
+        finally:
+            try:
+                store.release_lease(self._shared_name, self._instance_id)
+            except Exception:
+                pass
+
+    def _fetch_stored_password(self, user_info: Dict[str, Any]) -> Optional[str]:
+        """
+        كلمة المرور المخزنة للمستخدم من سجله في Airtable مباشرة
+        (المستخدمون المحملون من النسخة المشتركة بدون كلمات مرور).
+        :return: None إذا تعذر الجلب أو أصبح المستخدم غير نشط.
+        """
+        record = self.airtable_model.fetch_record(user_info['record_id'])
+        if not record:
+            return None
+        fields = record.get("fields", {}) or {}
+        if not fields.get("Active", True):
+            return None
+        stored_password = fields.get("PasswordHash") or fields.get("Password") or fields.get("password")
+        user_info['password'] = stored_password
+        return stored_password
+
+    def _invalidate_shared_users(self) -> None:
+        """حذف النسخة المشتركة بعد تعديل مستخدم حتى لا تستخدم النسخ الأخرى بيانات قديمة"""
+        if self.shared_store is None:
+            return
+        try:
+            self.shared_store.delete_records(self._shared_name)
+        except Exception as e:
+            logger.warning(f"UserManager: فشل حذف النسخة المشتركة: {e}")
+
+    def _refresh_stale_shared_users(self) -> bool:
+        """
+        إعادة الجلب من Airtable عند الدخول باسم غير موجود إذا كانت البيانات من نسخة
+        مشتركة (ربما أُضيف المستخدم بعد حفظها).
+        :return: True إذا أُعيد التحميل.
+        """
+        if self._shared_loaded_at is None or time.time() - self._shared_loaded_at < self.SHARED_RECHECK_SECONDS:
+            return False
+        logger.info("UserManager: إعادة جلب المستخدمين بعد فشل الدخول من النسخة المشتركة")
+        self._load_users(force=True)
+        return True
+
+    def _load_users(self, force: bool = False) -> None:
+        """
+        جلب جميع سجلات المستخدمين من Airtable (أو النسخة المشتركة الحديثة).
+        :param force: تجاهل النسخة المشتركة والجلب من Airtable.
+        """
+        logger.info("UserManager: بدء جلب المستخدمين من Airtable")
+
+        try:
+            records = self._fetch_user_records(force=force)
+            from_shared = self._shared_loaded_at is not None
             self._users_cache.clear()
 
             active_users = 0
@@ -125,8 +236,9 @@ class UserManager:
                     continue
 
                 # كلمة المرور - محاولة العثور عليها في حقول مختلفة
+                # (النسخة المشتركة بدونها: تُجلب عند تسجيل الدخول)
                 stored_password = fields.get("PasswordHash") or fields.get("Password") or fields.get("password")
-                if not stored_password:
+                if not stored_password and not from_shared:
                     logger.warning(f"UserManager: المستخدم '{username}' بدون كلمة مرور")
                     continue
 
@@ -177,12 +289,24 @@ class UserManager:
         lookup_key = username.strip().lower()
         user_info = self._users_cache.get(lookup_key)
 
+        if not user_info and self._refresh_stale_shared_users():
+            user_info = self._users_cache.get(lookup_key)
+
         if not user_info:
             logger.warning(f"UserManager: محاولة دخول باسم مستخدم غير موجود '{username}'")
             self._record_failed_attempt(username)
             return None
 
-        if self._verify_password(user_info['password'], password):
+        stored_password = user_info['password']
+        if stored_password is None:
+            stored_password = self._fetch_stored_password(user_info)
+            if not stored_password:
+                logger.warning(f"UserManager: تعذر جلب كلمة مرور المستخدم '{username}' من Airtable")
+                return None
+
+        verified = self._verify_password(stored_password, password)
+
+        if verified:
             logger.info(f"UserManager: تسجيل دخول ناجح للمستخدم '{username}'")
 
             self._clear_failed_attempts(username)
@@ -191,7 +315,7 @@ class UserManager:
             self._update_last_login(user_info['record_id'])
 
             # تحديث كلمة المرور إذا كانت نص عادي
-            if user_info['password'] == password:
+            if stored_password == password:
                 logger.info(f"UserManager: تحديث كلمة مرور المستخدم '{username}' لتكون مشفرة")
                 self._update_password_hash(user_info['record_id'], password)
 
@@ -258,6 +382,7 @@ class UserManager:
                     if user_data.get('record_id') == record_id:
                         user_data['password'] = hashed
                         break
+                self._invalidate_shared_users()
 
         except Exception as e:
             logger.error(f"UserManager: فشل تحديث كلمة المرور المشفرة: {e}")
@@ -312,7 +437,7 @@ class UserManager:
     def reload_users(self) -> None:
         """إعادة تحميل بيانات المستخدمين من Airtable"""
         logger.debug("UserManager: إعادة تحميل بيانات المستخدمين")
-        self._load_users()
+        self._load_users(force=True)
 
     def get_user_view(self, username: str) -> Optional[str]:
         """الحصول على الـ View المخصص للمستخدم"""
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+core/value_index.py
+
+فهرس قيم مرتب وغير قابل للتعديل لقائمة منسدلة واحدة، يُشارك بالمرجع بين
+مدير القوائم وجميع الحقول بدلاً من أن يحتفظ كل حقل بنسخته من القائمة:
+- مصفوفة مرتبة (tuple) مع بحث ثنائي (bisect) للإدراج والبحث بالبادئة.
+- مفتاح بحث موحد لكل قيمة (core.text_normalize) يُحسب مرة واحدة عند بناء الفهرس.
+- مجموعة (frozenset) لفحص الوجود في O(1).
+- رقم إصدار فريد لكل نسخة: أي تعديل ينتج فهرساً جديداً برقم جديد،
+  فيكفي الحقل مقارنة رقم الإصدار لمعرفة هل تغيرت القائمة.
+- فهرس بحث (SearchIndex) يُبنى مرة واحدة عند أول طلب ويُشارك بين جميع الحقول.
+
+مثال:
+    index = ValueIndex(["Hurghada", "Cairo", "Luxor"])
+    index.starting_with("cai")      # ['Cairo']
+    "Luxor" in index                # True
+    index = index.with_value("Aswan")
+"""
+
+import bisect
+import itertools
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from core.text_normalize import search_key
+
+# أرقام الإصدارات فريدة على مستوى العملية
+_versions = itertools.count(1)
+
+# أعلى محرف في Unicode: نهاية نطاق البادئة
+_PREFIX_END = chr(0x10FFFF)
+
+
+class ValueIndex:
+    """فهرس قيم مرتب وغير قابل للتعديل مع بحث بالبادئة وفحص وجود سريع"""
+
+    __slots__ = ('_values', '_keys', '_order', '_members', '_search', 'version')
+
+    def __init__(self, values: Iterable[str] = (), _presorted: bool = False):
+        self._values: Tuple[str, ...] = tuple(values) if _presorted else tuple(sorted(set(values)))
+        self._members = frozenset(self._values)
+
+        # مفاتيح البحث الموحدة مرتبة، مع موقع كل قيمة
+        pairs = sorted((search_key(value), position) for position, value in enumerate(self._values))
+        self._keys: Tuple[str, ...] = tuple(key for key, _ in pairs)
+        self._order: Tuple[int, ...] = tuple(position for _, position in pairs)
+
+        self._search = None
+        self.version = next(_versions)
+
+    # =============== التعديل (ينتج نسخة جديدة) ===============
+
+    def with_value(self, value: str) -> 'ValueIndex':
+        """نسخة جديدة بعد إدراج القيمة في موضعها المرتب (أو نفس الفهرس إن كانت موجودة)"""
+        if not value or value in self._members:
+            return self
+        position = bisect.bisect_left(self._values, value)
+        return ValueIndex(self._values[:position] + (value,) + self._values[position:], _presorted=True)
+
+    def diff(self, old: 'ValueIndex') -> Tuple[List[str], List[str]]:
+        """الفرق عن فهرس أقدم: (القيم المضافة، القيم المحذوفة) مرتبة"""
+        return sorted(self._members - old._members), sorted(old._members - self._members)
+
+    # =============== البحث ===============
+
+    def starting_with(self, prefix: str, limit: Optional[int] = None) -> List[str]:
+        """القيم التي تبدأ بالبادئة (بمفاتيح البحث الموحدة) - O(log n + k)"""
+        prefix = search_key(prefix or '')
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + _PREFIX_END, start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return [self._values[position] for position in self._order[start:end]]
+
+    def search_index(self):
+        """فهرس البحث الموحد لهذه النسخة (يُبنى مرة واحدة ويُشارك بين الحقول)"""
+        if self._search is None:
+            from core.search_index import SearchIndex
+            # مفاتيح البحث محسوبة مسبقاً: تُمرر بترتيب القيم بدلاً من إعادة حسابها
+            keys = [''] * len(self._values)
+            for key, position in zip(self._keys, self._order):
+                keys[position] = key
+            self._search = SearchIndex(self._values, keys=keys)
+        return self._search
+
+    def index(self, value: str) -> int:
+        """موقع القيمة في المصفوفة المرتبة"""
+        position = bisect.bisect_left(self._values, value)
+        if position < len(self._values) and self._values[position] == value:
+            return position
+        raise ValueError(f"{value!r} غير موجودة في القائمة")
+
+    # =============== واجهة القائمة (للقراءة فقط) ===============
+
+    def __contains__(self, value: object) -> bool:
+        return value in self._members
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __getitem__(self, item: Union[int, slice]):
+        result = self._values[item]
+        return list(result) if isinstance(item, slice) else result
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ValueIndex):
+            return self._values == other._values
+        if isinstance(other, (list, tuple)):
+            return self._values == tuple(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def copy(self) -> List[str]:
+        """نسخة قائمة عادية (للتوافق مع الكود الذي يتوقع list)"""
+        return list(self._values)
+
+    def __repr__(self) -> str:
+        return f"ValueIndex({len(self._values)} values, version={self.version})"
+
+
+EMPTY_INDEX = ValueIndex()
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+utils/ui_scheduler.py
+
+مُجدول مهام واحد لكل نافذة جذرية (Tk root) بدلاً من حلقات after() الدائمة
+في كل مكون.
+
+- عجلة توقيت (timer wheel): خانة لكل نبضة (TICK_MS)، إضافة وإلغاء المهام O(1).
+- استدعاء after() واحد فقط مسلح على أقرب نبضة فيها مهمة، ولا شيء إذا لم توجد
+  مهام؛ المهام المستحقة في نفس النبضة تُنفذ في نفس الاستيقاظ.
+- إيقاف مؤقت: مهام الواجهة لا تُنفذ والنافذة مصغرة أو مخفية، ومهام الفحص التي
+  تعتمد على إدخال المستخدم (pause_when_idle) لا تُنفذ بعد IDLE_AFTER_MS بدون
+  إدخال؛ تُستأنف عند الإظهار أو أول إدخال.
+- المهمة المرتبطة بعنصر (owner) تُلغى تلقائياً عند تدميره.
+- إحصائيات: عدد مرات الاستيقاظ وتنفيذ المهام في الثانية (stats)، وتُسجل في
+  السجل كل دقيقة أثناء العمل.
+
+مثال:
+    scheduler = get_scheduler(widget)
+    job = scheduler.call_every(1000, self._update_time, owner=self)
+    scheduler.call_later(3000, self._hide_notification, owner=self)
+    scheduler.cancel(job)
+
+المهمة الدورية التي تعيد False تتوقف.
+"""
+
+import math
+import time
+import tkinter as tk
+from typing import Any, Callable, Dict, List, Optional
+
+from core.logger import logger
+
+
+class ScheduledJob:
+    """مهمة مجدولة (لمرة واحدة أو دورية)"""
+
+    __slots__ = ('callback', 'args', 'interval', 'owner', 'pause_when_hidden', 'pause_when_idle',
+                 'due', 'cancelled')
+
+    def __init__(self, callback: Callable, args: tuple, interval: Optional[int], owner,
+                 pause_when_hidden: bool, pause_when_idle: bool):
+        self.callback = callback
+        self.args = args
+        self.interval = interval  # بالنبضات، None للمهمة لمرة واحدة
+        self.owner = owner
+        self.pause_when_hidden = pause_when_hidden
+        self.pause_when_idle = pause_when_idle
+        self.due = 0  # رقم النبضة المستحقة
+        self.cancelled = False
+
+
+class UIScheduler:
+    """عجلة توقيت على خيط الواجهة لنافذة جذرية واحدة"""
+
+    TICK_MS = 50
+    WHEEL_SLOTS = 256  # دورة كاملة = 12.8 ثانية
+    IDLE_AFTER_MS = 60000
+    STATS_LOG_SECONDS = 60
+
+    def __init__(self, root):
+        self.root = root
+        self._origin = time.monotonic()
+        self._tick = 0  # آخر نبضة عولجت
+        self._slots: List[Dict[ScheduledJob, None]] = [{} for _ in range(self.WHEEL_SLOTS)]
+        self._job_count = 0
+        self._after_id = None
+        self._armed_tick = None
+
+        # الإيقاف المؤقت
+        self._hidden = False
+        self._last_input = time.monotonic()
+        self._paused_hidden: List[ScheduledJob] = []
+        self._paused_idle: List[ScheduledJob] = []
+
+        # الإحصائيات
+        self._wakeups = 0
+        self._runs = 0
+        self._stats_since = time.monotonic()
+        self._last_stats = {'wakeups_per_second': 0.0, 'runs_per_second': 0.0}
+
+        root.bind('<Map>', self._on_map, add='+')
+        root.bind('<Unmap>', self._on_unmap, add='+')
+        # حركة الماوس وحدها لا تغير التركيز ولا تحتاج استئناف الفحوص
+        for sequence in ('<KeyPress>', '<ButtonPress>', '<MouseWheel>'):
+            root.bind_all(sequence, self._on_input, add='+')
+
+    # =============== الواجهة العامة ===============
+
+    def call_later(self, delay_ms: int, callback: Callable, *args, owner=None,
+                   pause_when_hidden: bool = True, pause_when_idle: bool = False) -> ScheduledJob:
+        """تنفيذ الدالة مرة واحدة بعد delay_ms"""
+        job = ScheduledJob(callback, args, None, owner, pause_when_hidden, pause_when_idle)
+        self._insert(job, self._current_tick() + self._ticks_for(delay_ms))
+        return job
+
+    def call_every(self, interval_ms: int, callback: Callable, *args, owner=None,
+                   initial_delay_ms: Optional[int] = None, pause_when_hidden: bool = True,
+                   pause_when_idle: bool = False) -> ScheduledJob:
+        """تنفيذ الدالة كل interval_ms (حتى الإلغاء، أو تدمير owner، أو إعادتها False)"""
+        job = ScheduledJob(callback, args, self._ticks_for(interval_ms), owner,
+                           pause_when_hidden, pause_when_idle)
+        delay = interval_ms if initial_delay_ms is None else initial_delay_ms
+        self._insert(job, self._current_tick() + self._ticks_for(delay))
+        return job
+
+    def cancel(self, job: Optional[ScheduledJob]):
+        """إلغاء مهمة (آمن إذا كانت ملغاة أو نُفذت)"""
+        if job is None or job.cancelled:
+            return
+        job.cancelled = True
+        slot = self._slots[job.due % self.WHEEL_SLOTS]
+        if job in slot:
+            del slot[job]
+            self._job_count -= 1
+            if not self._job_count:
+                self._disarm()
+
+    def stats(self) -> Dict[str, Any]:
+        """المهام الحالية ومعدل الاستيقاظ والتنفيذ في الثانية (منذ آخر قياس)"""
+        self._measure()
+        return {
+            'jobs': self._job_count,
+            'paused': len(self._paused_hidden) + len(self._paused_idle),
+            'hidden': self._hidden,
+            'idle': self._is_idle(),
+            **self._last_stats,
+        }
+
+    # =============== العجلة ===============
+
+    def _current_tick(self) -> int:
+        return int((time.monotonic() - self._origin) * 1000 // self.TICK_MS)
+
+    def _ticks_for(self, delay_ms: int) -> int:
+        return max(1, -(-int(delay_ms) // self.TICK_MS))
+
+    def _insert(self, job: ScheduledJob, due: int):
+        job.due = max(due, self._tick + 1)
+        self._slots[job.due % self.WHEEL_SLOTS][job] = None
+        self._job_count += 1
+        self._arm(job.due)
+
+    def _arm(self, due: int):
+        """تسليح after() واحد على النبضة due إذا كانت أقرب من المسلحة حالياً"""
+        if self._armed_tick is not None and self._armed_tick <= due:
+            return
+        self._disarm()
+        delay_ms = max(0, math.ceil((self._origin + due * self.TICK_MS / 1000 - time.monotonic()) * 1000))
+        try:
+            self._after_id = self.root.after(delay_ms, self._on_wakeup)
+            self._armed_tick = due
+        except tk.TclError:
+            # النافذة الجذرية دُمرت
+            self._after_id = None
+
+    def _disarm(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except (tk.TclError, ValueError):
+                pass
+        self._after_id = None
+        self._armed_tick = None
+
+    def _next_due(self) -> Optional[int]:
+        """أقرب نبضة فيها مهمة (مسح خانات العجلة من النبضة الحالية)"""
+        if not self._job_count:
+            return None
+        later = None  # أقرب مهمة في دورة لاحقة من العجلة
+        for offset in range(1, self.WHEEL_SLOTS + 1):
+            tick = self._tick + offset
+            for job in self._slots[tick % self.WHEEL_SLOTS]:
+                if job.due <= tick:
+                    return tick
+                if later is None or job.due < later:
+                    later = job.due
+        return later
+
+    def _on_wakeup(self):
+        # after() يقرّب التأخير لأقرب ميلي ثانية: الاستيقاظ يعني الوصول للنبضة المسلحة
+        armed = self._armed_tick or 0
+        self._after_id = None
+        self._armed_tick = None
+        self._wakeups += 1
+
+        now = max(self._current_tick(), armed)
+        due_jobs: List[ScheduledJob] = []
+        if now - self._tick >= self.WHEEL_SLOTS:
+            # تأخر طويل (مثلاً بعد إسبات الجهاز): فحص كل الخانات مرة واحدة
+            slots = self._slots
+        else:
+            slots = [self._slots[tick % self.WHEEL_SLOTS] for tick in range(self._tick + 1, now + 1)]
+        for slot in slots:
+            for job in [job for job in slot if job.due <= now]:
+                del slot[job]
+                self._job_count -= 1
+                due_jobs.append(job)
+        self._tick = max(self._tick, now)
+
+        idle = self._is_idle()
+        for job in sorted(due_jobs, key=lambda job: job.due):
+            if job.cancelled:
+                continue
+            if self._hidden and job.pause_when_hidden:
+                self._paused_hidden.append(job)
+            elif idle and job.pause_when_idle:
+                self._paused_idle.append(job)
+            else:
+                self._run(job)
+
+        self._maybe_log_stats()
+        next_due = self._next_due()
+        if next_due is not None:
+            self._arm(next_due)
+
+    def _run(self, job: ScheduledJob):
+        if job.owner is not None and not self._owner_alive(job.owner):
+            job.cancelled = True
+            return
+
+        self._runs += 1
+        try:
+            result = job.callback(*job.args)
+        except Exception as e:
+            # مثل الحلقات السابقة: المهمة التي تفشل تتوقف بدلاً من تكرار الخطأ
+            logger.error(f"خطأ في مهمة مجدولة {getattr(job.callback, '__name__', job.callback)}: {e}",
+                         exc_info=True)
+            job.cancelled = True
+            return
+
+        if job.interval is None or result is False or job.cancelled:
+            job.cancelled = True
+        else:
+            self._insert(job, self._tick + job.interval)
+
+    @staticmethod
+    def _owner_alive(owner) -> bool:
+        try:
+            return bool(owner.winfo_exists())
+        except tk.TclError:
+            return False
+
+    # =============== الإيقاف المؤقت ===============
+
+    def _is_idle(self) -> bool:
+        return (time.monotonic() - self._last_input) * 1000 > self.IDLE_AFTER_MS
+
+    def _on_map(self, event):
+        if event.widget is not self.root or not self._hidden:
+            return
+        self._hidden = False
+        self._resume(self._paused_hidden)
+
+    def _on_unmap(self, event):
+        if event.widget is self.root:
+            self._hidden = True
+
+    def _on_input(self, event=None):
+        self._last_input = time.monotonic()
+        if self._paused_idle:
+            self._resume(self._paused_idle)
+
+    def _resume(self, paused: List[ScheduledJob]):
+        """إعادة المهام المؤجلة للعجلة في النبضة التالية"""
+        jobs = paused[:]
+        paused.clear()
+        due = self._current_tick() + 1
+        for job in jobs:
+            if not job.cancelled:
+                self._insert(job, due)
+
+    # =============== الإحصائيات ===============
+
+    def _measure(self):
+        elapsed = time.monotonic() - self._stats_since
+        if elapsed < 1:
+            return
+        self._last_stats = {
+            'wakeups_per_second': round(self._wakeups / elapsed, 2),
+            'runs_per_second': round(self._runs / elapsed, 2),
+        }
+        self._wakeups = self._runs = 0
+        self._stats_since = time.monotonic()
+
+    def _maybe_log_stats(self):
+        if time.monotonic() - self._stats_since >= self.STATS_LOG_SECONDS:
+            self._measure()
+            logger.debug(f"المجدول: {self._job_count} مهمة، "
+                         f"{self._last_stats['wakeups_per_second']} استيقاظ/ث، "
+                         f"{self._last_stats['runs_per_second']} تنفيذ/ث")
+
+    def shutdown(self):
+        """إلغاء كل المهام (عند تدمير النافذة الجذرية)"""
+        self._disarm()
+        for slot in self._slots:
+            for job in slot:
+                job.cancelled = True
+            slot.clear()
+        self._paused_hidden.clear()
+        self._paused_idle.clear()
+        self._job_count = 0
+
+
+_schedulers: Dict[Any, UIScheduler] = {}
+
+
+def get_scheduler(widget) -> UIScheduler:
+    """مُجدول النافذة الجذرية للعنصر (يُنشأ عند أول طلب)"""
+    root = widget._root()
+    scheduler = _schedulers.get(root)
+    if scheduler is None:
+        scheduler = _schedulers[root] = UIScheduler(root)
+
+        def on_destroy(event):
+            if event.widget is root:
+                _schedulers.pop(root, None)
+                scheduler.shutdown()
+
+        root.bind('<Destroy>', on_destroy, add='+')
+    return scheduler
@@ -28,6 +28,7 @@ import string
 from core.language_manager import LanguageManager
 from utils.window_manager import WindowManager
 from core.theme_color_manager import ThemeColorManager, ThemedWindow
+from core.value_index import ValueIndex
 
 # استيراد القوائم المحسنة من الملف الموحد
 try:
@@ -65,6 +66,8 @@ from core.logger import logger
 class AddEditWindow(ctk.CTkToplevel):
     """نافذة إضافة/تعديل محسنة ومبسطة مع إصلاح مشكلة رقم الحجز"""
 
+    LAZY_LOADING_TIMEOUT_MS = 30000  # أقصى مدة لإظهار حالة التحميل داخل الحقل
+
     def __init__(self, parent=None, config_mgr=None, db_mgr=None, airtable_model=None,
                  controller=None, dropdown_manager=None, lang_manager=None,
                  field_groups=None, field_type_map=None, mode="add", record_id=None,
@@ -199,46 +202,6 @@ class AddEditWindow(ctk.CTkToplevel):
 
         return mapping
 
-    def _load_from_cache(self):
-        """تحميل من الكاش - نسخة محدثة مع الأوقات"""
-        try:
-            all_dropdowns = self.dropdown_manager.get_all_dropdowns()
-            for field_name, airtable_key in self.dropdown_mapping.items():
-                if field_name == "pickup time":
-                    # للأوقات، استخدم القائمة المولدة محلياً
-                    self.dropdown_options[field_name] = self._generate_time_options()
-                else:
-                    self.dropdown_options[field_name] = all_dropdowns.get(airtable_key, [])
-
-            if 'Trip Names' in all_dropdowns:
-                self.dropdown_options['trip Name'] = all_dropdowns['Trip Names']
-
-        except Exception as e:
-            logger.error(f"خطأ في تحميل من الكاش: {e}")
-            self._setup_offline_dropdowns()
-
-    def _load_dropdowns_async(self):
-        """تحميل القوائم في الخلفية - نسخة محدثة مع الأوقات"""
-        def load_thread():
-            try:
-                all_dropdowns = self.dropdown_manager.get_all_dropdowns(timeout=15.0)
-                for field_name, airtable_key in self.dropdown_mapping.items():
-                    if field_name == "pickup time":
-                        # للأوقات، استخدم القائمة المولدة محلياً
-                        self.dropdown_options[field_name] = self._generate_time_options()
-                    else:
-                        self.dropdown_options[field_name] = all_dropdowns.get(airtable_key, [])
-
-                if 'Trip Names' in all_dropdowns:
-                    self.dropdown_options['trip Name'] = all_dropdowns['Trip Names']
-
-            except Exception as e:
-                logger.error(f"خطأ في التحميل: {e}")
-                self._offline_mode = True
-                self.after(0, self._setup_offline_dropdowns)
-
-        threading.Thread(target=load_thread, daemon=True).start()
-
     def _setup_window(self):
         """إعداد النافذة"""
         # إعداد النصوص أولاً للحصول على الترجمات
@@ -266,50 +229,72 @@ class AddEditWindow(ctk.CTkToplevel):
         self.protocol("WM_DELETE_WINDOW", self._confirm_close)
 
     def _load_dropdown_options(self):
-        """تحميل القوائم المنسدلة"""
+        """تحميل القوائم المنسدلة فوراً من الكاش، والتحديثات تصل لاحقاً بإشعار من مدير القوائم"""
         if not self.dropdown_manager:
             self._offline_mode = True
             self._setup_offline_dropdowns()
             return
 
         try:
-            status = self.dropdown_manager.get_status()
-            if status.get('cached_count', 0) > 0:
-                self._load_from_cache()
-            else:
-                self._load_dropdowns_async()
+            self._load_from_cache()
+            self.dropdown_manager.subscribe(self._on_dropdowns_updated)
         except Exception as e:
             logger.error(f"خطأ في تحميل القوائم: {e}")
             self._offline_mode = True
             self._setup_offline_dropdowns()
 
     def _load_from_cache(self):
-        """تحميل من الكاش"""
+        """تحميل من الكاش (لا ينتظر الشبكة - القوائم القديمة تُحدّث في الخلفية)"""
         try:
             all_dropdowns = self.dropdown_manager.get_all_dropdowns()
             for field_name, airtable_key in self.dropdown_mapping.items():
-                self.dropdown_options[field_name] = all_dropdowns.get(airtable_key, [])
+                if field_name == "pickup time":
+                    # للأوقات، استخدم القائمة المولدة محلياً
+                    self.dropdown_options[field_name] = self._generate_time_options()
+                else:
+                    self.dropdown_options[field_name] = all_dropdowns.get(airtable_key, [])
+
             if 'Trip Names' in all_dropdowns:
                 self.dropdown_options['trip Name'] = all_dropdowns['Trip Names']
+
         except Exception as e:
             logger.error(f"خطأ في تحميل من الكاش: {e}")
             self._setup_offline_dropdowns()
 
-    def _load_dropdowns_async(self):
-        """تحميل القوائم في الخلفية"""
-        def load_thread():
+    def _on_dropdowns_updated(self, changes):
+        """إشعار من مدير القوائم (من خيط خلفي) بتغييرات بعض القوائم {key: DropdownChange}"""
+        if self._is_closing:
+            return
+        try:
+            self.after(0, lambda: self._apply_dropdown_changes(changes))
+        except Exception:
+            pass
+
+    def _apply_dropdown_changes(self, changes):
+        """تطبيق الفرق فقط على الحقول المفتوحة (في خيط الواجهة) دون مسح مدخلات المستخدم"""
+        if self._is_closing or not self.winfo_exists():
+            return
+
+        for field_name, airtable_key in self.dropdown_mapping.items():
+            change = changes.get(airtable_key)
+            if not change:
+                continue
+
+            self.dropdown_options[field_name] = change.values
+            self._set_field_loading(field_name, False)
             try:
-                all_dropdowns = self.dropdown_manager.get_all_dropdowns(timeout=15.0)
-                for field_name, airtable_key in self.dropdown_mapping.items():
-                    self.dropdown_options[field_name] = all_dropdowns.get(airtable_key, [])
-                if 'Trip Names' in all_dropdowns:
-                    self.dropdown_options['trip Name'] = all_dropdowns['Trip Names']
+                if field_name in self.enhanced_combos:
+                    self.enhanced_combos[field_name].apply_changes(change.values, change.added, change.removed)
+                elif field_name in self.combo_boxes:
+                    combo = self.combo_boxes[field_name]
+                    new_values = list(change.values)
+                    current_value = combo.get()
+                    if current_value and current_value not in change.values:
+                        new_values.append(current_value)
+                    combo.configure(values=new_values)
+                logger.debug(f"تحديث {field_name}: +{len(change.added)} -{len(change.removed)}")
             except Exception as e:
-                logger.error(f"خطأ في التحميل: {e}")
-                self._offline_mode = True
-                self.after(0, self._setup_offline_dropdowns)
-
-        threading.Thread(target=load_thread, daemon=True).start()
+                logger.warning(f"فشل تحديث {field_name}: {e}")
 
     def _setup_offline_dropdowns(self):
         """إعداد قوائم افتراضية - نسخة محدثة مع الأوقات"""
@@ -490,7 +475,10 @@ class AddEditWindow(ctk.CTkToplevel):
         else:
             values = self.dropdown_options.get(field_name, [])
             if initial_value and initial_value not in values:
-                values = list(values) + [initial_value]
+                if isinstance(values, ValueIndex):
+                    values = values.with_value(initial_value)
+                else:
+                    values = list(values) + [initial_value]
 
         # محاولة استخدام النسخة المحسنة
         if HAS_ENHANCED_COMBO and HAS_IMPROVED_CLICK:
@@ -510,6 +498,7 @@ class AddEditWindow(ctk.CTkToplevel):
                 if field_name == "pickup time":
                     combo.configure(placeholder_text="اختر وقت الإقلاع")
 
+                self._setup_lazy_dropdown(field_name, combo)
                 return var, combo
             except Exception as e:
                 logger.warning(f"فشل في إنشاء القائمة المحسنة: {e}")
@@ -517,7 +506,7 @@ class AddEditWindow(ctk.CTkToplevel):
         # القائمة العادية
         var = tk.StringVar(value=initial_value)
         combo = ctk.CTkComboBox(
-            parent, values=values, variable=var,
+            parent, values=list(values), variable=var,
             state="readonly" if self._offline_mode else "normal"
         )
         self.themed_window.apply_to_widget(combo, 'combobox')
@@ -528,8 +517,44 @@ class AddEditWindow(ctk.CTkToplevel):
         if field_name == "Agency":
             self._bind_agency_change_event(combo, var)
 
+        self._setup_lazy_dropdown(field_name, combo)
         return var, combo
 
+    def _setup_lazy_dropdown(self, field_name, combo):
+        """ربط تحميل القوائم الكسولة بتركيز الحقل، وإظهار حالة التحميل إذا كانت القائمة فارغة"""
+        airtable_key = self.dropdown_mapping.get(field_name)
+        if not self.dropdown_manager or airtable_key not in getattr(self.dropdown_manager, 'tables', {}):
+            return
+
+        try:
+            policy = self.dropdown_manager.get_load_policy(airtable_key)
+            if policy == self.dropdown_manager.LOAD_ON_FIELD_FOCUS:
+                focus_widget = getattr(combo, 'entry', combo)
+                focus_widget.bind('<FocusIn>', lambda e: self._load_lazy_dropdown(field_name), add="+")
+            elif self.dropdown_manager.is_loading(airtable_key) and not self.dropdown_options.get(field_name):
+                self._set_field_loading(field_name, True)
+        except Exception as e:
+            logger.warning(f"فشل إعداد التحميل الكسول لـ {field_name}: {e}")
+
+    def _load_lazy_dropdown(self, field_name):
+        """بدء تحميل قائمة كسولة عند تركيز الحقل"""
+        airtable_key = self.dropdown_mapping.get(field_name)
+        if self.dropdown_manager.request_load(airtable_key) and not self.dropdown_options.get(field_name):
+            self._set_field_loading(field_name, True)
+
+    def _set_field_loading(self, field_name, loading):
+        """إظهار/إخفاء حالة التحميل داخل الحقل"""
+        if self._is_closing:
+            return
+
+        combo = self.enhanced_combos.get(field_name)
+        if combo and hasattr(combo, 'set_loading'):
+            combo.set_loading(loading)
+
+        # إخفاء الحالة تلقائياً إذا فشل التحميل ولم يصل إشعار
+        if loading:
+            self.after(self.LAZY_LOADING_TIMEOUT_MS, lambda: self._set_field_loading(field_name, False))
+
     def _bind_agency_change_event(self, combo, var):
         """ربط حدث تغيير الوكالة لتوليد رقم الحجز تلقائياً"""
         def on_agency_change(*args):
@@ -930,42 +955,12 @@ class AddEditWindow(ctk.CTkToplevel):
             messagebox.showinfo(self.texts['error'], "خدمة القوائم غير متاحة")
             return
 
-        def refresh_thread():
-            try:
-                self.dropdown_manager.refresh_all()
-                self._load_from_cache()
-                self._update_combo_boxes()
-                self.after(0, lambda: messagebox.showinfo(self.texts['success'], "تم تحديث القوائم بنجاح"))
-            except Exception as e:
-                self.after(0, lambda: messagebox.showerror(self.texts['error'], f"فشل التحديث: {str(e)}"))
-
-        threading.Thread(target=refresh_thread, daemon=True).start()
-
-    def _update_combo_boxes(self):
-        """تحديث جميع القوائم المنسدلة"""
-        # تحديث القوائم العادية
-        for field_name, combo in self.combo_boxes.items():
-            if field_name in self.dropdown_options:
-                try:
-                    current_value = combo.get()
-                    new_values = self.dropdown_options[field_name]
-                    combo.configure(values=new_values)
-                    if current_value in new_values:
-                        combo.set(current_value)
-                except Exception as e:
-                    logger.warning(f"فشل تحديث {field_name}: {e}")
-
-        # تحديث القوائم المحسنة
-        for field_name, combo in self.enhanced_combos.items():
-            if field_name in self.dropdown_options:
-                try:
-                    current_value = combo.get()
-                    new_values = self.dropdown_options[field_name]
-                    combo.set_values(new_values)
-                    if current_value in new_values:
-                        combo.set(current_value)
-                except Exception as e:
-                    logger.warning(f"فشل تحديث القائمة المحسنة {field_name}: {e}")
+        # التحديث يتم في الخلفية، والقيم الجديدة تصل عبر _on_dropdowns_updated
+        try:
+            self.dropdown_manager.refresh_all()
+            messagebox.showinfo(self.texts['success'], "جاري تحديث القوائم في الخلفية")
+        except Exception as e:
+            messagebox.showerror(self.texts['error'], f"فشل التحديث: {str(e)}")
 
     def _confirm_close(self):
         """تأكيد الإغلاق"""
@@ -1527,6 +1522,9 @@ class AddEditWindow(ctk.CTkToplevel):
         """تنظيف الموارد قبل الإغلاق"""
         self._is_closing = True
         try:
+            if self.dropdown_manager:
+                self.dropdown_manager.unsubscribe(self._on_dropdowns_updated)
+
             # تنظيف القواميس
             for attr in ['field_vars', 'field_widgets', 'combo_boxes', 'enhanced_combos', 'dropdown_options']:
                 if hasattr(self, attr):
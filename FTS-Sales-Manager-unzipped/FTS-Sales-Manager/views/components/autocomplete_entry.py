@@ -18,6 +18,13 @@ import time
 from dataclasses import dataclass
 from enum import Enum
 
+from core.search_index import (MATCH_CONTAINS, MATCH_EXACT, MATCH_FUZZY, MATCH_PREFIX,
+                                SearchIndex, build_search_index)
+from core.usage_ranking import get_usage_ranking
+from core.value_index import ValueIndex
+from views.components.background_search import BackgroundSearch
+from views.components.popup_pool import DropdownPopup, get_popup_pool
+
 
 class SuggestionType(Enum):
     EXACT = "exact"
@@ -26,6 +33,14 @@ class SuggestionType(Enum):
     FUZZY = "fuzzy"
 
 
+SUGGESTION_TYPES = {
+    MATCH_EXACT: SuggestionType.EXACT,
+    MATCH_PREFIX: SuggestionType.STARTS_WITH,
+    MATCH_CONTAINS: SuggestionType.CONTAINS,
+    MATCH_FUZZY: SuggestionType.FUZZY,
+}
+
+
 @dataclass
 class Suggestion:
     text: str
@@ -37,6 +52,13 @@ class Suggestion:
 class EnhancedAutoCompleteEntry(ctk.CTkFrame):
     """حقل إدخال مع إكمال تلقائي محسن ومثبت"""
 
+    ROW_HEIGHT = 32  # ارتفاع صف الاقتراح
+    LIST_COLORS = {
+        'text_color': ("gray10", "gray90"),
+        'selected_color': ["gray65", "gray35"],
+        'hover_color': ["gray75", "gray25"],
+    }
+
     def __init__(self,
                  parent,
                  values: List[str] = None,
@@ -48,6 +70,7 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
                  enable_fuzzy: bool = True,
                  fuzzy_threshold: float = 0.6,
                  on_select: Callable[[str], None] = None,
+                 usage_key: Optional[str] = None,
                  **kwargs):
 
         super().__init__(parent, width=width, height=height, **kwargs)
@@ -60,6 +83,7 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
         self.enable_fuzzy = enable_fuzzy
         self.fuzzy_threshold = fuzzy_threshold
         self.on_select = on_select
+        self.usage_key = usage_key  # اسم القائمة في إحصائيات الاستخدام
 
         # الحالة
         self.suggestions: List[Suggestion] = []
@@ -75,15 +99,23 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
         self._build_ui()
         self._setup_bindings()
 
-        # النافذة المنبثقة
+        # النافذة المنبثقة (من المجموعة المشتركة مع قائمة افتراضية)
+        self._popup: Optional[DropdownPopup] = None
         self.popup_window = None
-        self.suggestion_widgets = []
+        self.list_view = None
 
-        # تخزين مؤقت للبحث
-        self._search_cache = {}
+        # فهرس البحث (نتائجه مخزنة مؤقتاً في core.search_cache حسب إصداره)
+        self._search_index: Optional[SearchIndex] = None
+        self._indexed_values = None
         self._last_search_time = 0
         self._search_delay = 0.3  # ثانية
 
+        # البحث في خيط عامل بعد انتهاء التأخير؛ تُطبق نتيجة آخر نص فقط
+        self._searcher = BackgroundSearch(self, self._generate_suggestions, self._on_search_results, delay_ms=0)
+
+        # تجهيز نافذة منبثقة مسبقاً في وقت الخمول
+        self.after_idle(lambda: get_popup_pool().warm_up(self))
+
     def _build_ui(self):
         """بناء واجهة المستخدم البسيطة"""
         # إطار البحث
@@ -149,7 +181,8 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
         # تحديث وقت البحث
         self._last_search_time = time.time()
 
-        # جدولة البحث بتأخير
+        # جدولة البحث بتأخير (وإهمال نتيجة أي بحث سابق قيد التنفيذ)
+        self._searcher.cancel()
         if hasattr(self, '_search_timer'):
             self.after_cancel(self._search_timer)
 
@@ -163,18 +196,19 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
         text = self.current_value.strip()
 
         if len(text) < self.min_chars:
+            self._searcher.cancel()
             self._close_popup()
             return
 
-        # استخدام التخزين المؤقت
-        if text in self._search_cache:
-            suggestions = self._search_cache[text]
-        else:
-            suggestions = self._generate_suggestions(text)
-            # حفظ في التخزين المؤقت (مع حد أقصى)
-            if len(self._search_cache) < 50:
-                self._search_cache[text] = suggestions
+        # البحث في الخيط العامل (في فهرس القيم الحالية)
+        self._searcher.submit(text, self._get_search_index())
+
+    def _on_search_results(self, text: str, suggestions: List[Suggestion]):
+        """نتيجة البحث من الخيط العامل (أحدث نص فقط)"""
+        self._show_suggestions(suggestions)
 
+    def _show_suggestions(self, suggestions: List[Suggestion]):
+        """عرض الاقتراحات أو إغلاق النافذة إذا لم توجد"""
         self.suggestions = suggestions
 
         if suggestions:
@@ -182,59 +216,27 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
         else:
             self._close_popup()
 
-    def _generate_suggestions(self, query: str) -> List[Suggestion]:
-        """إنشاء قائمة الاقتراحات"""
-        suggestions = []
-        query_lower = query.lower()
-
-        for value in self.values:
-            value_lower = value.lower()
-
-            # تطابق تام
-            if query_lower == value_lower:
-                suggestions.append(Suggestion(
-                    text=value,
-                    type=SuggestionType.EXACT,
-                    score=1.0
-                ))
-            # يبدأ بالاستعلام
-            elif value_lower.startswith(query_lower):
-                suggestions.append(Suggestion(
-                    text=value,
-                    type=SuggestionType.STARTS_WITH,
-                    score=0.9
-                ))
-            # يحتوي على الاستعلام
-            elif query_lower in value_lower:
-                suggestions.append(Suggestion(
-                    text=value,
-                    type=SuggestionType.CONTAINS,
-                    score=0.7
-                ))
-            # بحث مرن
-            elif self.enable_fuzzy:
-                similarity = self._calculate_similarity(query_lower, value_lower)
-                if similarity >= self.fuzzy_threshold:
-                    suggestions.append(Suggestion(
-                        text=value,
-                        type=SuggestionType.FUZZY,
-                        score=similarity * 0.6
-                    ))
-
-        # ترتيب حسب النقاط
-        suggestions.sort(key=lambda s: -s.score)
-        return suggestions[:self.max_suggestions]
-
-    def _calculate_similarity(self, text1: str, text2: str) -> float:
-        """حساب التشابه بين نصين (بخوارزمية بسيطة)"""
-        if not text1 or not text2:
-            return 0.0
-
-        # حساب الأحرف المشتركة
-        common = sum(1 for c in text1 if c in text2)
-        max_len = max(len(text1), len(text2))
-
-        return common / max_len if max_len > 0 else 0.0
+    def _generate_suggestions(self, query: str, index: SearchIndex) -> List[Suggestion]:
+        """إنشاء قائمة الاقتراحات عبر محرك البحث الموحد (أفضل النتائج فقط؛ يُستدعى في الخيط العامل)"""
+        hits = index.search(
+            query,
+            limit=self.max_suggestions,
+            fuzzy=self.enable_fuzzy,
+            fuzzy_threshold=self.fuzzy_threshold,
+            boosts=get_usage_ranking().boosts(self.usage_key)
+        )
+        return [Suggestion(text=hit.value, type=SUGGESTION_TYPES[hit.kind], score=hit.score) for hit in hits]
+
+    def _get_search_index(self) -> SearchIndex:
+        """
+        فهرس البحث للقيم الحالية (المشترك للـ ValueIndex، ويُعاد بناؤه إذا تغيرت القائمة العادية).
+        خيط الواجهة فقط: يُمرر للخيط العامل مع كل طلب بحث.
+        """
+        if self._search_index is None or self._indexed_values is not self.values \
+                or len(self._search_index) != len(self.values):
+            self._search_index = build_search_index(self.values)
+            self._indexed_values = self.values
+        return self._search_index
 
     def _show_popup(self):
         """عرض النافذة المنبثقة"""
@@ -251,61 +253,33 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
             print(f"خطأ في عرض النافذة المنبثقة: {e}")
 
     def _create_popup(self):
-        """إنشاء النافذة المنبثقة"""
-        # تدمير النافذة القديمة إن وجدت
-        if self.popup_window:
-            try:
-                self.popup_window.destroy()
-            except:
-                pass
+        """تجهيز النافذة المنبثقة من المجموعة المشتركة"""
+        # إعادة النافذة القديمة للمجموعة إن وجدت
+        self._release_popup()
 
         # حساب الموقع
         x = self.winfo_rootx()
         y = self.winfo_rooty() + self.winfo_height()
         width = self.winfo_width()
-        height = min(250, len(self.suggestions) * 35 + 10)
-
-        # إنشاء النافذة
-        self.popup_window = ctk.CTkToplevel(self)
-        self.popup_window.wm_overrideredirect(True)
-        self.popup_window.geometry(f"{width}x{height}+{x}+{y}")
-
-        # إطار التمرير
-        self.scroll_frame = ctk.CTkScrollableFrame(
-            self.popup_window,
-            width=width-10,
-            height=height-10
+        height = min(250, len(self.suggestions) * self.ROW_HEIGHT + 10)
+
+        # نافذة مخفية من المجموعة مربوطة بهذا الحقل
+        self._popup = get_popup_pool().acquire(
+            self,
+            on_select=self._select_suggestion_text,
+            row_height=self.ROW_HEIGHT,
+            **self.LIST_COLORS
         )
-        self.scroll_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        self.popup_window = self._popup.window
+        self.list_view = self._popup.list_view
 
         self._populate_suggestions()
+        self._popup.show(x, y, width, height)
 
     def _populate_suggestions(self):
-        """ملء الاقتراحات"""
-        # مسح الاقتراحات السابقة
-        for widget in self.suggestion_widgets:
-            try:
-                widget.destroy()
-            except:
-                pass
-
-        self.suggestion_widgets.clear()
-
-        # إضافة الاقتراحات الجديدة
-        for i, suggestion in enumerate(self.suggestions):
-            btn = ctk.CTkButton(
-                self.scroll_frame,
-                text=suggestion.text,
-                height=30,
-                anchor="w",
-                command=lambda s=suggestion: self._select_suggestion(s)
-            )
-            btn.pack(fill="x", pady=1)
-
-            # ربط أحداث الماوس
-            btn.bind('<Enter>', lambda e, idx=i: self._highlight_suggestion(idx))
-
-            self.suggestion_widgets.append(btn)
+        """ملء الاقتراحات (الصفوف يُعاد استخدامها، لا أزرار لكل اقتراح)"""
+        self.selected_index = -1
+        self.list_view.set_items([suggestion.text for suggestion in self.suggestions])
 
     def _update_popup(self):
         """تحديث محتوى النافذة المنبثقة"""
@@ -313,24 +287,36 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
             self._populate_suggestions()
 
     def _close_popup(self):
-        """إغلاق النافذة المنبثقة"""
-        if self.popup_window:
-            try:
-                self.popup_window.destroy()
-            except:
-                pass
-            finally:
-                self.popup_window = None
+        """إغلاق النافذة المنبثقة وإعادتها للمجموعة"""
+        self._release_popup()
 
         self.is_popup_open = False
         self.selected_index = -1
 
+    def _release_popup(self):
+        """إعادة النافذة المنبثقة للمجموعة المشتركة"""
+        popup, self._popup = self._popup, None
+        self.popup_window = None
+        self.list_view = None
+        get_popup_pool().release(popup)
+
+    def _select_suggestion_text(self, text: str):
+        """اختيار اقتراح بالنقر على صفه في القائمة"""
+        for suggestion in self.suggestions:
+            if suggestion.text == text:
+                self._select_suggestion(suggestion)
+                return
+
     def _select_suggestion(self, suggestion: Suggestion):
         """اختيار اقتراح"""
         self.text_var.set(suggestion.text)
         self.current_value = suggestion.text
         self._close_popup()
 
+        # تسجيل الاختيار
+        if self.usage_key:
+            get_usage_ranking().record(self.usage_key, suggestion.text)
+
         # استدعاء callback
         if self.on_select:
             try:
@@ -339,16 +325,11 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
                 print(f"خطأ في callback: {e}")
 
     def _highlight_suggestion(self, index: int):
-        """تمييز اقتراح"""
+        """تمييز اقتراح وإظهاره في القائمة"""
         self.selected_index = index
-
-        # إزالة التمييز من جميع الأزرار
-        for btn in self.suggestion_widgets:
-            btn.configure(fg_color=["gray75", "gray25"])
-
-        # تمييز الزر المحدد
-        if 0 <= index < len(self.suggestion_widgets):
-            self.suggestion_widgets[index].configure(fg_color=["gray65", "gray35"])
+        if self.list_view:
+            self.list_view.set_selected(index)
+            self.list_view.see(index)
 
     # معالجات الأحداث
     def _on_arrow_down(self, event):
@@ -411,7 +392,8 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
         """فحص فقدان التركيز الفعلي"""
         try:
             focused = self.focus_get()
-            if not focused or focused not in [self.entry] + self.suggestion_widgets:
+            inside_popup = self.popup_window and str(focused).startswith(str(self.popup_window))
+            if not focused or (focused is not self.entry and not inside_popup):
                 self._close_popup()
         except:
             self._close_popup()
@@ -438,15 +420,32 @@ class EnhancedAutoCompleteEntry(ctk.CTkFrame):
         self._close_popup()
 
     def set_values(self, values: List[str]):
-        """تحديث قائمة القيم"""
+        """تحديث قائمة القيم (الفهرس المشترك بنفس رقم الإصدار لا يحتاج تحديثاً)"""
+        if (isinstance(values, ValueIndex) and isinstance(self.values, ValueIndex)
+                and self.values.version == values.version):
+            return
+        self.values = values
+        self._searcher.cancel()
+
+    def apply_changes(self, values: List[str], added: List[str] = (), removed: List[str] = ()):
+        """تطبيق تغييرات مصدر القائمة دون مسح النص المكتوب"""
+        if not added and not removed:
+            return
         self.values = values
-        self._search_cache.clear()  # مسح التخزين المؤقت
+        self._searcher.cancel()
+
+        # تحديث الاقتراحات المعروضة بالنص الحالي
+        if self.is_popup_open:
+            self._perform_search()
 
     def add_value(self, value: str):
         """إضافة قيمة جديدة"""
         if value and value not in self.values:
-            self.values.append(value)
-            self._search_cache.clear()
+            if isinstance(self.values, ValueIndex):
+                self.values = self.values.with_value(value)
+            else:
+                self.values.append(value)
+            self._searcher.cancel()
 
     def focus_set(self):
         """التركيز على الحقل"""
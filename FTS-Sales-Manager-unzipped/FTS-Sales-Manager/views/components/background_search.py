@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+views/components/background_search.py
+
+بحث الحقول خارج خيط الواجهة (Tk) مع تأخير قصير وإلغاء النتائج القديمة.
+
+- كل ضغطة مفتاح ترفع رقم الجيل (generation) وتعيد جدولة البحث بعد delay_ms؛
+  الكتابة السريعة تنتج بحثاً واحداً فقط عند التوقف.
+- البحث ينفذ في خيط عامل واحد مشترك بين كل الحقول؛ كل حقل له طلب معلق واحد
+  على الأكثر (الطلب الجديد يستبدل القديم قبل تنفيذه).
+- النتيجة تُعاد إلى خيط الواجهة فقط إذا كان جيلها ما زال الأحدث، وتُفحص مرة
+  أخرى قبل التطبيق، فلا تظهر نتائج نص تغير بعدها.
+
+دالة البحث تُستدعى في الخيط العامل بالاستعلام وسياقه: يجب ألا تلمس عناصر
+الواجهة ولا حالة الحقل، بل السياق الذي حدده خيط الواجهة عند الطلب فقط (مثل
+فهرس البحث غير القابل للتعديل للقيم الحالية)، فتغيير القيم بعد الطلب لا يخلط
+نتائج قائمتين.
+
+مثال:
+    searcher = BackgroundSearch(widget, search=index_search, on_results=show_results)
+    searcher.submit(entry.get(), index)   # من خيط الواجهة عند كل تغيير للنص
+    searcher.cancel()              # عند الإغلاق أو تغيير القيم
+"""
+
+import threading
+import tkinter as tk
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.logger import logger
+
+DEFAULT_DELAY_MS = 60
+
+
+class _SearchWorker:
+    """خيط عامل مشترك ينفذ آخر طلب معلق لكل حقل بترتيب وصوله"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._pending: Dict['BackgroundSearch', Tuple[int, str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, searcher: 'BackgroundSearch', generation: int, query: str, context: Any):
+        with self._condition:
+            # الطلب الأحدث لنفس الحقل يستبدل القديم وينتقل لآخر الطابور
+            self._pending.pop(searcher, None)
+            self._pending[searcher] = (generation, query, context)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="SuggestionSearch", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                searcher = next(iter(self._pending))
+                generation, query, context = self._pending.pop(searcher)
+            searcher._execute(generation, query, context)
+
+
+_worker = _SearchWorker()
+
+
+class BackgroundSearch:
+    """بحث مؤجل لحقل واحد ينفذ خارج خيط الواجهة ويطبق أحدث نتيجة فقط"""
+
+    def __init__(self, widget, search: Callable[[str, Any], Any], on_results: Callable[[str, Any], None],
+                 delay_ms: int = DEFAULT_DELAY_MS):
+        """
+        :param widget: عنصر الواجهة المستخدم للجدولة عبر after
+        :param search: دالة البحث (تُستدعى في الخيط العامل بالاستعلام والسياق)
+        :param on_results: تُستدعى في خيط الواجهة بالاستعلام ونتيجته
+        :param delay_ms: التأخير بعد آخر تغيير قبل بدء البحث
+        """
+        self._widget = widget
+        self._search = search
+        self._on_results = on_results
+        self.delay_ms = delay_ms
+        self._generation = 0
+        self._timer = None
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def submit(self, query: str, context: Any = None, delay_ms: Optional[int] = None):
+        """
+        جدولة بحث جديد (من خيط الواجهة): يلغي أي بحث سابق لم تُطبق نتيجته
+        :param context: حالة ثابتة يُبحث فيها (مثل فهرس البحث)، تُحدد الآن وليس عند التنفيذ
+        """
+        self.cancel()
+        generation = self._generation
+        delay = self.delay_ms if delay_ms is None else delay_ms
+        if delay > 0:
+            self._timer = self._widget.after(delay, self._dispatch, generation, query, context)
+        else:
+            self._dispatch(generation, query, context)
+
+    def cancel(self):
+        """إلغاء البحث المعلق: أي نتيجة قيد التنفيذ لن تُطبق"""
+        self._generation += 1
+        if self._timer is not None:
+            try:
+                self._widget.after_cancel(self._timer)
+            except (tk.TclError, ValueError):
+                pass
+            self._timer = None
+
+    def _dispatch(self, generation: int, query: str, context: Any):
+        self._timer = None
+        if generation == self._generation:
+            _worker.submit(self, generation, query, context)
+
+    def _execute(self, generation: int, query: str, context: Any):
+        """في الخيط العامل: البحث ثم إعادة النتيجة إذا كانت ما زالت الأحدث"""
+        if generation != self._generation:
+            return
+        try:
+            result = self._search(query, context)
+        except Exception as e:
+            logger.error(f"خطأ في البحث '{query}': {e}", exc_info=True)
+            return
+        if generation != self._generation:
+            return
+        try:
+            self._widget.after(0, self._deliver, generation, query, result)
+        except (tk.TclError, RuntimeError):
+            # الحقل أُغلق أثناء البحث
+            pass
+
+    def _deliver(self, generation: int, query: str, result: Any):
+        """في خيط الواجهة: تطبيق النتيجة إذا لم يتغير النص منذ طلبها"""
+        if generation != self._generation:
+            return
+        try:
+            if not self._widget.winfo_exists():
+                return
+        except tk.TclError:
+            return
+        self._on_results(query, result)
@@ -17,25 +17,36 @@ import tkinter as tk
 from typing import List, Callable, Optional
 import time
 
+from core.search_index import MATCH_CONTAINS, MATCH_EXACT, MATCH_PREFIX, SearchHit, SearchIndex, build_search_index
+from core.usage_ranking import get_usage_ranking
+from core.value_index import ValueIndex
+from views.components.background_search import BackgroundSearch
+from views.components.popup_pool import DropdownPopup, get_popup_pool
+from views.components.virtual_list import VirtualListView
+from utils.ui_scheduler import get_scheduler
+
 
 class EnhancedSearchableComboBox(ctk.CTkFrame):
     """قائمة منسدلة محسنة موحدة مع جميع الميزات وتتبع النافذة - مع إصلاح الأسهم"""
 
     def __init__(self, parent, values: List[str] = None, placeholder: str = "اكتب للبحث...",
                  width: int = 300, height: int = 35, max_results: int = 10,
-                 on_select: Callable[[str], None] = None, debug_mode: bool = False, **kwargs):
+                 on_select: Callable[[str], None] = None, debug_mode: bool = False,
+                 usage_key: Optional[str] = None, **kwargs):
+        """:param usage_key: اسم القائمة في إحصائيات الاستخدام (اختيارات المستخدم تظهر أولاً)"""
 
         super().__init__(parent, width=width, height=height, **kwargs)
 
-        # الإعدادات الأساسية
+        # الإعدادات الأساسية (فهرس ValueIndex يُحفظ بالمرجع ولا يُنسخ)
         self.values = values or []
         self.placeholder = placeholder
         self.max_results = max_results
         self.on_select = on_select
         self.debug_mode = debug_mode
+        self.usage_key = usage_key
 
         # الحالة
-        self.filtered_values = self.values.copy()
+        self.filtered_values = self.values
         self.selected_value = ""
         self.selected_index = -1
         self.is_dropdown_open = False
@@ -51,25 +62,34 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         self._last_window_y = 0
         self._last_entry_x = 0
         self._last_entry_y = 0
-        self._position_check_id = None
+        self._dropdown_jobs = []  # فحوص دورية تعمل فقط والقائمة مفتوحة
         self._dropdown_above = False
 
         # متغيرات الفلترة الحية
         self._last_text = ""
-        self._filter_timer = None
+        self._results_for = None  # (النص، القيم) التي حُسبت لها filtered_values
+        self._search_index: Optional[SearchIndex] = None
+        self._indexed_values = None
+
+        # البحث في خيط عامل مع تأخير قصير؛ تُطبق نتيجة آخر نص فقط
+        self._searcher = BackgroundSearch(self, self._find_matches, self._apply_live_results, delay_ms=50)
 
         # واجهة المستخدم
         self.text_var = tk.StringVar()
         self.text_var.trace_add('write', self._on_text_change)
 
-        # النافذة المنبثقة
+        # النافذة المنبثقة (من المجموعة المشتركة، مع قائمة افتراضية ترسم الصفوف الظاهرة فقط)
+        self._popup: Optional[DropdownPopup] = None
         self.dropdown_window = None
-        self.option_buttons = []
+        self.list_view: Optional[VirtualListView] = None
 
         # بناء الواجهة
         self._build_ui()
         self._setup_events()
 
+        # تجهيز نافذة منبثقة مسبقاً في وقت الخمول (أول فتح لا يُنشئ نافذة)
+        self.after_idle(lambda: get_popup_pool().warm_up(self))
+
         if self.debug_mode:
             print(f"✅ تم إنشاء ComboBox مع {len(self.values)} عنصر")
 
@@ -114,11 +134,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         # self.entry.bind('<Return>', self._on_enter)         # مُزال
         # self.entry.bind('<Escape>', self._on_escape)        # مُزال
 
-        # اكتشاف النقر الخارجي
-        self._setup_outside_click_detection()
-
-        # تتبع تحرك النافذة
-        self._start_position_tracking()
+        # اكتشاف النقر الخارجي وتتبع تحرك النافذة يبدآن عند فتح القائمة (_start_dropdown_jobs)
 
     def _on_key_press(self, event):
         """معالج الضغط على المفاتيح"""
@@ -155,23 +171,19 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
                        'Left', 'Right', 'Home', 'End', 'Page_Up', 'Page_Down']
 
         if key not in control_keys and not self._updating_text:
-            # إلغاء التايمر السابق
-            if self._filter_timer:
-                self.after_cancel(self._filter_timer)
-
-            # جدولة البحث بتأخير قصير
-            self._filter_timer = self.after(50, self._perform_live_filtering)
+            # البحث يُجدول بتأخير قصير ويلغي أي بحث سابق لم تظهر نتيجته
+            self._perform_live_filtering()
 
     def _handle_arrow_down_enhanced(self):
         """معالج السهم لأسفل المحسن - مع تمرير ذكي وطبيعي ودعم التنقل الدائري"""
         if self.debug_mode:
-            print(f"⬇️ سهم أسفل - مفتوحة: {self.is_dropdown_open}, أزرار: {len(self.option_buttons)}, الفهرس الحالي: {self.selected_index}")
+            print(f"⬇️ سهم أسفل - مفتوحة: {self.is_dropdown_open}, أزرار: {self._option_count()}, الفهرس الحالي: {self.selected_index}")
 
         if not self.is_dropdown_open:
             self._open_dropdown()
             return
 
-        if not self.option_buttons:
+        if not self._option_count():
             if self.debug_mode:
                 print("⚠️ لا توجد أزرار للتنقل بينها")
             return
@@ -181,10 +193,10 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         if self.selected_index == -1:
             new_index = 0
         else:
-            new_index = (self.selected_index + 1) % len(self.option_buttons)
+            new_index = (self.selected_index + 1) % self._option_count()
 
         # تحديد نوع التنقل (عادي أم دائري)
-        is_circular_navigation = (old_index == len(self.option_buttons) - 1 and new_index == 0)
+        is_circular_navigation = (old_index == self._option_count() - 1 and new_index == 0)
 
         # تطبيق التحديد الجديد أولاً
         self._highlight_option(new_index)
@@ -205,12 +217,12 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
     def _handle_arrow_up_enhanced(self):
         """معالج السهم لأعلى المحسن - مع تمرير ذكي وطبيعي ودعم التنقل الدائري"""
         if self.debug_mode:
-            print(f"⬆️ سهم أعلى - مفتوحة: {self.is_dropdown_open}, أزرار: {len(self.option_buttons)}, الفهرس الحالي: {self.selected_index}")
+            print(f"⬆️ سهم أعلى - مفتوحة: {self.is_dropdown_open}, أزرار: {self._option_count()}, الفهرس الحالي: {self.selected_index}")
 
         if not self.is_dropdown_open:
             return
 
-        if not self.option_buttons:
+        if not self._option_count():
             if self.debug_mode:
                 print("⚠️ لا توجد أزرار للتنقل بينها")
             return
@@ -218,12 +230,12 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         # حساب الفهرس الجديد بعناية مع دعم التنقل الدائري
         old_index = self.selected_index
         if self.selected_index == -1:
-            new_index = len(self.option_buttons) - 1
+            new_index = self._option_count() - 1
         else:
-            new_index = (self.selected_index - 1) % len(self.option_buttons)
+            new_index = (self.selected_index - 1) % self._option_count()
 
         # تحديد نوع التنقل (عادي أم دائري)
-        is_circular_navigation = (old_index == 0 and new_index == len(self.option_buttons) - 1)
+        is_circular_navigation = (old_index == 0 and new_index == self._option_count() - 1)
 
         # تطبيق التحديد الجديد أولاً
         self._highlight_option(new_index)
@@ -263,7 +275,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             self.clear()
 
     def _perform_live_filtering(self):
-        """تنفيذ الفلترة الحية - نسخة محسنة"""
+        """تنفيذ الفلترة الحية: البحث في الخيط العامل، والتحديث عند وصول نتيجة آخر نص"""
         try:
             current_text = self.entry.get()
 
@@ -276,14 +288,29 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             if self.debug_mode:
                 print(f"🔄 فلترة حية: '{current_text}' - مفتوحة: {self.is_dropdown_open}")
 
+            if current_text.strip():
+                self._searcher.submit(current_text, self._get_search_index())
+            else:
+                self._searcher.cancel()
+                self._apply_live_results(current_text, [])
+
+        except Exception as e:
+            if self.debug_mode:
+                print(f"❌ خطأ في الفلترة الحية: {e}")
+                import traceback
+                traceback.print_exc()
+
+    def _apply_live_results(self, current_text: str, hits: List[SearchHit]):
+        """تطبيق نتيجة الفلترة الحية في خيط الواجهة"""
+        try:
             # حفظ القيمة المحددة حالياً
             previously_selected_value = None
             if 0 <= self.selected_index < len(self.filtered_values):
                 previously_selected_value = self.filtered_values[self.selected_index]
 
-            # البحث والفلترة
+            # تطبيق النتائج
             previous_count = len(self.filtered_values)
-            self._search_values(current_text)
+            self._set_search_results(current_text, hits)
             current_count = len(self.filtered_values)
 
             # إذا كانت القائمة مفتوحة، حدثها
@@ -316,21 +343,27 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
                 import traceback
                 traceback.print_exc()
 
-    def _start_position_tracking(self):
-        """بدء تتبع موقع النافذة"""
-        def track_position():
-            try:
-                if self.is_dropdown_open and self.dropdown_window:
-                    self._update_dropdown_position_if_needed()
-
-                # جدولة التحقق التالي
-                self._position_check_id = self.after(50, track_position)
-            except:
-                if self._position_check_id:
-                    self.after_cancel(self._position_check_id)
-                    self._position_check_id = None
-
-        self._position_check_id = self.after(100, track_position)
+    def _start_dropdown_jobs(self):
+        """فحوص القائمة المفتوحة على المجدول المشترك: تتبع الموقع والنقر الخارجي"""
+        self._stop_dropdown_jobs()
+        scheduler = get_scheduler(self)
+        self._dropdown_jobs = [
+            # القائمة المفتوحة ظاهرة دائماً، فلا تُوقف مع تصغير النافذة الرئيسية
+            scheduler.call_every(50, self._track_position, owner=self, pause_when_hidden=False),
+            # التركيز لا يتغير بدون إدخال من المستخدم
+            scheduler.call_every(100, self._check_outside_click, owner=self,
+                                 pause_when_hidden=False, pause_when_idle=True),
+        ]
+
+    def _stop_dropdown_jobs(self):
+        jobs, self._dropdown_jobs = self._dropdown_jobs, []
+        for job in jobs:
+            get_scheduler(self).cancel(job)
+
+    def _track_position(self):
+        """تتبع موقع النافذة"""
+        if self.is_dropdown_open and self.dropdown_window:
+            self._update_dropdown_position_if_needed()
 
     def _update_dropdown_position_if_needed(self):
         """تحديث موقع القائمة إذا تغير موقع النافذة أو الحقل"""
@@ -517,7 +550,6 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         safe_widgets = [self, self.entry, self.dropdown_btn, self.main_frame]
         if self.dropdown_window:
             safe_widgets.append(self.dropdown_window)
-        safe_widgets.extend(self.option_buttons)
 
         # فحص مباشر وهرمي محدود
         current = widget
@@ -530,17 +562,13 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
                 break
         return False
 
-    def _setup_outside_click_detection(self):
-        """إعداد اكتشاف النقر الخارجي"""
-        def check_outside():
-            try:
-                if self.is_dropdown_open and not self._is_focus_inside(self.focus_get()):
-                    self._close_dropdown()
-            except:
-                pass
-            self.after(100, check_outside)
-
-        self.after(100, check_outside)
+    def _check_outside_click(self):
+        """اكتشاف النقر الخارجي"""
+        try:
+            if self.is_dropdown_open and not self._is_focus_inside(self.focus_get()):
+                self._close_dropdown()
+        except:
+            pass
 
     def _toggle_dropdown(self):
         """تبديل حالة القائمة"""
@@ -555,12 +583,14 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             return
 
         try:
-            # تحضير البيانات مع الفلترة
+            # تحضير البيانات مع الفلترة (بدون إعادة البحث إذا وصلت نتيجة النص الحالي)
             current_text = self.entry.get().strip()
             if current_text:
-                self._search_values(current_text)
+                if not self._results_for or self._results_for[0] != current_text \
+                        or self._results_for[1] is not self.values:
+                    self._search_values(current_text)
             else:
-                self.filtered_values = self.values.copy()
+                self.filtered_values = self._all_values()
 
             # إنشاء النافذة حتى لو لم توجد نتائج (لعرض رسالة)
             self._create_dropdown_window()
@@ -575,7 +605,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             elif self.filtered_values:
                 self._populate_dropdown()
                 # تحديد العنصر الأول تلقائياً لتمكين التنقل بالأسهم
-                if self.option_buttons:
+                if self._option_count():
                     self._highlight_option(0)
                     if self.debug_mode:
                         print(f"🎯 تحديد العنصر الأول تلقائياً: {self.filtered_values[0]}")
@@ -592,15 +622,9 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
                 print(f"❌ خطأ في فتح القائمة: {e}")
 
     def _create_dropdown_window(self):
-        """إنشاء نافذة القائمة المنسدلة"""
+        """تجهيز نافذة القائمة المنسدلة من المجموعة المشتركة (بدون إنشاء نافذة جديدة)"""
         # تنظيف سابق
-        if self.dropdown_window:
-            try:
-                self.dropdown_window.destroy()
-            except:
-                pass
-
-        self.option_buttons.clear()
+        self._release_popup()
 
         try:
             # حساب الموقع والحجم الأمثل
@@ -612,30 +636,20 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             self._last_entry_x = self.winfo_rootx()
             self._last_entry_y = self.winfo_rooty()
 
-            # إنشاء النافذة
-            main_window = self.winfo_toplevel()
-            self.dropdown_window = ctk.CTkToplevel(main_window)
-            self.dropdown_window.wm_overrideredirect(True)
-            self.dropdown_window.geometry(f"{width}x{height}+{x}+{y}")
-
-            # التأكد من أن النافذة تظهر فوق النافذة الرئيسية
-            self.dropdown_window.lift()
-            self.dropdown_window.attributes('-topmost', True)
-
-            # إطار قابل للتمرير
-            self.list_frame = ctk.CTkScrollableFrame(
-                self.dropdown_window,
-                width=width-10,
-                height=height-10
-            )
-            self.list_frame.pack(fill="both", expand=True, padx=5, pady=5)
+            # نافذة من المجموعة مربوطة بهذا الحقل، فوق النافذة الرئيسية
+            # (قائمتها الافتراضية: عدد عناصر الرسم ثابت مهما كان عدد القيم)
+            self._popup = get_popup_pool().acquire(self, on_select=self._select_value)
+            self.dropdown_window = self._popup.window
+            self.list_view = self._popup.list_view
+            self._popup.show(x, y, width, height, topmost=True)
+            self._start_dropdown_jobs()
 
         except Exception as e:
             if self.debug_mode:
                 print(f"❌ خطأ في إنشاء النافذة: {e}")
 
     def _populate_dropdown(self):
-        """ملء القائمة بالخيارات - محسن للعمل مع الأسهم"""
+        """عرض الخيارات في القائمة الافتراضية (بالمرجع، بدون إنشاء عناصر لكل قيمة)"""
         if not self.filtered_values:
             if self.debug_mode:
                 print("⚠️ لا توجد قيم لعرضها في القائمة")
@@ -644,41 +658,11 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         if self.debug_mode:
             print(f"📋 ملء القائمة بـ {len(self.filtered_values)} عنصر")
 
-        for i, value in enumerate(self.filtered_values):
-            try:
-                btn = ctk.CTkButton(
-                    self.list_frame,
-                    text=value,
-                    height=35,
-                    anchor="w",
-                    fg_color="transparent",
-                    text_color=("#1976D2", "#FFFFFF"),
-                    hover_color=("#E3F2FD", "#1E90FF"),  # الألوان الزرقاء
-                    command=lambda v=value: self._select_value(v)
-                )
-                btn.pack(fill="x", pady=1, padx=2)
-
-                # أحداث التمرير بالماوس فقط (لا تتدخل مع الأسهم)
-                btn.bind('<Enter>', lambda e, idx=i: self._on_mouse_enter(idx))
-                btn.bind('<Leave>', lambda e, idx=i: self._on_mouse_leave(idx))
-
-                self.option_buttons.append(btn)
-
-                if self.debug_mode and i < 3:  # طباعة أول 3 عناصر فقط
-                    print(f"  ✅ تم إنشاء زر {i}: {value}")
-
-            except Exception as e:
-                if self.debug_mode:
-                    print(f"❌ خطأ في إنشاء الزر {i}: {e}")
-
-        # فرض تحديث العرض
         try:
-            self.list_frame.update_idletasks()
-            if self.debug_mode:
-                print(f"✅ تم ملء القائمة بنجاح: {len(self.option_buttons)} زر")
+            self.list_view.set_items(self.filtered_values)
         except Exception as e:
             if self.debug_mode:
-                print(f"❌ خطأ في تحديث العرض: {e}")
+                print(f"❌ خطأ في ملء القائمة: {e}")
 
     def _select_value(self, value: str):
         """اختيار قيمة"""
@@ -692,9 +676,15 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             self.entry.delete(0, tk.END)
             self.entry.insert(0, value)
 
+            self._searcher.cancel()
             self._close_dropdown()
             self.entry.focus_set()
 
+            # تسجيل الاختيار لترتيب الاقتراحات حسب استخدام المستخدم
+            if self.usage_key:
+                get_usage_ranking().record(self.usage_key, value)
+                self._results_for = None
+
             # استدعاء callback
             if self.on_select:
                 self.after(20, lambda: self.on_select(value))
@@ -709,11 +699,10 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
 
         self._closing = True
         try:
-            if self.dropdown_window:
-                self.dropdown_window.destroy()
-                self.dropdown_window = None
+            # نتيجة بحث متأخرة لا تعيد فتح القائمة بعد إغلاقها
+            self._searcher.cancel()
 
-            self.option_buttons.clear()
+            self._release_popup()
             self.is_dropdown_open = False
             self.selected_index = -1
             self.dropdown_btn.configure(text="▼")
@@ -721,7 +710,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
 
             # إعادة تعيين الفلترة للقيم الكاملة عند الإغلاق
             if not self.entry.get().strip():
-                self.filtered_values = self.values.copy()
+                self.filtered_values = self.values
 
             if self.debug_mode:
                 print("🔒 تم إغلاق القائمة مع إعادة تعيين الفلترة")
@@ -732,50 +721,66 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         finally:
             self._closing = False
 
+    def _release_popup(self):
+        """إعادة النافذة المنبثقة للمجموعة المشتركة"""
+        self._stop_dropdown_jobs()
+        popup, self._popup = self._popup, None
+        self.dropdown_window = None
+        self.list_view = None
+        get_popup_pool().release(popup)
+
+    def _find_matches(self, query: str, index: SearchIndex) -> List[SearchHit]:
+        """
+        نتائج محرك البحث الموحد: التطابق التام، ثم من البداية، ثم في أي مكان.
+        تبحث في الفهرس المعطى فقط ولا تغير حالة الحقل، فتُستدعى من الخيط العامل.
+        """
+        if not query or not query.strip():
+            return []
+        return index.search(query, limit=self.max_results, fuzzy=False,
+                            boosts=get_usage_ranking().boosts(self.usage_key))
+
     def _search_values(self, query: str):
-        """البحث في القيم مع دعم الفلترة الحية المحسنة"""
+        """البحث في القيم فوراً في خيط الواجهة (لفتح القائمة وتطبيق التغييرات)"""
+        self._set_search_results(query, self._find_matches(query, self._get_search_index()))
+
+    def _set_search_results(self, query: str, hits: List[SearchHit]):
+        """تعيين القيم المفلترة من نتائج البحث"""
+        self._results_for = (query.strip(), self.values)
         if not query:
-            self.filtered_values = self.values.copy()
+            self.filtered_values = self._all_values()
             if self.debug_mode:
                 print(f"🔍 مسح البحث: عودة لجميع القيم ({len(self.filtered_values)} عنصر)")
             return
 
-        query_lower = query.lower().strip()
-        if not query_lower:
-            self.filtered_values = self.values.copy()
+        if not query.strip():
+            self.filtered_values = self._all_values()
             return
 
-        results = []
-        exact_matches = []
-        start_matches = []
-        contains_matches = []
-
-        # تصنيف النتائج حسب نوع التطابق لفلترة أفضل
-        for value in self.values:
-            value_lower = value.lower()
-
-            if value_lower == query_lower:
-                # تطابق تام
-                exact_matches.append(value)
-            elif value_lower.startswith(query_lower):
-                # تطابق من البداية
-                start_matches.append(value)
-            elif query_lower in value_lower:
-                # تطابق في أي مكان
-                contains_matches.append(value)
-
-        # ترتيب النتائج: التطابق التام أولاً، ثم من البداية، ثم في أي مكان
-        results = exact_matches + start_matches + contains_matches
-        self.filtered_values = results[:self.max_results]
+        self.filtered_values = [hit.value for hit in hits]
 
         if self.debug_mode:
-            total_matches = len(exact_matches) + len(start_matches) + len(contains_matches)
+            kinds = [hit.kind for hit in hits]
             print(f"🔍 بحث محسن '{query}':")
-            print(f"  📊 النتائج: {len(exact_matches)} تام + {len(start_matches)} بداية + {len(contains_matches)} محتوى = {total_matches}")
-            print(f"  📋 معروض: {len(self.filtered_values)} من أصل {total_matches}")
+            print(f"  📊 النتائج: {kinds.count(MATCH_EXACT)} تام + {kinds.count(MATCH_PREFIX)} بداية + "
+                  f"{kinds.count(MATCH_CONTAINS)} محتوى = {len(hits)}")
             if self.filtered_values:
                 print(f"  🎯 أول 3 نتائج: {self.filtered_values[:3]}")
 
+    def _all_values(self):
+        """كل القيم للنص الفارغ: اختيارات المستخدم المعتادة أولاً ثم بقية القائمة"""
+        return get_usage_ranking().boosts(self.usage_key).pin_to_front(self.values)
+
+    def _get_search_index(self) -> SearchIndex:
+        """
+        فهرس البحث للقيم الحالية (المشترك للـ ValueIndex، ويُعاد بناؤه إذا تغيرت القائمة العادية).
+        خيط الواجهة فقط: يُمرر للخيط العامل مع كل طلب بحث.
+        """
+        if self._search_index is None or self._indexed_values is not self.values \
+                or len(self._search_index) != len(self.values):
+            self._search_index = build_search_index(self.values)
+            self._indexed_values = self.values
+        return self._search_index
+
     def _on_text_change(self, *args):
         """معالج تغيير النص - يتكامل مع الفلترة الحية"""
         if self._updating_text:
@@ -785,7 +790,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
 
     def _update_dropdown_live(self):
         """تحديث القائمة المنسدلة بالفلترة الحية - محسن"""
-        if not self.dropdown_window or not self.list_frame:
+        if not self.dropdown_window or not self.list_view:
             if self.debug_mode:
                 print("❌ لا توجد نافذة قائمة لتحديثها")
             return
@@ -794,12 +799,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             if self.debug_mode:
                 print(f"🔄 تحديث القائمة: {len(self.filtered_values)} عنصر")
 
-            # مسح المحتوى السابق
-            for widget in self.list_frame.winfo_children():
-                widget.destroy()
-
-            # إعادة تعيين قائمة الأزرار والفهرس
-            self.option_buttons.clear()
+            # إعادة تعيين الفهرس (الصفوف نفسها يُعاد استخدامها)
             self.selected_index = -1  # سيتم إعادة تعيينه في _perform_live_filtering
 
             # عرض المحتوى الجديد
@@ -810,18 +810,14 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
                 self._show_no_results_message()
             elif not self.filtered_values and not current_text:
                 # إذا تم مسح النص، أعد عرض جميع القيم
-                self.filtered_values = self.values.copy()
+                self.filtered_values = self._all_values()
                 self._populate_dropdown()
             else:
                 # عرض النتائج المفلترة
                 self._populate_dropdown()
 
-            # فرض تحديث العرض
-            self.list_frame.update_idletasks()
-            self.dropdown_window.update_idletasks()
-
             if self.debug_mode:
-                print(f"✅ تم تحديث القائمة: {len(self.option_buttons)} زر معروض")
+                print(f"✅ تم تحديث القائمة: {self._option_count()} عنصر")
 
         except Exception as e:
             if self.debug_mode:
@@ -831,36 +827,15 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
 
     def _show_no_results_message(self):
         """عرض رسالة عدم وجود نتائج"""
-        if not self.dropdown_window or not self.list_frame:
+        if not self.dropdown_window or not self.list_view:
             return
 
         try:
             if self.debug_mode:
                 print("📭 عرض رسالة عدم وجود نتائج")
 
-            # مسح المحتوى السابق
-            for widget in self.list_frame.winfo_children():
-                widget.destroy()
-
-            self.option_buttons.clear()
             self.selected_index = -1
-
-            # إضافة رسالة "لا توجد نتائج"
-            no_results_frame = ctk.CTkFrame(self.list_frame, fg_color="transparent")
-            no_results_frame.pack(fill="both", expand=True, pady=10, padx=10)
-
-            no_results_label = ctk.CTkLabel(
-                no_results_frame,
-                text="🔍 لا توجد نتائج مطابقة",
-                height=35,
-                text_color=("gray", "lightgray"),
-                font=ctk.CTkFont(size=12, slant="italic")
-            )
-            no_results_label.pack(expand=True)
-
-            # فرض تحديث العرض
-            self.list_frame.update_idletasks()
-            self.dropdown_window.update_idletasks()
+            self.list_view.show_message("🔍 لا توجد نتائج مطابقة")
 
         except Exception as e:
             if self.debug_mode:
@@ -878,12 +853,9 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             # تطبيق الحجم الجديد مع تأثير سلس
             current_geometry = self.dropdown_window.geometry()
             if f"{width}x{height}+{x}+{y}" != current_geometry:
+                # القائمة الافتراضية تملأ النافذة وتعيد رسم الصفوف الظاهرة تلقائياً
                 self.dropdown_window.geometry(f"{width}x{height}+{x}+{y}")
 
-                # تحديث إطار القائمة
-                if hasattr(self, 'list_frame'):
-                    self.list_frame.configure(width=width-10, height=height-10)
-
                 if self.debug_mode:
                     print(f"📏 تغيير حجم القائمة إلى: {width}x{height}")
 
@@ -923,20 +895,20 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             if self.debug_mode:
                 print(f"❌ خطأ في الفتح التلقائي: {e}")
 
+    def _option_count(self) -> int:
+        """عدد الخيارات المعروضة في القائمة المفتوحة"""
+        return len(self.list_view) if self.list_view else 0
+
     def _highlight_option(self, index: int):
         """تمييز خيار بالأسهم - مُصلح لضمان تحديث الفهرس بدقة"""
-        if not (0 <= index < len(self.option_buttons)):
+        if not (0 <= index < self._option_count()):
             if self.debug_mode:
-                print(f"⚠️ فهرس غير صالح للتمييز: {index} (المتاح: 0-{len(self.option_buttons)-1})")
+                print(f"⚠️ فهرس غير صالح للتمييز: {index} (المتاح: 0-{self._option_count()-1})")
             return
 
         try:
-            # إزالة التمييز من جميع الأزرار
-            for i, btn in enumerate(self.option_buttons):
-                btn.configure(fg_color="transparent")
-
-            # تمييز الزر المحدد بالأزرق
-            self.option_buttons[index].configure(fg_color=("#E3F2FD", "#1E90FF"))
+            # تمييز الصف المحدد بالأزرق (يُعاد تلوين الصف السابق فقط)
+            self.list_view.set_selected(index)
 
             # تحديث الفهرس المحدد - هذا مهم لتجنب التخطي!
             self.selected_index = index
@@ -949,321 +921,38 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             if self.debug_mode:
                 print(f"❌ خطأ في تمييز الخيار {index}: {e}")
 
-    def _on_mouse_enter(self, index: int):
-        """تمييز عند التمرير بالماوس (لا يغير selected_index)"""
-        if not (0 <= index < len(self.option_buttons)):
-            return
-
-        try:
-            # تمييز بصري خفيف فقط
-            if index != self.selected_index:
-                self.option_buttons[index].configure(fg_color=("#F8F9FA", "#2A2D3A"))
-        except Exception as e:
-            if self.debug_mode:
-                print(f"❌ خطأ في تمييز الماوس {index}: {e}")
-
-    def _on_mouse_leave(self, index: int):
-        """إزالة تمييز الماوس (الحفاظ على تحديد الأسهم)"""
-        if 0 <= index < len(self.option_buttons):
-            try:
-                if index != self.selected_index:
-                    self.option_buttons[index].configure(fg_color="transparent")
-            except Exception as e:
-                if self.debug_mode:
-                    print(f"❌ خطأ في إزالة تمييز الماوس {index}: {e}")
-
     def _scroll_to_option(self, index: int):
-        """تمرير ذكي وتدريجي للقائمة - يعرض العناصر التالية عند الحاجة فقط"""
-        if not (0 <= index < len(self.option_buttons)) or not hasattr(self, 'list_frame'):
+        """تمرير أقل مسافة لإظهار العنصر مع عنصر قبله أو بعده"""
+        if not (0 <= index < self._option_count()):
             return
 
         try:
-            # الحصول على canvas الخاص بالإطار القابل للتمرير
-            if not hasattr(self.list_frame, '_parent_canvas') or not self.list_frame._parent_canvas:
-                return
-
-            canvas = self.list_frame._parent_canvas
-
-            # الحصول على معلومات التمرير الحالية
-            canvas_height = canvas.winfo_height()
-            scroll_top, scroll_bottom = canvas.yview()
-
-            # حساب موقع العنصر المحدد
-            item_height = 37  # ارتفاع كل عنصر (35 + padding)
-            item_top = index * item_height
-            item_bottom = item_top + item_height
-
-            # حساب المنطقة المرئية الحالية
-            total_height = len(self.option_buttons) * item_height
-            visible_top = scroll_top * total_height
-            visible_bottom = scroll_bottom * total_height
-
-            # هامش أمان للتمرير (لإظهار العنصر بوضوح)
-            margin = item_height * 0.5
-
-            # فحص ما إذا كان العنصر مرئياً بالفعل
-            is_visible = (item_top >= visible_top - margin and
-                         item_bottom <= visible_bottom + margin)
-
-            if is_visible:
-                # العنصر مرئي - لا حاجة للتمرير
-                if self.debug_mode:
-                    print(f"📜 العنصر {index} مرئي بالفعل - لا تمرير")
-                return
-
-            # تحديد نوع التمرير المطلوب
-            if item_top < visible_top:
-                # العنصر أعلى المنطقة المرئية - تمرير لأعلى
-                self._scroll_up_to_show(canvas, index, item_height, total_height)
-            else:
-                # العنصر أسفل المنطقة المرئية - تمرير لأسفل
-                self._scroll_down_to_show(canvas, index, item_height, total_height)
-
-        except Exception as e:
-            if self.debug_mode:
-                print(f"❌ خطأ في التمرير الذكي: {e}")
-
-    def _scroll_up_to_show(self, canvas, index, item_height, total_height):
-        """تمرير تدريجي لأعلى لإظهار العنصر"""
-        try:
-            # حساب الموقع المطلوب (مع هامش صغير)
-            target_top = max(0, (index - 1) * item_height)
-            new_scroll_position = target_top / total_height
-
-            # التمرير التدريجي
-            current_position = canvas.yview()[0]
-            step = min(0.1, abs(new_scroll_position - current_position) / 3)
-
-            if new_scroll_position < current_position:
-                target_position = max(new_scroll_position, current_position - step)
-                canvas.yview_moveto(target_position)
-
-                if self.debug_mode:
-                    print(f"📜⬆️ تمرير لأعلى: العنصر {index} (موقع: {target_position:.3f})")
-
-        except Exception as e:
-            if self.debug_mode:
-                print(f"❌ خطأ في التمرير لأعلى: {e}")
-
-    def _scroll_down_to_show(self, canvas, index, item_height, total_height):
-        """تمرير تدريجي لأسفل لإظهار العناصر التالية"""
-        try:
-            canvas_height = canvas.winfo_height()
-            visible_items = max(1, int(canvas_height / item_height))
-
-            # حساب الموقع المطلوب لإظهار العنصر في أسفل القائمة المرئية
-            target_bottom_item = min(len(self.option_buttons) - 1, index + 1)
-            target_top_item = max(0, target_bottom_item - visible_items + 1)
-
-            target_top = target_top_item * item_height
-            new_scroll_position = min(1.0, target_top / total_height)
-
-            # التمرير التدريجي
-            current_position = canvas.yview()[0]
-            step = min(0.1, abs(new_scroll_position - current_position) / 3)
-
-            if new_scroll_position > current_position:
-                target_position = min(new_scroll_position, current_position + step)
-                canvas.yview_moveto(target_position)
-
-                if self.debug_mode:
-                    print(f"📜⬇️ تمرير لأسفل: العنصر {index} (موقع: {target_position:.3f}) - عناصر مرئية: {visible_items}")
-
+            self.list_view.see(index)
         except Exception as e:
             if self.debug_mode:
-                print(f"❌ خطأ في التمرير لأسفل: {e}")
+                print(f"❌ خطأ في التمرير: {e}")
 
     def _scroll_to_option_smooth(self, index: int, direction: str = "auto"):
-        """تمرير سلس ومحسن للعنصر مع مراعاة الاتجاه"""
-        if not (0 <= index < len(self.option_buttons)) or not hasattr(self, 'list_frame'):
-            return
-
-        try:
-            # الحصول على canvas الخاص بالإطار القابل للتمرير
-            if not hasattr(self.list_frame, '_parent_canvas') or not self.list_frame._parent_canvas:
-                return
-
-            canvas = self.list_frame._parent_canvas
-
-            # تأخير قصير للسماح للتحديد بالحدوث أولاً
-            def perform_smooth_scroll():
-                try:
-                    # الحصول على معلومات التمرير الحالية
-                    canvas_height = canvas.winfo_height()
-                    scroll_top, scroll_bottom = canvas.yview()
-
-                    # حساب موقع العنصر المحدد
-                    item_height = 37  # ارتفاع كل عنصر
-                    item_top = index * item_height
-                    item_bottom = item_top + item_height
-
-                    # حساب المنطقة المرئية الحالية
-                    total_height = len(self.option_buttons) * item_height
-                    visible_top = scroll_top * total_height
-                    visible_bottom = scroll_bottom * total_height
-
-                    # هامش أمان (نصف عنصر)
-                    margin = item_height * 0.5
-
-                    # فحص ما إذا كان العنصر مرئياً بالكامل
-                    is_fully_visible = (item_top >= visible_top + margin and
-                                       item_bottom <= visible_bottom - margin)
-
-                    if is_fully_visible:
-                        if self.debug_mode:
-                            print(f"📜✅ العنصر {index} مرئي بالكامل - لا تمرير مطلوب")
-                        return
-
-                    # حساب التمرير المطلوب حسب الاتجاه
-                    if direction == "down":
-                        self._smart_scroll_down(canvas, index, item_height, total_height, canvas_height)
-                    elif direction == "up":
-                        self._smart_scroll_up(canvas, index, item_height, total_height, canvas_height)
-                    else:
-                        # تمرير تلقائي حسب الموقع
-                        self._scroll_to_option(index)
-
-                except Exception as e:
-                    if self.debug_mode:
-                        print(f"❌ خطأ في التمرير السلس: {e}")
-
-            # تنفيذ التمرير بتأخير قصير
-            self.after(10, perform_smooth_scroll)
-
-        except Exception as e:
-            if self.debug_mode:
-                print(f"❌ خطأ في إعداد التمرير السلس: {e}")
-
-    def _smart_scroll_down(self, canvas, index, item_height, total_height, canvas_height):
-        """تمرير ذكي لأسفل - يعرض العناصر التالية تدريجياً"""
-        try:
-            visible_items = max(1, int(canvas_height / item_height) - 1)  # ترك مساحة للتمرير
-
-            # إذا كان العنصر في النصف السفلي من القائمة المرئية، قم بالتمرير
-            current_scroll_top = canvas.yview()[0]
-            current_top_item = int((current_scroll_top * total_height) / item_height)
+        """تمرير للعنصر عند التنقل بالأسهم (يُظهر العنصر التالي في اتجاه الحركة)"""
+        self._scroll_to_option(index)
 
-            # إذا كان العنصر المحدد قريباً من نهاية القائمة المرئية
-            if index >= current_top_item + visible_items - 2:
-                # حساب موقع التمرير الجديد لإظهار عناصر إضافية
-                new_top_item = min(len(self.option_buttons) - visible_items,
-                                 max(0, index - visible_items + 3))
-
-                new_scroll_position = (new_top_item * item_height) / total_height
-                new_scroll_position = min(1.0, new_scroll_position)
-
-                # تطبيق التمرير
-                canvas.yview_moveto(new_scroll_position)
-
-                if self.debug_mode:
-                    print(f"📜⬇️ تمرير ذكي لأسفل: العنصر {index} - عرض من {new_top_item}")
-
-        except Exception as e:
-            if self.debug_mode:
-                print(f"❌ خطأ في التمرير الذكي لأسفل: {e}")
-
-    def _smart_scroll_up(self, canvas, index, item_height, total_height, canvas_height):
-        """تمرير ذكي لأعلى - يعرض العناصر السابقة تدريجياً"""
-        try:
-            visible_items = max(1, int(canvas_height / item_height) - 1)
-
-            # إذا كان العنصر في النصف العلوي من القائمة المرئية، قم بالتمرير
-            current_scroll_top = canvas.yview()[0]
-            current_top_item = int((current_scroll_top * total_height) / item_height)
-
-            # إذا كان العنصر المحدد قريباً من بداية القائمة المرئية
-            if index <= current_top_item + 1:
-                # حساب موقع التمرير الجديد لإظهار عناصر سابقة إضافية
-                new_top_item = max(0, index - 2)
-
-                new_scroll_position = (new_top_item * item_height) / total_height
-                new_scroll_position = max(0.0, new_scroll_position)
-
-                # تطبيق التمرير
-                canvas.yview_moveto(new_scroll_position)
-
-                if self.debug_mode:
-                    print(f"📜⬆️ تمرير ذكي لأعلى: العنصر {index} - عرض من {new_top_item}")
-
-        except Exception as e:
-            if self.debug_mode:
-                print(f"❌ خطأ في التمرير الذكي لأعلى: {e}")
+        if self.debug_mode:
+            arrow = {"down": "⬇️", "up": "⬆️"}.get(direction, "")
+            print(f"📜{arrow} تمرير للعنصر {index}")
 
     def _scroll_to_top_smooth(self):
-        """تمرير سلس للأعلى (للتنقل الدائري - العودة للبداية)"""
-        if not hasattr(self, 'list_frame') or not hasattr(self.list_frame, '_parent_canvas'):
-            return
-
-        try:
-            canvas = self.list_frame._parent_canvas
-            if not canvas:
-                return
-
-            # تمرير تدريجي للأعلى
-            def smooth_scroll_to_top(current_position=None):
-                if current_position is None:
-                    current_position = canvas.yview()[0]
-
-                if current_position <= 0.05:  # وصل للأعلى تقريباً
-                    canvas.yview_moveto(0.0)  # تأكيد الوصول للأعلى تماماً
-                    if self.debug_mode:
-                        print("🔄⬆️ وصل للأعلى - تنقل دائري مكتمل")
-                    return
-
-                # تمرير تدريجي
-                step = min(0.15, current_position / 3)
-                new_position = max(0.0, current_position - step)
-                canvas.yview_moveto(new_position)
-
-                # الاستمرار في التمرير
-                self.after(30, lambda: smooth_scroll_to_top(new_position))
-
-            smooth_scroll_to_top()
-
-            if self.debug_mode:
-                print("🔄⬆️ بدء التمرير السلس للأعلى (تنقل دائري)")
-
-        except Exception as e:
+        """تمرير للأعلى (للتنقل الدائري - العودة للبداية)"""
+        if self.list_view:
+            self.list_view.scroll_to_top()
             if self.debug_mode:
-                print(f"❌ خطأ في التمرير للأعلى: {e}")
+                print("🔄⬆️ تمرير للأعلى (تنقل دائري)")
 
     def _scroll_to_bottom_smooth(self):
-        """تمرير سلس للأسفل (للتنقل الدائري - الذهاب للنهاية)"""
-        if not hasattr(self, 'list_frame') or not hasattr(self.list_frame, '_parent_canvas'):
-            return
-
-        try:
-            canvas = self.list_frame._parent_canvas
-            if not canvas:
-                return
-
-            # تمرير تدريجي للأسفل
-            def smooth_scroll_to_bottom(current_position=None):
-                if current_position is None:
-                    current_position = canvas.yview()[0]
-
-                if current_position >= 0.95:  # وصل للأسفل تقريباً
-                    canvas.yview_moveto(1.0)  # تأكيد الوصول للأسفل تماماً
-                    if self.debug_mode:
-                        print("🔄⬇️ وصل للأسفل - تنقل دائري مكتمل")
-                    return
-
-                # تمرير تدريجي
-                step = min(0.15, (1.0 - current_position) / 3)
-                new_position = min(1.0, current_position + step)
-                canvas.yview_moveto(new_position)
-
-                # الاستمرار في التمرير
-                self.after(30, lambda: smooth_scroll_to_bottom(new_position))
-
-            smooth_scroll_to_bottom()
-
+        """تمرير للأسفل (للتنقل الدائري - الذهاب للنهاية)"""
+        if self.list_view:
+            self.list_view.scroll_to_bottom()
             if self.debug_mode:
-                print("🔄⬇️ بدء التمرير السلس للأسفل (تنقل دائري)")
-
-        except Exception as e:
-            if self.debug_mode:
-                print(f"❌ خطأ في التمرير للأسفل: {e}")
+                print("🔄⬇️ تمرير للأسفل (تنقل دائري)")
 
     # معالجات لوحة المفاتيح الأصلية (للتوافق - لكن لن تستخدم بعد الآن)
     def _on_arrow_down(self, event):
@@ -1318,29 +1007,84 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
 
     def clear(self):
         """مسح القيمة"""
+        self._searcher.cancel()
         self._updating_text = True
         try:
             self.selected_value = ""
             self.text_var.set("")
             self.entry.delete(0, tk.END)
-            self.filtered_values = self.values.copy()
+            self.filtered_values = self.values
             if self.is_dropdown_open:
                 self._close_dropdown()
         finally:
             self._updating_text = False
 
     def set_values(self, values: List[str]):
-        """تحديث قائمة القيم"""
-        self.values = values.copy() if values else []
-        self.filtered_values = self.values.copy()
+        """
+        تحديث قائمة القيم.
+        الفهرس المشترك (ValueIndex) يُحفظ بالمرجع، ولا يتغير شيء إذا لم يتغير رقم إصداره.
+        """
+        if isinstance(values, ValueIndex):
+            if isinstance(self.values, ValueIndex) and self.values.version == values.version:
+                return
+            self.values = values
+        else:
+            self.values = values.copy() if values else []
+        self._searcher.cancel()
+        self.filtered_values = self.values
+        self._results_for = None
         if self.debug_mode:
             print(f"📋 تحديث: {len(self.values)} عنصر")
 
+    def apply_changes(self, values: List[str], added: List[str] = (), removed: List[str] = ()):
+        """
+        تطبيق تغييرات مصدر القائمة دون إعادة إنشاء الحقل أو مسح ما كتبه المستخدم:
+        القيمة المختارة تبقى في القائمة حتى لو حُذفت من المصدر، والقائمة المفتوحة
+        تُعاد فلترتها بالنص الحالي مع الإبقاء على العنصر المحدد.
+        """
+        if not added and not removed:
+            return
+
+        if self.selected_value and self.selected_value not in values:
+            if isinstance(values, ValueIndex):
+                values = values.with_value(self.selected_value)
+            else:
+                values = list(values) + [self.selected_value]
+        self.values = values
+        # بحث معلق على القيم القديمة لا يطبق نتائجه على القائمة الجديدة
+        self._searcher.cancel()
+
+        if self.is_dropdown_open:
+            self._last_text = None
+            self._perform_live_filtering()
+        else:
+            self._search_values(self.entry.get().strip())
+
+        if self.debug_mode:
+            print(f"📋 تغييرات: +{len(added)} -{len(removed)} ({len(self.values)} عنصر)")
+
     def add_value(self, value: str):
         """إضافة قيمة جديدة"""
-        if value and value not in self.values:
+        if not value or value in self.values:
+            return
+        if isinstance(self.values, ValueIndex):
+            # الفهرس غير قابل للتعديل: نسخة خاصة بهذا الحقل مع القيمة الجديدة
+            self.values = self.values.with_value(value)
+        else:
             self.values.append(value)
-            self.filtered_values = self.values.copy()
+        self._searcher.cancel()
+        self.filtered_values = self.values
+        self._results_for = None
+
+    def set_loading(self, loading: bool, text: str = "جاري التحميل..."):
+        """حالة تحميل داخل الحقل (للقوائم التي تُحمّل عند الطلب)"""
+        try:
+            self.entry.configure(placeholder_text=text if loading else self.placeholder)
+            if not self.is_dropdown_open:
+                self.dropdown_btn.configure(text="⏳" if loading else "▼")
+        except Exception as e:
+            if self.debug_mode:
+                print(f"❌ فشل تحديث حالة التحميل: {e}")
 
     def is_valid_selection(self) -> bool:
         """التحقق من صحة الاختيار"""
@@ -1386,15 +1130,11 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
     def destroy(self):
         """تنظيف الموارد عند الحذف"""
         try:
-            # إيقاف التايمرات
-            if hasattr(self, '_filter_timer') and self._filter_timer:
-                self.after_cancel(self._filter_timer)
-                self._filter_timer = None
+            # إيقاف البحث المعلق
+            self._searcher.cancel()
 
             # إيقاف تتبع الموقع
-            if self._position_check_id:
-                self.after_cancel(self._position_check_id)
-                self._position_check_id = None
+            self._stop_dropdown_jobs()
 
             # إغلاق القائمة
             if self.is_dropdown_open:
@@ -1423,7 +1163,10 @@ def create_enhanced_dropdown_with_improved_click(parent, field_name: str, initia
         values = []
 
     if initial_value and initial_value not in values:
-        values = [initial_value] + values
+        if isinstance(values, ValueIndex):
+            values = values.with_value(initial_value)
+        else:
+            values = [initial_value] + values
 
     # إنشاء المكون
     combo = EnhancedSearchableComboBox(
@@ -1433,7 +1176,8 @@ def create_enhanced_dropdown_with_improved_click(parent, field_name: str, initia
         width=300,
         height=35,
         max_results=15,
-        debug_mode=debug_mode
+        debug_mode=debug_mode,
+        usage_key=field_name
     )
 
     # تطبيق الثيم
@@ -1510,6 +1254,7 @@ def create_airtable_combo_for_field(parent, field_name: str, dropdown_manager=No
 
     kwargs.setdefault('max_results', 15)
     kwargs.setdefault('debug_mode', debug_mode)
+    kwargs.setdefault('usage_key', field_name)
 
     if values:
         kwargs['values'] = values
@@ -1609,15 +1354,11 @@ def test_natural_scroll_navigation():
             log_scroll("🔄⬇️ تمرير دائري للأسفل")
             super()._scroll_to_bottom_smooth()
 
-        def _smart_scroll_down(self, canvas, index, item_height, total_height, canvas_height):
-            """تمرير ذكي مع تسجيل"""
-            log_scroll(f"⬇️ تمرير عادي للعنصر {index}")
-            super()._smart_scroll_down(canvas, index, item_height, total_height, canvas_height)
-
-        def _smart_scroll_up(self, canvas, index, item_height, total_height, canvas_height):
-            """تمرير ذكي مع تسجيل"""
-            log_scroll(f"⬆️ تمرير عادي للعنصر {index}")
-            super()._smart_scroll_up(canvas, index, item_height, total_height, canvas_height)
+        def _scroll_to_option_smooth(self, index: int, direction: str = "auto"):
+            """تمرير مع تسجيل"""
+            arrow = "⬇️" if direction == "down" else "⬆️"
+            log_scroll(f"{arrow} تمرير عادي للعنصر {index}")
+            super()._scroll_to_option_smooth(index, direction)
 
     # إنشاء ComboBox محسن
     combo_frame = ctk.CTkFrame(app)
@@ -1732,13 +1473,13 @@ def test_natural_scroll_navigation():
 
     def open_and_select_first():
         combo._open_dropdown()
-        if combo.option_buttons:
+        if combo.filtered_values:
             combo._highlight_option(0)
 
     def open_and_select_last():
         combo._open_dropdown()
-        if combo.option_buttons:
-            last_index = len(combo.option_buttons) - 1
+        if combo.filtered_values:
+            last_index = len(combo.filtered_values) - 1
             combo._highlight_option(last_index)
             combo._scroll_to_bottom_smooth()
 
@@ -1746,8 +1487,8 @@ def test_natural_scroll_navigation():
         """اختبار التنقل الدائري لأسفل"""
         if not combo.is_dropdown_open:
             combo._open_dropdown()
-        if combo.option_buttons:
-            last_index = len(combo.option_buttons) - 1
+        if combo.filtered_values:
+            last_index = len(combo.filtered_values) - 1
             combo._highlight_option(last_index)
             combo._scroll_to_bottom_smooth()
             combo.after(1000, lambda: combo._handle_arrow_down_enhanced())
@@ -1756,7 +1497,7 @@ def test_natural_scroll_navigation():
         """اختبار التنقل الدائري لأعلى"""
         if not combo.is_dropdown_open:
             combo._open_dropdown()
-        if combo.option_buttons:
+        if combo.filtered_values:
             combo._highlight_option(0)
             combo._scroll_to_top_smooth()
             combo.after(1000, lambda: combo._handle_arrow_up_enhanced())
@@ -1840,7 +1581,7 @@ if __name__ == "__main__":
 # 🌊 تحسين التمرير الطبيعي:
 #   1. _scroll_to_option() الآن ذكي - يفحص الرؤية أولاً
 #   2. تمرير تدريجي بدلاً من القفز المباشر
-#   3. _smart_scroll_down() و _smart_scroll_up() للتمرير الطبيعي
+#   3. القائمة الافتراضية (VirtualListView) ترسم الصفوف الظاهرة فقط وتعيد استخدامها
 #   4. _scroll_to_top_smooth() و _scroll_to_bottom_smooth() للتنقل الدائري
 #   5. التمرير يحدث فقط عند الحاجة (وصول لحافة القائمة)
 #
@@ -3,15 +3,91 @@
 views/components/data_table.py
 
 مكون جدول البيانات المحسن لعرض السجلات مع تصميم احترافي
+
+القوائم الكبيرة (أكثر من virtual_threshold سجل) تُعرض بالتمرير الافتراضي:
+الجدول يحتوي صفوف المنطقة الظاهرة فقط (مع صفوف إضافية قليلة)، ويُعاد استخدامها
+عند التمرير بتغيير قيمها؛ موضع شريط التمرير يحدد رقم أول سجل ظاهر. كلفة التمرير
+والتحديث تعتمد على ارتفاع الجدول وليس عدد السجلات. التحديد يُحفظ بمعرف السجل
+فيبقى صحيحاً بعد تمرير الصفوف خارج المنطقة الظاهرة.
+
+إعادة العرض (التحديث أو البحث) تقارن القائمة الجديدة بآخر عرض بمعرف السجل في
+Airtable: تُحذف وتُضاف وتُحدث وتُنقل الصفوف المتغيرة فقط (أقل عدد نقل عبر أطول
+تسلسل متزايد)، ويبقى التحديد وموضع التمرير. الإدراج والتحديث يتم على دفعات
+عبر after_idle بزمن محدد لكل دفعة (RENDER_BUDGET_MS) فتبقى الواجهة مستجيبة، مع
+تقدم العرض عبر on_render_progress، والعرض الجديد يلغي أي دفعات متبقية من السابق.
+
+الترتيب بالنقر على رأس العمود (Shift+نقر يضيف عموداً للترتيب المتعدد): مفاتيح
+الترتيب حسب نوع العمود (تاريخ، دقائق، أرقام، نص موحد) تُحسب مرة لكل قائمة
+سجلات مع ترتيب كل عمود، والترتيب التنازلي يُشتق منه في O(n)؛ الترتيب ثابت
+(stable) والقيم الفارغة في النهاية دائماً.
 """
 
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import ttk
-from typing import Callable, List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import bisect
+import re
+import time
 
 from core.language_manager import LanguageManager
+from core.text_normalize import search_key
+
+ROW_HEIGHT = 35  # ارتفاع الصف في نمط Treeview
+HEADING_HEIGHT = 30  # تقدير ارتفاع رأس الجدول قبل رسم أول صف
+VIRTUAL_THRESHOLD = 1000  # أقل عدد سجلات يُفعّل التمرير الافتراضي
+OVERSCAN_ROWS = 2  # صفوف إضافية بعد المنطقة الظاهرة (الصف الجزئي الأخير)
+WHEEL_ROWS = 3  # عدد الصفوف لكل خطوة من عجلة الماوس
+RENDER_BUDGET_MS = 12  # زمن كل دفعة من تحديث الصفوف قبل إعادة التحكم لحلقة الأحداث
+
+
+# =============== مفاتيح الترتيب (None = قيمة فارغة) ===============
+
+def _text_sort_key(value):
+    return search_key(str(value)) if value not in (None, '') else None
+
+
+def _natural_sort_key(value):
+    """رقم الحجز بترتيب طبيعي: B-9 قبل B-10"""
+    if value in (None, ''):
+        return None
+    return tuple(int(part) if i % 2 else part.casefold() for i, part in enumerate(re.split(r'(\d+)', str(value))))
+
+
+def _date_sort_key(value):
+    try:
+        return datetime.fromisoformat(str(value)[:10]).toordinal() if value else None
+    except ValueError:
+        return None
+
+
+def _time_sort_key(value):
+    """وقت الاستلام بالدقائق من منتصف الليل"""
+    try:
+        parts = str(value).split(":")
+        return int(parts[0]) * 60 + (int(parts[1][:2]) if len(parts) > 1 else 0) if value else None
+    except ValueError:
+        return None
+
+
+def _number_sort_key(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+# العمود -> (حقل Airtable، دالة مفتاح الترتيب)
+SORT_KEYS = {
+    "booking_nr": ("Booking Nr.", _natural_sort_key),
+    "date_trip": ("Date Trip", _date_sort_key),
+    "customer_name": ("Customer Name", _text_sort_key),
+    "hotel_name": ("Hotel Name", _text_sort_key),
+    "pickup_time": ("pickup time", _time_sort_key),
+    "price": ("Net Rate", _number_sort_key),
+    "status": ("Booking Status", _text_sort_key),
+}
 
 
 class DataTableComponent(ctk.CTkFrame):
@@ -23,6 +99,9 @@ class DataTableComponent(ctk.CTkFrame):
         lang_manager: LanguageManager,
         on_row_double_click: Callable = None,
         on_selection_change: Callable = None,
+        virtual_threshold: int = VIRTUAL_THRESHOLD,
+        on_render_progress: Callable = None,
+        on_sort_change: Callable = None,
         **kwargs
     ):
         # تطبيق إعدادات احترافية للإطار
@@ -33,10 +112,43 @@ class DataTableComponent(ctk.CTkFrame):
         self.lang_manager = lang_manager
         self.on_row_double_click = on_row_double_click
         self.on_selection_change = on_selection_change
+        self.on_render_progress = on_render_progress  # (الصفوف المنجزة، الإجمالي) عند العرض على دفعات
+        self.on_sort_change = on_sort_change  # (العمود الأساسي، "asc"/"desc") عند تغيير الترتيب
 
         self.selected_records = []
         self.all_records = []
 
+        # التمرير الافتراضي
+        self.virtual_threshold = virtual_threshold
+        self._virtual = False
+        self._first = 0  # رقم أول سجل ظاهر
+        self._visible_rows = 15
+        self._window_items: List[str] = []  # صفوف الجدول المعاد استخدامها بالترتيب
+        self._selected_keys = set()  # معرفات السجلات المحددة
+        self._key_positions: Optional[Dict[str, int]] = None
+        self._focus_index = -1
+        self._click_resets_selection = False
+
+        # آخر عرض (للمقارنة عند إعادة العرض)
+        self._keys: List[str] = []  # معرف كل سجل بترتيب all_records
+        self._rendered_order: List[str] = []  # صفوف الجدول بترتيبها (غير الافتراضي)
+        self._rendered: Dict[str, tuple] = {}  # معرف -> مدخلات تنسيق الصف المعروض
+        self._format_version = 0  # يزيد عند تغيير اللغة فيُعاد تنسيق كل الصفوف
+
+        # العرض على دفعات
+        self._render_job = None
+        self._render_next = 0  # موضع السجل التالي في العرض الجاري
+        self._render_moved = set()  # صفوف مفصولة تنتظر إعادة إدراجها
+        self._render_top: Optional[int] = None
+        self._render_reported = False
+
+        # الترتيب: all_records هي source_records بعد الترتيب
+        self._source_records: List[Dict[str, Any]] = []
+        self._sort_spec: List[Tuple[str, bool]] = []  # (العمود، تنازلي) بالأولوية
+        self._column_orders: Dict[str, tuple] = {}  # العمود -> (المواقع مرتبة تصاعدياً، الفارغة، الرتب)
+        self._sorted_permutations: Dict[tuple, List[int]] = {}
+        self._extend_sort = False
+
         self._build_ui()
         self._apply_professional_style()
 
@@ -99,6 +211,14 @@ class DataTableComponent(ctk.CTkFrame):
         self.tree.bind("<Double-1>", self._on_double_click)
         self.tree.bind("<<TreeviewSelect>>", self._on_selection_change)
         self.tree.bind("<Button-3>", self._on_right_click)  # قائمة سياق
+        self.tree.bind("<ButtonPress-1>", self._on_left_press, add="+")
+        self.tree.bind("<Configure>", self._on_tree_configure, add="+")
+        self.tree.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.tree.bind("<Button-4>", lambda e: self._on_mouse_wheel(e, -1))
+        self.tree.bind("<Button-5>", lambda e: self._on_mouse_wheel(e, 1))
+        for sequence, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                               ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(sequence, lambda e, s=step: self._on_navigate_key(e, s))
 
         # وضع الجدول
         self.tree.grid(row=0, column=0, sticky="nsew")
@@ -145,7 +265,7 @@ class DataTableComponent(ctk.CTkFrame):
             "Treeview",
             background=bg_color,
             foreground=fg_color,
-            rowheight=35,
+            rowheight=ROW_HEIGHT,
             fieldbackground=bg_color,
             borderwidth=0,
             relief="flat",
@@ -201,14 +321,14 @@ class DataTableComponent(ctk.CTkFrame):
         vsb_frame = ctk.CTkFrame(parent, width=16, fg_color="transparent")
         vsb_frame.grid(row=0, column=1, sticky="ns", padx=(2, 0))
 
-        vsb = ttk.Scrollbar(
+        self._vsb = ttk.Scrollbar(
             vsb_frame,
             orient="vertical",
-            command=self.tree.yview,
+            command=self._yview,
             style="Vertical.TScrollbar"
         )
-        vsb.pack(fill="y", expand=True)
-        self.tree.configure(yscrollcommand=vsb.set)
+        self._vsb.pack(fill="y", expand=True)
+        self.tree.configure(yscrollcommand=self._on_tree_yscroll)
 
         # شريط تمرير أفقي محسن
         hsb_frame = ctk.CTkFrame(parent, height=16, fg_color="transparent")
@@ -286,56 +406,476 @@ class DataTableComponent(ctk.CTkFrame):
         )
 
     def display_data(self, records: List[Dict[str, Any]]):
-        """عرض البيانات في الجدول مع تحسينات بصرية"""
-        # حفظ السجلات
-        self.all_records = records
-
-        # مسح الجدول
+        """عرض البيانات في الجدول مع تحسينات بصرية (بتطبيق الفرق عن العرض السابق فقط)"""
+        # قائمة جديدة: مفاتيح الترتيب المحسوبة للقائمة السابقة لم تعد صالحة
+        self._source_records = records
+        self._column_orders.clear()
+        self._sorted_permutations.clear()
+        self._show_records(self._sorted_records())
+
+    def _show_records(self, records: List[Dict[str, Any]], keep_position: bool = True):
+        """عرض السجلات بترتيبها مع الحفاظ على التحديد (وموضع التمرير إذا keep_position)"""
         if not hasattr(self, 'tree') or not self.tree.winfo_exists():
+            self.all_records = records
             return
-        for item in self.tree.get_children():
-            self.tree.delete(item)
 
-        # إضافة السجلات مع تحسينات
+        # العرض الجديد يحل محل أي عرض جارٍ
+        self._cancel_render()
+
+        # موضع التمرير والتحديد بمعرفات السجلات قبل التغيير
+        anchor_key = self._top_visible_key() if keep_position else None
+        focus_key = self._keys[self._focus_index] if 0 <= self._focus_index < len(self._keys) else None
+        previous_selection = set(self._selected_keys)
+
+        was_virtual = self._virtual
+        self.all_records = records
+        self._keys = self._keys_for(records)
+        self._key_positions = None
+        self._virtual = len(records) > self.virtual_threshold
+        self._click_resets_selection = False
+
+        positions = self._key_positions_map()
+        self._selected_keys &= positions.keys()
+        self._focus_index = positions.get(focus_key, -1)
+
+        if self._virtual:
+            # الصفوف الحالية تُعاد استخدامها؛ تُنسق الصفوف الظاهرة فقط
+            if not was_virtual:
+                self._clear_items()
+            self._first = positions.get(anchor_key, 0)
+            self._render_window()
+        else:
+            if was_virtual:
+                self._clear_items()
+            # السجل الذي كان أعلى المنطقة الظاهرة يبقى أعلاها، وإلا العودة للبداية
+            self._apply_diff(top=positions.get(anchor_key, 0))
+
+        # تطبيق ألوان الحالات المحسنة
+        self._apply_status_colors()
+
+        # السجلات المحددة قد تكون نسخاً جديدة بعد التحديث
+        if self._selected_keys or previous_selection:
+            self._notify_selection()
+
+    def _keys_for(self, records: List[Dict[str, Any]]) -> List[str]:
+        """معرفات فريدة للسجلات (المعرف المكرر يُميز بموضعه)"""
+        keys = []
+        seen = set()
         for idx, record in enumerate(records):
-            fields = record.get('fields', {})
+            key = self._record_key(record, idx)
+            if key in seen:
+                key = f"{key}#{idx}"
+            seen.add(key)
+            keys.append(key)
+        return keys
+
+    def _top_visible_key(self) -> Optional[str]:
+        """معرف أول سجل ظاهر في الجدول"""
+        if self._virtual:
+            return self._keys[self._first] if self._first < len(self._keys) else None
+        if not self._rendered_order:
+            return None
+        top = int(round(self.tree.yview()[0] * len(self._rendered_order)))
+        return self._rendered_order[min(top, len(self._rendered_order) - 1)]
+
+    def _apply_diff(self, top: Optional[int] = None):
+        """
+        تطبيق الفرق بين العرض السابق وall_records على صفوف الجدول (معرف الصف = معرف السجل):
+        حذف المفقود، ثم فصل الصفوف المنقولة فقط وإعادة إدراجها في مواضعها، مع إضافة
+        الجديد وتحديث الصفوف التي تغيرت حقولها أو لون تناوبها (على دفعات).
+        :param top: موضع السجل الذي يُعرض أعلى الجدول بعد الانتهاء
+        """
+        self._cancel_render()
+        tree = self.tree
+        positions = self._key_positions_map()
+        rendered = self._rendered
+
+        removed = [key for key in self._rendered_order if key not in positions]
+        if removed:
+            tree.delete(*removed)
+            for key in removed:
+                del rendered[key]
+
+        # الصفوف الباقية في أطول تسلسل بترتيبها القديم لا تُنقل
+        old_positions = {key: position for position, key in enumerate(self._rendered_order) if key in rendered}
+        kept = [key for key in self._keys if key in old_positions]
+        stable = self._longest_increasing(kept, old_positions)
+        moved = {key for key in kept if key not in stable}
+        if moved:
+            tree.detach(*moved)
+
+        self._render_next = 0
+        self._render_moved = moved
+        self._render_top = top
+        self._render_reported = False
+        self._continue_render()
+
+    def _continue_render(self):
+        """دفعة من العرض الجاري حتى انتهاء زمنها، ثم جدولة الباقي عند خمول الواجهة"""
+        self._render_job = None
+        try:
+            if not self.tree.winfo_exists():
+                return
+        except tk.TclError:
+            return
 
-            # تحضير البيانات
-            values = (
-                fields.get('Booking Nr.', ''),
-                self._format_date(fields.get('Date Trip', '')),
-                fields.get('Customer Name', ''),
-                fields.get('Hotel Name', ''),
-                self._format_time(fields.get('pickup time', '')),
-                self._format_currency(fields.get('Net Rate', 0)),
-                self._translate_status(fields.get('Booking Status', ''))
-            )
+        tree = self.tree
+        rendered = self._rendered
+        moved = self._render_moved
+        keys = self._keys
+        records = self.all_records
+        total = len(keys)
+        deadline = time.perf_counter() + RENDER_BUDGET_MS / 1000
+
+        idx = self._render_next
+        while idx < total:
+            key = keys[idx]
+            record = records[idx]
+            fields = record.get('fields', {})
+            signature = (fields, idx % 2, self._format_version)
+            previous = rendered.get(key)
+            if previous is None:
+                values, tags = self._row_values(record, idx)
+                tree.insert("", idx, iid=key, values=values, tags=tags)
+            else:
+                if key in moved:
+                    tree.move(key, "", idx)
+                    moved.discard(key)
+                if previous != signature:
+                    values, tags = self._row_values(record, idx)
+                    tree.item(key, values=values, tags=tags)
+            # نسخة من الحقول: السجل نفسه قد يُعدل لاحقاً في مكانه
+            rendered[key] = (dict(fields), idx % 2, self._format_version)
+            idx += 1
+            if time.perf_counter() >= deadline:
+                break
+        self._render_next = idx
+
+        if idx < total:
+            self._render_reported = True
+            if self.on_render_progress:
+                self.on_render_progress(idx, total)
+            self._render_job = self.after_idle(self._continue_render)
+            return
 
-            # تحديد التاجات
-            tags = []
+        self._rendered_order = list(keys)
+        tree.selection_set([key for key in keys if key in self._selected_keys])
+        if self._render_top is not None:
+            tree.yview_moveto(self._render_top / total if total else 0)
+        if self._render_reported and self.on_render_progress:
+            self.on_render_progress(total, total)
 
-            # تاج الصف (زوجي/فردي)
-            if idx % 2 == 0:
-                tags.append('evenrow')
+    def _cancel_render(self):
+        """إيقاف العرض الجاري وإرجاع سجل الصفوف المعروضة لحالة الجدول الفعلية"""
+        if self._render_job is None:
+            return
+        try:
+            self.after_cancel(self._render_job)
+        except (tk.TclError, ValueError):
+            pass
+        self._render_job = None
+
+        # الصفوف المفصولة التي لم يُعد إدراجها تُحذف؛ الباقي كما هو معروض الآن
+        if self._render_moved:
+            self.tree.delete(*self._render_moved)
+            for key in self._render_moved:
+                self._rendered.pop(key, None)
+            self._render_moved = set()
+        self._rendered_order = list(self.tree.get_children())
+        if self._render_reported and self.on_render_progress:
+            self.on_render_progress(len(self._keys), len(self._keys))
+
+    @staticmethod
+    def _longest_increasing(keys: List[str], old_positions: Dict[str, int]) -> set:
+        """المعرفات التي تشكل أطول تسلسل متزايد بمواضعها القديمة - O(n log n)"""
+        tails: List[int] = []  # أصغر نهاية لكل طول
+        tail_index: List[int] = []
+        parents = [-1] * len(keys)
+        for i, key in enumerate(keys):
+            position = old_positions[key]
+            length = bisect.bisect_left(tails, position)
+            if length == len(tails):
+                tails.append(position)
+                tail_index.append(i)
             else:
-                tags.append('oddrow')
-
-            # تاج الحالة
-            status = fields.get('Booking Status', '').lower()
-            if status == 'confirmed':
-                tags.append('confirmed')
-            elif status == 'pending':
-                tags.append('pending')
-            elif status == 'cancelled':
-                tags.append('cancelled')
-            elif status == 'completed':
-                tags.append('completed')
-
-            # إضافة الصف
-            item = self.tree.insert("", "end", values=values, tags=tags)
+                tails[length] = position
+                tail_index[length] = i
+            parents[i] = tail_index[length - 1] if length else -1
+
+        stable = set()
+        i = tail_index[-1] if tail_index else -1
+        while i >= 0:
+            stable.add(keys[i])
+            i = parents[i]
+        return stable
+
+    def _clear_items(self):
+        """حذف كل صفوف الجدول"""
+        self._cancel_render()
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._window_items = []
+        self._rendered_order = []
+        self._rendered = {}
+
+    def _row_values(self, record: Dict[str, Any], idx: int) -> Tuple[tuple, List[str]]:
+        """قيم الصف المنسقة وتاجاته لسجل في الموضع idx"""
+        fields = record.get('fields', {})
+
+        # تحضير البيانات
+        values = (
+            fields.get('Booking Nr.', ''),
+            self._format_date(fields.get('Date Trip', '')),
+            fields.get('Customer Name', ''),
+            fields.get('Hotel Name', ''),
+            self._format_time(fields.get('pickup time', '')),
+            self._format_currency(fields.get('Net Rate', 0)),
+            self._translate_status(fields.get('Booking Status', ''))
+        )
 
-        # تطبيق ألوان الحالات المحسنة
-        self._apply_status_colors()
+        # تحديد التاجات
+        tags = []
+
+        # تاج الصف (زوجي/فردي)
+        if idx % 2 == 0:
+            tags.append('evenrow')
+        else:
+            tags.append('oddrow')
+
+        # تاج الحالة
+        status = fields.get('Booking Status', '').lower()
+        if status == 'confirmed':
+            tags.append('confirmed')
+        elif status == 'pending':
+            tags.append('pending')
+        elif status == 'cancelled':
+            tags.append('cancelled')
+        elif status == 'completed':
+            tags.append('completed')
+
+        return values, tags
+
+    # =============== التمرير الافتراضي ===============
+
+    @staticmethod
+    def _record_key(record: Dict[str, Any], idx: int) -> str:
+        """معرف السجل في Airtable (أو موضعه إن لم يوجد)"""
+        return record.get('id') or f"#{idx}"
+
+    def _render_window(self):
+        """ربط صفوف الجدول بالسجلات الظاهرة حسب موضع التمرير"""
+        tree = self.tree
+        self._first = first = max(0, min(self._first, self._max_first()))
+        count = max(0, min(self._visible_rows + OVERSCAN_ROWS, len(self.all_records) - first))
+
+        items = self._window_items
+        while len(items) < count:
+            items.append(tree.insert("", "end"))
+        if len(items) > count:
+            tree.delete(*items[count:])
+            del items[count:]
+
+        selected = []
+        for offset, item in enumerate(items):
+            idx = first + offset
+            values, tags = self._row_values(self.all_records[idx], idx)
+            tree.item(item, values=values, tags=tags)
+            if self._keys[idx] in self._selected_keys:
+                selected.append(item)
+
+        tree.selection_set(selected)
+        if first <= self._focus_index < first + count:
+            tree.focus(items[self._focus_index - first])
+        tree.yview_moveto(0)
+        self._update_scrollbar()
+
+    def _max_first(self) -> int:
+        return max(0, len(self.all_records) - self._visible_rows)
+
+    def _scroll_to(self, first: int):
+        first = max(0, min(int(first), self._max_first()))
+        if first != self._first:
+            self._first = first
+            self._render_window()
+
+    def _update_scrollbar(self):
+        total = len(self.all_records)
+        if total:
+            self._vsb.set(self._first / total, min(1.0, (self._first + self._visible_rows) / total))
+        else:
+            self._vsb.set(0.0, 1.0)
+
+    def _yview(self, *args):
+        """أوامر شريط التمرير: على السجلات في الوضع الافتراضي، وإلا على الجدول مباشرة"""
+        if not self._virtual:
+            return self.tree.yview(*args)
+        if args[0] == 'moveto':
+            self._scroll_to(round(float(args[1]) * len(self.all_records)))
+        elif args[0] == 'scroll':
+            step = max(1, self._visible_rows - 1) if args[2] == 'pages' else 1
+            self._scroll_to(self._first + int(args[1]) * step)
+
+    def _on_tree_yscroll(self, first, last):
+        # في الوضع الافتراضي موضع الشريط يُحسب من رقم أول سجل وليس من صفوف الجدول
+        if not self._virtual:
+            self._vsb.set(first, last)
+
+    def _on_tree_configure(self, event):
+        """إعادة حساب عدد الصفوف الظاهرة عند تغيير ارتفاع الجدول"""
+        heading = HEADING_HEIGHT
+        if self._window_items:
+            bbox = self.tree.bbox(self._window_items[0])
+            if bbox:
+                heading = bbox[1]
+        rows = max(1, (event.height - heading) // ROW_HEIGHT)
+        if rows != self._visible_rows:
+            self._visible_rows = rows
+            if self._virtual:
+                self._render_window()
+
+    def _on_mouse_wheel(self, event, direction: int = 0):
+        if not self._virtual:
+            return None
+        if not direction and event.delta:
+            # ويندوز: 120 لكل خطوة، ماك: قيم صغيرة
+            steps = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+            direction = -steps
+        self._scroll_to(self._first + direction * WHEEL_ROWS)
+        return "break"
+
+    def _on_navigate_key(self, event, step):
+        """التنقل بلوحة المفاتيح على مستوى السجلات (Shift يوسع التحديد)"""
+        if not self._virtual or not self.all_records:
+            return None
+
+        last = len(self.all_records) - 1
+        current = self._focus_index if self._focus_index >= 0 else self._first
+        page = max(1, self._visible_rows - 1)
+        target = {"home": 0, "end": last, "page": current + page, "-page": current - page}.get(step)
+        if target is None:
+            target = current + step
+        target = max(0, min(target, last))
+
+        if not event.state & 0x0001:
+            self._selected_keys.clear()
+        self._selected_keys.add(self._keys[target])
+        self._focus_index = target
+
+        if target < self._first:
+            self._first = target
+        elif target >= self._first + self._visible_rows:
+            self._first = target - self._visible_rows + 1
+        self._render_window()
+        self._notify_selection()
+        return "break"
+
+    def _on_left_press(self, event):
+        # النقر على صف بدون Ctrl أو Shift يستبدل التحديد كله، بما فيه السجلات خارج المنطقة الظاهرة
+        region = self.tree.identify_region(event.x, event.y)
+        self._click_resets_selection = not event.state & 0x0005 and region in ("cell", "tree")
+        # Shift+نقر على رأس عمود يضيفه للترتيب المتعدد
+        self._extend_sort = bool(event.state & 0x0001) and region == "heading"
+
+    def _key_positions_map(self) -> Dict[str, int]:
+        """معرف السجل -> موضعه (يُبنى عند الحاجة مرة لكل قائمة)"""
+        if self._key_positions is None:
+            self._key_positions = {key: idx for idx, key in enumerate(self._keys)}
+        return self._key_positions
+
+    def _record_index(self, item) -> int:
+        """موضع سجل صف الجدول في all_records"""
+        if self._virtual:
+            try:
+                return self._first + self._window_items.index(item)
+            except ValueError:
+                return -1
+        return self._key_positions_map().get(item, -1)
+
+    def _record_at(self, item) -> Optional[Dict[str, Any]]:
+        idx = self._record_index(item)
+        return self.all_records[idx] if 0 <= idx < len(self.all_records) else None
+
+    def _notify_selection(self):
+        positions = self._key_positions_map()
+        indexes = sorted(positions[key] for key in self._selected_keys if key in positions)
+        self.selected_records = [self.all_records[idx] for idx in indexes]
+        if self.on_selection_change:
+            self.on_selection_change(self.selected_records)
+
+    # =============== الترتيب ===============
+
+    def _column_order(self, column: str) -> tuple:
+        """
+        ترتيب العمود (يُحسب مرة لكل قائمة سجلات):
+        (مواقع القيم غير الفارغة تصاعدياً، مواقع الفارغة، رتبة كل موقع - المتساوية نفس الرتبة)
+        """
+        order = self._column_orders.get(column)
+        if order is None:
+            field, key_func = SORT_KEYS[column]
+            keys = [key_func(record.get('fields', {}).get(field)) for record in self._source_records]
+            present = sorted((i for i, key in enumerate(keys) if key is not None), key=keys.__getitem__)
+            missing = [i for i, key in enumerate(keys) if key is None]
+
+            # الفارغة رتبتها أكبر من أي قيمة
+            ranks = [len(keys)] * len(keys)
+            rank = -1
+            previous = object()
+            for i in present:
+                if keys[i] != previous:
+                    rank += 1
+                    previous = keys[i]
+                ranks[i] = rank
+            order = self._column_orders[column] = (present, missing, ranks)
+        return order
+
+    def _sort_permutation(self) -> Optional[List[int]]:
+        """مواقع السجلات بالترتيب الحالي (مخزنة لكل ترتيب حتى تتغير القائمة)"""
+        spec = tuple(self._sort_spec)
+        if not spec:
+            return None
+        permutation = self._sorted_permutations.get(spec)
+        if permutation is None:
+            if len(spec) == 1:
+                column, descending = spec[0]
+                present, missing, ranks = self._column_order(column)
+                permutation = (self._reverse_runs(present, ranks) if descending else present) + missing
+            else:
+                # ترتيب متعدد بالرتب الرقمية (أسرع مقارنة من القيم)؛ sorted ثابت فالمتساوي يبقى بترتيبه
+                total = len(self._source_records)
+                columns = [(self._column_order(column)[2], descending) for column, descending in spec]
+
+                def sort_key(i):
+                    return tuple(-ranks[i] if descending and ranks[i] < total else ranks[i]
+                                 for ranks, descending in columns)
+
+                permutation = sorted(range(total), key=sort_key)
+            self._sorted_permutations[spec] = permutation
+        return permutation
+
+    @staticmethod
+    def _reverse_runs(present: List[int], ranks: List[int]) -> List[int]:
+        """الترتيب التنازلي من التصاعدي في O(n): عكس مجموعات القيم المتساوية مع بقاء ترتيبها الداخلي"""
+        runs = []
+        start = 0
+        for end in range(1, len(present) + 1):
+            if end == len(present) or ranks[present[end]] != ranks[present[start]]:
+                runs.append(present[start:end])
+                start = end
+        return [i for run in reversed(runs) for i in run]
+
+    def _sorted_records(self) -> List[Dict[str, Any]]:
+        permutation = self._sort_permutation()
+        if permutation is None:
+            return self._source_records
+        return [self._source_records[i] for i in permutation]
+
+    def set_sort(self, column: Optional[str], order: str = "asc"):
+        """تعيين الترتيب برمجياً (مثلاً من WindowState)؛ None لإلغاء الترتيب"""
+        self._sort_spec = [(column, order == "desc")] if column in SORT_KEYS else []
+        self._update_column_headers()
+        if self._source_records:
+            self._show_records(self._sorted_records(), keep_position=False)
 
     def _apply_status_colors(self):
         """تطبيق ألوان احترافية للحالات"""
@@ -465,11 +1005,9 @@ class DataTableComponent(ctk.CTkFrame):
 
     def _context_edit(self, item):
         """تعديل من القائمة السياقية"""
-        index = self.tree.index(item)
-        if 0 <= index < len(self.all_records):
-            record = self.all_records[index]
-            if self.on_row_double_click:
-                self.on_row_double_click(record)
+        record = self._record_at(item)
+        if record is not None and self.on_row_double_click:
+            self.on_row_double_click(record)
 
     def _context_copy(self, item):
         """نسخ من القائمة السياقية"""
@@ -485,9 +1023,30 @@ class DataTableComponent(ctk.CTkFrame):
         pass
 
     def _sort_by_column(self, column):
-        """ترتيب حسب العمود مع مؤشر بصري"""
-        # TODO: تنفيذ الترتيب مع إضافة سهم للإشارة لاتجاه الترتيب
-        pass
+        """ترتيب حسب العمود مع مؤشر بصري (Shift+نقر يضيف العمود أو يعكس اتجاهه في الترتيب المتعدد)"""
+        if column not in SORT_KEYS:
+            return
+        spec = list(self._sort_spec)
+        columns = [name for name, _ in spec]
+        if self._extend_sort and spec:
+            if column in columns:
+                position = columns.index(column)
+                spec[position] = (column, not spec[position][1])
+            else:
+                spec.append((column, False))
+        elif columns == [column]:
+            spec = [(column, not spec[0][1])]
+        else:
+            spec = [(column, False)]
+        self._extend_sort = False
+
+        self._sort_spec = spec
+        self._update_column_headers()
+        self._show_records(self._sorted_records(), keep_position=False)
+
+        if self.on_sort_change:
+            primary, descending = spec[0]
+            self.on_sort_change(primary, "desc" if descending else "asc")
 
     def _apply_professional_style(self):
         """تطبيق تحسينات إضافية للمظهر الاحترافي"""
@@ -503,31 +1062,57 @@ class DataTableComponent(ctk.CTkFrame):
         """معالج النقر المزدوج المحسن"""
         selection = self.tree.selection()
         if selection and self.on_row_double_click:
-            item = selection[0]
-            index = self.tree.index(item)
-            if 0 <= index < len(self.all_records):
-                record = self.all_records[index]
+            record = self._record_at(selection[0])
+            if record is not None:
                 self.on_row_double_click(record)
 
     def _on_selection_change(self, event):
         """معالج تغيير التحديد المحسن"""
         selection = self.tree.selection()
-        self.selected_records = []
 
-        for item in selection:
-            index = self.tree.index(item)
-            if 0 <= index < len(self.all_records):
-                self.selected_records.append(self.all_records[index])
+        if self._virtual:
+            # مزامنة معرفات السجلات المحددة مع الصفوف الظاهرة فقط
+            previous = set(self._selected_keys)
+            if self._click_resets_selection:
+                self._selected_keys.clear()
+                self._click_resets_selection = False
+            selected_items = set(selection)
+            for offset, item in enumerate(self._window_items):
+                key = self._keys[self._first + offset]
+                if item in selected_items:
+                    self._selected_keys.add(key)
+                else:
+                    self._selected_keys.discard(key)
+            focus = self.tree.focus()
+            if focus in self._window_items:
+                self._focus_index = self._first + self._window_items.index(focus)
+            # إعادة ربط الصفوف عند التمرير لا تغير التحديد الفعلي
+            if self._selected_keys != previous:
+                self._notify_selection()
+            return
 
-        if self.on_selection_change:
-            self.on_selection_change(self.selected_records)
+        # معرف الصف هو معرف السجل
+        selected_keys = set(selection)
+        if selected_keys != self._selected_keys:
+            self._selected_keys = selected_keys
+            self._notify_selection()
 
     def get_selected_records(self):
         """الحصول على السجلات المحددة"""
         return self.selected_records
 
+    def select_all(self):
+        """تحديد كل السجلات (بما فيها غير الظاهرة في الوضع الافتراضي)"""
+        self._selected_keys = set(self._keys)
+        if self._virtual:
+            self._render_window()
+        else:
+            self.tree.selection_set(self.tree.get_children())
+        self.selected_records = list(self.all_records)
+
     def clear_selection(self):
         """مسح التحديد"""
+        self._selected_keys.clear()
         self.tree.selection_remove(self.tree.selection())
         self.selected_records = []
 
@@ -538,9 +1123,12 @@ class DataTableComponent(ctk.CTkFrame):
         # تحديث عناوين الأعمدة
         self._update_column_headers()
 
-        # إعادة عرض البيانات لتحديث الترجمات
-        if self.all_records:
-            self.display_data(self.all_records)
+        # إعادة تنسيق الصفوف لتحديث الترجمات
+        self._format_version += 1
+        if self._virtual:
+            self._render_window()
+        elif self.all_records:
+            self._apply_diff()
 
     def _update_column_headers(self):
         """تحديث عناوين الأعمدة بناءً على اللغة الحالية"""
@@ -561,6 +1149,12 @@ class DataTableComponent(ctk.CTkFrame):
         # الحصول على اللغة الحالية
         current_lang = self.lang_manager.current_lang if self.lang_manager else "ar"
 
+        # مؤشر الترتيب: السهم، ورقم الأولوية في الترتيب المتعدد
+        sort_marks = {
+            column: ("▼" if descending else "▲") + (str(position + 1) if len(self._sort_spec) > 1 else "")
+            for position, (column, descending) in enumerate(self._sort_spec)
+        }
+
         # تحديث عناوين الأعمدة
         columns = self.tree["columns"]
         for i, (trans_key, en_name, ar_name) in enumerate(columns_map):
@@ -572,7 +1166,8 @@ class DataTableComponent(ctk.CTkFrame):
                     translated_text = en_name if current_lang == "en" else ar_name
 
                 # تحديث عنوان العمود
-                self.tree.heading(columns[i], text=translated_text)
+                mark = sort_marks.get(columns[i])
+                self.tree.heading(columns[i], text=f"{translated_text} {mark}" if mark else translated_text)
 
     def set_loading(self, is_loading: bool):
         """عرض حالة التحميل"""
@@ -597,18 +1192,14 @@ class DataTableComponent(ctk.CTkFrame):
         # تحديث إطار الجدول
         self.configure(fg_color=("#ffffff", "#2b2b2b"))
 
-        # إعادة عرض البيانات لتطبيق الألوان الجديدة
-        if self.all_records:
-            # حفظ التحديد الحالي
-            current_selection = self.tree.selection()
-
-            # إعادة عرض البيانات
-            self.display_data(self.all_records)
-
-            # استعادة التحديد
-            if current_selection:
-                try:
-                    for item in current_selection:
-                        self.tree.selection_add(item)
-                except:
-                    pass
\ No newline at end of file
+        # ألوان الصفوف من التاجات، فلا حاجة لإعادة عرض البيانات
+
+    def destroy(self):
+        """إيقاف العرض على دفعات قبل تدمير الجدول"""
+        if self._render_job is not None:
+            try:
+                self.after_cancel(self._render_job)
+            except (tk.TclError, ValueError):
+                pass
+            self._render_job = None
+        super().destroy()
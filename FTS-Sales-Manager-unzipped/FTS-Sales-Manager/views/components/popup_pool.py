@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+views/components/popup_pool.py
+
+مجموعة نوافذ منبثقة مشتركة بين حقول القوائم المنسدلة والإكمال التلقائي.
+
+إنشاء CTkToplevel وتدميره عند كل فتح وإغلاق مكلف (خاصة في نافذة الإضافة
+والتعديل التي تحتوي حقولاً كثيرة). بدلاً من ذلك:
+- كل نافذة منبثقة (DropdownPopup) تحتوي قائمة افتراضية واحدة (VirtualListView).
+- عند الإغلاق تُخفى النافذة (withdraw) وتعود للمجموعة، وعند الفتح التالي
+  تُنقل للحقل الجديد: الموقع والحجم والإجراء عند الاختيار والألوان.
+- النوافذ أبناء للنافذة الجذرية، فتبقى صالحة بعد إغلاق النموذج الذي فُتحت منه.
+- يُحتفظ بعدد صغير من النوافذ الخاملة (MAX_IDLE)؛ الزائد يُدمر.
+
+مثال:
+    popup = get_popup_pool().acquire(self, on_select=self._select_value)
+    popup.list_view.set_items(values)
+    popup.show(x, y, width, height)
+    ...
+    get_popup_pool().release(popup)
+"""
+
+import tkinter as tk
+from typing import Dict, List, Optional
+
+import customtkinter as ctk
+
+from core.logger import logger
+from views.components.virtual_list import VirtualListView
+
+
+class DropdownPopup:
+    """نافذة منبثقة بلا إطار تحتوي قائمة افتراضية، قابلة لإعادة الاستخدام"""
+
+    def __init__(self, root):
+        self.root = root
+        self.window = ctk.CTkToplevel(root)
+        self.window.withdraw()
+        self.window.wm_overrideredirect(True)
+
+        self.list_view = VirtualListView(self.window)
+        self.list_view.pack(fill="both", expand=True, padx=5, pady=5)
+
+        self.owner = None
+
+    def exists(self) -> bool:
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def show(self, x: int, y: int, width: int, height: int, topmost: bool = False):
+        """إظهار النافذة في الموقع المطلوب"""
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+        self.window.attributes('-topmost', topmost)
+        self.window.deiconify()
+        self.window.lift()
+
+    def hide(self):
+        """إخفاء النافذة وفك ارتباطها بالحقل"""
+        self.owner = None
+        self.list_view.rebind()
+        self.window.withdraw()
+        self.window.attributes('-alpha', 1.0)
+
+    def destroy(self):
+        try:
+            self.window.destroy()
+        except tk.TclError:
+            pass
+
+
+class PopupPool:
+    """النوافذ المنبثقة الخاملة لكل نافذة جذرية"""
+
+    MAX_IDLE = 3
+
+    def __init__(self):
+        self._idle: Dict[tk.Misc, List[DropdownPopup]] = {}
+
+    def acquire(self, owner, on_select=None, **list_options) -> DropdownPopup:
+        """
+        نافذة منبثقة مخفية مرتبطة بالحقل owner (من المجموعة إن وجدت).
+        :param list_options: خيارات VirtualListView.rebind (row_height والألوان)
+        """
+        root = owner._root()
+        popup = self._take_idle(root)
+        if popup is None:
+            popup = DropdownPopup(root)
+        popup.owner = owner
+        popup.list_view.rebind(on_select=on_select, **list_options)
+        return popup
+
+    def release(self, popup: Optional[DropdownPopup]):
+        """إعادة النافذة للمجموعة بعد إغلاق القائمة"""
+        if popup is None or not popup.exists():
+            return
+        try:
+            popup.hide()
+        except tk.TclError as e:
+            logger.debug(f"تعذر إخفاء النافذة المنبثقة: {e}")
+            popup.destroy()
+            return
+
+        idle = self._idle.setdefault(popup.root, [])
+        if len(idle) < self.MAX_IDLE:
+            idle.append(popup)
+        else:
+            popup.destroy()
+
+    def warm_up(self, widget, count: int = 1):
+        """تجهيز نوافذ خاملة مسبقاً حتى لا يُنشأ أي CTkToplevel عند أول فتح"""
+        try:
+            root = widget._root()
+            idle = self._idle.setdefault(root, [])
+            idle[:] = [popup for popup in idle if popup.exists()]
+            while len(idle) < min(count, self.MAX_IDLE):
+                idle.append(DropdownPopup(root))
+        except tk.TclError as e:
+            logger.debug(f"تعذر تجهيز النوافذ المنبثقة: {e}")
+
+    def _take_idle(self, root) -> Optional[DropdownPopup]:
+        idle = self._idle.get(root)
+        while idle:
+            popup = idle.pop()
+            if popup.exists():
+                return popup
+        return None
+
+
+_popup_pool = PopupPool()
+
+
+def get_popup_pool() -> PopupPool:
+    """مجموعة النوافذ المنبثقة المشتركة"""
+    return _popup_pool
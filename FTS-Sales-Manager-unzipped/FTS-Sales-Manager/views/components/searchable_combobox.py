@@ -16,10 +16,24 @@ from typing import List, Callable, Optional, Any
 import threading
 import time
 
+from core.search_index import SearchIndex, build_search_index
+from core.usage_ranking import get_usage_ranking
+from views.components.background_search import BackgroundSearch
+from views.components.popup_pool import DropdownPopup, get_popup_pool
+from views.components.virtual_list import VirtualListView
+from utils.ui_scheduler import get_scheduler
+
 
 class EnhancedSearchableComboBox(ctk.CTkFrame):
     """قائمة منسدلة مدعومة بالبحث - نسخة مبسطة ومحسنة"""
 
+    ROW_HEIGHT = 32  # ارتفاع صف الخيار في القائمة المنسدلة
+    LIST_COLORS = {
+        'text_color': ("gray10", "gray90"),
+        'selected_color': ["gray65", "gray35"],
+        'hover_color': ["gray75", "gray25"],
+    }
+
     def __init__(self,
                  parent,
                  values: List[str] = None,
@@ -30,6 +44,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
                  enable_fuzzy: bool = True,
                  fuzzy_threshold: float = 0.6,
                  on_select: Callable[[str], None] = None,
+                 usage_key: Optional[str] = None,
                  **kwargs):
 
         super().__init__(parent, width=width, height=height, **kwargs)
@@ -41,6 +56,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         self.enable_fuzzy = enable_fuzzy
         self.fuzzy_threshold = fuzzy_threshold
         self.on_select = on_select
+        self.usage_key = usage_key  # اسم القائمة في إحصائيات الاستخدام
 
         # الحالة
         self.filtered_values = self.values.copy()
@@ -57,11 +73,20 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         self._setup_bindings()
 
         # النافذة المنبثقة
+        self._popup: Optional[DropdownPopup] = None
         self.dropdown_window = None
-        self.option_buttons = []
+        self.list_view: Optional[VirtualListView] = None
+        self._outside_click_job = None
+
+        # فهرس البحث (نتائجه مخزنة مؤقتاً في core.search_cache حسب إصداره)
+        self._search_index: Optional[SearchIndex] = None
+        self._indexed_values = None
+
+        # البحث في خيط عامل مع تأخير قصير (النتائج القديمة تُهمل)
+        self._searcher = BackgroundSearch(self, self._search_values, self._on_search_results)
 
-        # تخزين مؤقت للبحث
-        self._search_cache = {}
+        # تجهيز نافذة منبثقة مسبقاً في وقت الخمول
+        self.after_idle(lambda: get_popup_pool().warm_up(self))
 
     def _build_ui(self):
         """بناء واجهة مستخدم بسيطة وفعالة"""
@@ -100,24 +125,17 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         # أحداث التركيز - مبسطة
         self.entry.bind('<FocusIn>', self._on_focus_in)
 
-        # فحص دوري للنقر خارج المكون
-        self._check_outside_click()
+        # الفحص الدوري للنقر خارج المكون يعمل فقط والقائمة مفتوحة (_create_dropdown)
 
     def _check_outside_click(self):
-        """فحص دوري للنقر خارج المكون"""
-        def check():
-            try:
-                if self.is_dropdown_open:
-                    focused = self.focus_get()
-                    if not self._is_focus_inside(focused):
-                        self._close_dropdown()
-            except:
-                pass
-
-            # إعادة جدولة الفحص
-            self.after(200, check)
-
-        self.after(200, check)
+        """فحص دوري للنقر خارج المكون (مهمة على المجدول المشترك)"""
+        try:
+            if self.is_dropdown_open:
+                focused = self.focus_get()
+                if not self._is_focus_inside(focused):
+                    self._close_dropdown()
+        except:
+            pass
 
     def _is_focus_inside(self, widget) -> bool:
         """فحص إذا كان التركيز داخل المكون"""
@@ -130,7 +148,7 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             return True
 
         # فحص عناصر القائمة المنسدلة
-        if widget in self.option_buttons:
+        if self.dropdown_window and str(widget).startswith(str(self.dropdown_window)):
             return True
 
         return False
@@ -143,18 +161,20 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         self._perform_search(text)
 
     def _perform_search(self, query: str):
-        """تنفيذ البحث المحسن"""
+        """تنفيذ البحث: النص الفارغ فوراً، والباقي في الخيط العامل"""
         if not query:
-            self.filtered_values = self.values.copy()
+            self._searcher.cancel()
+            self._apply_results(query, self._all_values())
         else:
-            # استخدام التخزين المؤقت
-            if query in self._search_cache:
-                self.filtered_values = self._search_cache[query]
-            else:
-                self.filtered_values = self._search_values(query)
-                # حفظ في التخزين المؤقت
-                if len(self._search_cache) < 50:
-                    self._search_cache[query] = self.filtered_values.copy()
+            self._searcher.submit(query, self._get_search_index())
+
+    def _on_search_results(self, query: str, results: List[str]):
+        """نتيجة البحث من الخيط العامل (أحدث نص فقط)"""
+        self._apply_results(query, results)
+
+    def _apply_results(self, query: str, results: List[str]):
+        """عرض نتائج البحث"""
+        self.filtered_values = results
 
         # تحديث القائمة المنسدلة
         if self.is_dropdown_open:
@@ -162,49 +182,28 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         elif self.filtered_values and query:
             self._open_dropdown()
 
-    def _search_values(self, query: str) -> List[str]:
-        """البحث في القيم مع دعم البحث المرن"""
-        if not query:
-            return self.values.copy()
-
-        query_lower = query.lower()
-        results = []
-
-        # البحث بالأولوية
-        for value in self.values:
-            value_lower = value.lower()
-
-            # تطابق تام
-            if query_lower == value_lower:
-                results.append((value, 1.0))
-            # يبدأ بالاستعلام
-            elif value_lower.startswith(query_lower):
-                results.append((value, 0.9))
-            # يحتوي على الاستعلام
-            elif query_lower in value_lower:
-                results.append((value, 0.7))
-            # بحث مرن
-            elif self.enable_fuzzy:
-                similarity = self._calculate_similarity(query_lower, value_lower)
-                if similarity >= self.fuzzy_threshold:
-                    results.append((value, similarity * 0.6))
-
-        # ترتيب حسب النقاط
-        results.sort(key=lambda x: -x[1])
-
-        # إرجاع النتائج (بدون النقاط)
-        return [value for value, score in results[:self.max_results]]
-
-    def _calculate_similarity(self, text1: str, text2: str) -> float:
-        """حساب التشابه بخوارزمية بسيطة وسريعة"""
-        if not text1 or not text2:
-            return 0.0
-
-        # نسبة الأحرف المشتركة
-        common_chars = sum(1 for c in text1 if c in text2)
-        max_len = max(len(text1), len(text2))
-
-        return common_chars / max_len if max_len > 0 else 0.0
+    def _search_values(self, query: str, index: SearchIndex) -> List[str]:
+        """البحث في فهرس القيم مع دعم البحث المرن (محرك البحث الموحد؛ يُستدعى في الخيط العامل)"""
+        hits = index.search(
+            query,
+            limit=self.max_results,
+            fuzzy=self.enable_fuzzy,
+            fuzzy_threshold=self.fuzzy_threshold,
+            boosts=get_usage_ranking().boosts(self.usage_key)
+        )
+        return [hit.value for hit in hits]
+
+    def _all_values(self) -> List[str]:
+        """كل القيم للنص الفارغ: اختيارات المستخدم المعتادة أولاً"""
+        return list(get_usage_ranking().boosts(self.usage_key).pin_to_front(self.values))
+
+    def _get_search_index(self) -> SearchIndex:
+        """فهرس البحث للقيم الحالية (يُعاد بناؤه فقط إذا تغيرت القائمة؛ في خيط الواجهة فقط)"""
+        if self._search_index is None or self._indexed_values is not self.values \
+                or len(self._search_index) != len(self.values):
+            self._search_index = build_search_index(self.values)
+            self._indexed_values = self.values
+        return self._search_index
 
     def _toggle_dropdown(self):
         """تبديل حالة القائمة المنسدلة"""
@@ -227,61 +226,37 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             print(f"خطأ في فتح القائمة: {e}")
 
     def _create_dropdown(self):
-        """إنشاء القائمة المنسدلة"""
-        # تدمير النافذة القديمة
-        if self.dropdown_window:
-            try:
-                self.dropdown_window.destroy()
-            except:
-                pass
+        """إنشاء القائمة المنسدلة (نافذة من المجموعة المشتركة)"""
+        # إعادة النافذة القديمة للمجموعة
+        self._release_popup()
 
         # حساب الموقع والحجم
         x = self.winfo_rootx()
         y = self.winfo_rooty() + self.winfo_height()
         width = self.winfo_width()
-        height = min(200, len(self.filtered_values) * 35 + 10)
-
-        # إنشاء النافذة
-        self.dropdown_window = ctk.CTkToplevel(self)
-        self.dropdown_window.wm_overrideredirect(True)
-        self.dropdown_window.geometry(f"{width}x{height}+{x}+{y}")
-
-        # إطار القائمة
-        self.list_frame = ctk.CTkScrollableFrame(
-            self.dropdown_window,
-            width=width-10,
-            height=height-10
+        height = min(200, len(self.filtered_values) * self.ROW_HEIGHT + 10)
+
+        # نافذة مخفية من المجموعة مع قائمة افتراضية ترسم الصفوف الظاهرة فقط
+        self._popup = get_popup_pool().acquire(
+            self,
+            on_select=self._select_value,
+            row_height=self.ROW_HEIGHT,
+            **self.LIST_COLORS
         )
-        self.list_frame.pack(fill="both", expand=True, padx=5, pady=5)
+        self.dropdown_window = self._popup.window
+        self.list_view = self._popup.list_view
 
         self._populate_dropdown()
+        self._popup.show(x, y, width, height)
 
-    def _populate_dropdown(self):
-        """ملء القائمة المنسدلة"""
-        # مسح الأزرار السابقة
-        for btn in self.option_buttons:
-            try:
-                btn.destroy()
-            except:
-                pass
-
-        self.option_buttons.clear()
-
-        # إضافة الخيارات الجديدة
-        for i, value in enumerate(self.filtered_values):
-            btn = ctk.CTkButton(
-                self.list_frame,
-                text=value,
-                height=30,
-                anchor="w",
-                command=lambda v=value: self._select_value(v)
-            )
-            btn.pack(fill="x", pady=1)
-
-            # ربط أحداث الماوس
-            btn.bind('<Enter>', lambda e, idx=i: self._highlight_option(idx))
+        # التركيز لا يتغير بدون إدخال من المستخدم: الفحص يتوقف أثناء الخمول
+        self._outside_click_job = get_scheduler(self).call_every(
+            200, self._check_outside_click, owner=self, pause_when_hidden=False, pause_when_idle=True)
 
-            self.option_buttons.append(btn)
+    def _populate_dropdown(self):
+        """ملء القائمة المنسدلة (الصفوف يُعاد استخدامها، لا أزرار لكل قيمة)"""
+        self.selected_index = -1
+        self.list_view.set_items(self.filtered_values)
 
     def _update_dropdown(self):
         """تحديث محتوى القائمة المنسدلة"""
@@ -290,24 +265,32 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
 
     def _close_dropdown(self):
         """إغلاق القائمة المنسدلة"""
-        if self.dropdown_window:
-            try:
-                self.dropdown_window.destroy()
-            except:
-                pass
-            finally:
-                self.dropdown_window = None
+        self._release_popup()
 
         self.is_dropdown_open = False
         self.selected_index = -1
         self.dropdown_btn.configure(text="▼")
 
+    def _release_popup(self):
+        """إعادة النافذة المنبثقة للمجموعة المشتركة"""
+        job, self._outside_click_job = self._outside_click_job, None
+        get_scheduler(self).cancel(job)
+        popup, self._popup = self._popup, None
+        self.dropdown_window = None
+        self.list_view = None
+        get_popup_pool().release(popup)
+
     def _select_value(self, value: str):
         """اختيار قيمة"""
         self.selected_value = value
         self.text_var.set(value)
+        self._searcher.cancel()
         self._close_dropdown()
 
+        # تسجيل الاختيار
+        if self.usage_key:
+            get_usage_ranking().record(self.usage_key, value)
+
         # استدعاء callback
         if self.on_select:
             try:
@@ -316,16 +299,11 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
                 print(f"خطأ في callback: {e}")
 
     def _highlight_option(self, index: int):
-        """تمييز خيار"""
+        """تمييز خيار وإظهاره في القائمة"""
         self.selected_index = index
-
-        # إزالة التمييز من جميع الأزرار
-        for btn in self.option_buttons:
-            btn.configure(fg_color=["gray75", "gray25"])
-
-        # تمييز الزر المحدد
-        if 0 <= index < len(self.option_buttons):
-            self.option_buttons[index].configure(fg_color=["gray65", "gray35"])
+        if self.list_view:
+            self.list_view.set_selected(index)
+            self.list_view.see(index)
 
     # معالجات الأحداث
     def _on_arrow_down(self, event):
@@ -334,8 +312,8 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
             self._open_dropdown()
             return "break"
 
-        if self.option_buttons:
-            if self.selected_index < len(self.option_buttons) - 1:
+        if self.filtered_values:
+            if self.selected_index < len(self.filtered_values) - 1:
                 self.selected_index += 1
             else:
                 self.selected_index = 0
@@ -349,11 +327,11 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         if not self.is_dropdown_open:
             return "break"
 
-        if self.option_buttons:
+        if self.filtered_values:
             if self.selected_index > 0:
                 self.selected_index -= 1
             else:
-                self.selected_index = len(self.option_buttons) - 1
+                self.selected_index = len(self.filtered_values) - 1
 
             self._highlight_option(self.selected_index)
 
@@ -412,21 +390,23 @@ class EnhancedSearchableComboBox(ctk.CTkFrame):
         """تحديث قائمة القيم"""
         self.values = values.copy()
         self.filtered_values = values.copy()
-        self._search_cache.clear()
+        self._searcher.cancel()
 
     def add_value(self, value: str):
         """إضافة قيمة جديدة"""
         if value and value not in self.values:
             self.values.append(value)
             self.filtered_values = self.values.copy()
-            self._search_cache.clear()
+            self._search_index = None
+            self._searcher.cancel()
 
     def remove_value(self, value: str):
         """حذف قيمة"""
         if value in self.values:
             self.values.remove(value)
             self.filtered_values = self.values.copy()
-            self._search_cache.clear()
+            self._search_index = None
+            self._searcher.cancel()
 
             if self.selected_value == value:
                 self.clear()
@@ -9,6 +9,7 @@ import customtkinter as ctk
 from typing import Callable, Dict, Any, Optional
 
 from core.language_manager import LanguageManager
+from utils.ui_scheduler import get_scheduler
 
 
 class SidebarComponent(ctk.CTkFrame):
@@ -36,6 +37,7 @@ class SidebarComponent(ctk.CTkFrame):
         self.is_collapsed = False
         self.nav_buttons = []
         self.active_button = None
+        self._value_animations = {}  # مفتاح الإحصائية -> مهمة التحريك الجارية
 
         self._build_ui()
 
@@ -484,29 +486,32 @@ class SidebarComponent(ctk.CTkFrame):
             if key in self.stats_cards:
                 label = self.stats_cards[key]
                 # تحديث القيمة مع تأثير
-                self._animate_value_change(label, int(label.cget("text")), value)
+                self._animate_value_change(key, label, int(label.cget("text")), value)
 
-    def _animate_value_change(self, label, start, end):
-        """تحريك تغيير القيمة"""
+    def _animate_value_change(self, key, label, start, end):
+        """تحريك تغيير القيمة (مهمة على المجدول المشترك؛ التحديث الجديد يلغي السابق)"""
+        scheduler = get_scheduler(self)
+        scheduler.cancel(self._value_animations.pop(key, None))
         if start == end:
             return
 
         # حساب الخطوة
-        diff = end - start
         steps = 20
-        step = diff / steps
+        step = (end - start) / steps
+        state = {'value': start + step, 'remaining': steps}
 
-        def update_value(current, target, step_count):
-            if step_count <= 0:
-                label.configure(text=str(int(target)))
-                return
+        def update_value():
+            state['remaining'] -= 1
+            if state['remaining'] <= 0:
+                label.configure(text=str(int(end)))
+                self._value_animations.pop(key, None)
+                return False
 
-            new_value = current + step
-            label.configure(text=str(int(new_value)))
+            state['value'] += step
+            label.configure(text=str(int(state['value'])))
 
-            self.after(50, lambda: update_value(new_value, target, step_count - 1))
-
-        update_value(start, end, steps)
+        label.configure(text=str(int(state['value'])))
+        self._value_animations[key] = scheduler.call_every(50, update_value, owner=label)
 
     def update_texts(self, lang_manager):
         """تحديث نصوص المكون"""
@@ -11,6 +11,16 @@ from typing import Optional, Tuple
 import threading
 
 from core.language_manager import LanguageManager
+from utils.ui_scheduler import get_scheduler
+
+MONTHS_AR = [
+    "يناير", "فبراير", "مارس", "أبريل", "مايو", "يونيو",
+    "يوليو", "أغسطس", "سبتمبر", "أكتوبر", "نوفمبر", "ديسمبر"
+]
+DAYS_AR = [
+    "الإثنين", "الثلاثاء", "الأربعاء", "الخميس",
+    "الجمعة", "السبت", "الأحد"
+]
 
 
 class StatusBarComponent(ctk.CTkFrame):
@@ -42,6 +52,8 @@ class StatusBarComponent(ctk.CTkFrame):
         # متغير لتتبع حالة التدمير
         self._destroyed = False
         self._time_update_running = False
+        self._time_job = None
+        self._shown_date = None  # (التاريخ، اللغة) المعروضان حالياً
 
         self._build_ui()
         self._start_time_update()
@@ -54,6 +66,9 @@ class StatusBarComponent(ctk.CTkFrame):
         if event and event.widget == self:
             self._destroyed = True
             self._time_update_running = False
+            if self._time_job is not None:
+                get_scheduler(self).cancel(self._time_job)
+                self._time_job = None
 
     def _is_valid(self):
         """فحص صحة المكون قبل أي عملية"""
@@ -363,8 +378,8 @@ class StatusBarComponent(ctk.CTkFrame):
         except:
             pass
 
-    def hide_progress(self):
-        """إخفاء شريط التقدم مع حماية من الأخطاء"""
+    def hide_progress(self, reset_status: bool = True):
+        """إخفاء شريط التقدم مع حماية من الأخطاء (reset_status=False يبقي رسالة الحالة الحالية)"""
         if not self._is_valid():
             return
 
@@ -372,7 +387,8 @@ class StatusBarComponent(ctk.CTkFrame):
             self.progress_active = False
             if hasattr(self.progress_bar, 'pack_forget'):
                 self.progress_bar.pack_forget()
-            self.set_status(self.lang_manager.get("ready", "Ready"), "info")
+            if reset_status:
+                self.set_status(self.lang_manager.get("ready", "Ready"), "info")
         except:
             pass
 
@@ -409,52 +425,45 @@ class StatusBarComponent(ctk.CTkFrame):
             pass
 
     def _update_time(self):
-        """تحديث الوقت والتاريخ مع حماية من الأخطاء"""
+        """تحديث الوقت والتاريخ مع حماية من الأخطاء (مهمة كل ثانية على المجدول المشترك)"""
         if not self._is_valid() or not self._time_update_running:
-            return
+            return False
 
         try:
             now = datetime.now()
+            lang = self.lang_manager.current_lang
 
             # تنسيق الوقت
-            time_format = "%I:%M:%S %p" if self.lang_manager.current_lang == "en" else "%H:%M:%S"
+            time_format = "%I:%M:%S %p" if lang == "en" else "%H:%M:%S"
             time_str = now.strftime(time_format)
             self._safe_configure(self.time_label, text=time_str)
 
-            # تنسيق التاريخ
-            if self.lang_manager.current_lang == "ar":
-                # التاريخ بالعربية
-                months_ar = [
-                    "يناير", "فبراير", "مارس", "أبريل", "مايو", "يونيو",
-                    "يوليو", "أغسطس", "سبتمبر", "أكتوبر", "نوفمبر", "ديسمبر"
-                ]
-                days_ar = [
-                    "الإثنين", "الثلاثاء", "الأربعاء", "الخميس",
-                    "الجمعة", "السبت", "الأحد"
-                ]
-
-                day = days_ar[now.weekday()]
-                month = months_ar[now.month - 1]
-                date_str = f"{day}، {now.day} {month} {now.year}"
-            else:
-                # التاريخ بالإنجليزية
-                date_str = now.strftime("%A, %d %B %Y")
-
-            self._safe_configure(self.date_label, text=date_str)
+            # التاريخ يُعاد بناؤه فقط عند تغير اليوم أو اللغة
+            if self._shown_date != (now.date(), lang):
+                if lang == "ar":
+                    # التاريخ بالعربية
+                    day = DAYS_AR[now.weekday()]
+                    month = MONTHS_AR[now.month - 1]
+                    date_str = f"{day}، {now.day} {month} {now.year}"
+                else:
+                    # التاريخ بالإنجليزية
+                    date_str = now.strftime("%A, %d %B %Y")
 
-            # جدولة التحديث التالي
-            if self._is_valid() and self._time_update_running:
-                self.after(1000, self._update_time)
+                if self._safe_configure(self.date_label, text=date_str):
+                    self._shown_date = (now.date(), lang)
 
         except Exception as e:
             # إذا حدث خطأ، توقف عن التحديث
             self._time_update_running = False
+            return False
 
     def _start_time_update(self):
         """بدء تحديث الوقت مع حماية من الأخطاء"""
         if self._is_valid():
             self._time_update_running = True
             self._update_time()
+            # لا يُحدث والنافذة مصغرة؛ يُستأنف عند إظهارها
+            self._time_job = get_scheduler(self).call_every(1000, self._update_time, owner=self)
 
     def show_notification(self, title: str, message: str, type: str = "info"):
         """عرض إشعار مؤقت مع حماية من الأخطاء"""
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+views/components/virtual_list.py
+
+قائمة خيارات افتراضية (Virtualized) للقوائم المنسدلة.
+
+بدلاً من زر لكل قيمة، ترسم القائمة على Canvas واحد الصفوف الظاهرة فقط:
+- عدد ثابت من عناصر الرسم (مستطيل + نص لكل صف ظاهر) يُعاد استخدامه عند
+  التمرير بتغيير النص والموقع فقط؛ لا يُنشأ أو يُحذف أي عنصر واجهة.
+- القيم تُحفظ بالمرجع (قائمة أو ValueIndex)، فزمن الفتح والتحديث ثابت مهما
+  كان طول القائمة.
+- تمييز لوحة المفاتيح (selected) وتمييز الماوس (hover) بنفس ألوان الأزرار السابقة.
+
+مثال:
+    view = VirtualListView(window, on_select=lambda value: print(value))
+    view.pack(fill="both", expand=True)
+    view.set_items(filtered_values)
+    view.set_selected(0)
+    view.see(12)
+"""
+
+import tkinter as tk
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import customtkinter as ctk
+
+ROW_HEIGHT = 37  # ارتفاع الصف (35 + مسافة) كما في قائمة الأزرار السابقة
+WHEEL_ROWS = 3  # عدد الصفوف لكل خطوة من عجلة الماوس
+
+TEXT_COLOR = ("#1976D2", "#FFFFFF")
+SELECTED_COLOR = ("#E3F2FD", "#1E90FF")
+HOVER_COLOR = ("#F8F9FA", "#2A2D3A")
+MESSAGE_COLOR = ("gray", "lightgray")
+
+
+class VirtualListView(ctk.CTkFrame):
+    """قائمة قيم قابلة للتمرير ترسم الصفوف الظاهرة فقط"""
+
+    def __init__(self, master, on_select: Optional[Callable[[str], None]] = None,
+                 row_height: int = ROW_HEIGHT, text_color=TEXT_COLOR, selected_color=SELECTED_COLOR,
+                 hover_color=HOVER_COLOR, **kwargs):
+        """
+        :param on_select: تُستدعى بالقيمة عند النقر على صف
+        :param text_color / selected_color / hover_color: ألوان (فاتح، داكن) كما في CTk
+        """
+        super().__init__(master, **kwargs)
+
+        self.on_select = on_select
+        self._text_color = text_color
+        self._selected_color = selected_color
+        self._hover_color = hover_color
+        self._row_height = self._scaled_row_height(row_height)
+        self._font = ctk.CTkFont(size=round(self._apply_widget_scaling(13)))
+        self._message_font = ctk.CTkFont(size=round(self._apply_widget_scaling(12)), slant="italic")
+
+        self._items: Sequence[str] = ()
+        self._top = 0  # إزاحة أعلى المنطقة الظاهرة بالبكسل
+        self._selected = -1
+        self._hover = -1
+        self._first_visible = 0
+        self._rows: List[Tuple[int, int]] = []  # (مستطيل، نص) لكل صف ظاهر
+        self._message_id = None
+
+        self._canvas = tk.Canvas(self, highlightthickness=0, borderwidth=0,
+                                 background=self._apply_appearance_mode(self.cget("fg_color")))
+        self._canvas.pack(side="left", fill="both", expand=True, padx=(2, 0), pady=2)
+        self._scrollbar = ctk.CTkScrollbar(self, command=self.yview)
+        self._scrollbar_visible = False
+
+        self._canvas.bind('<Configure>', lambda e: self._redraw())
+        self._canvas.bind('<Motion>', self._on_motion)
+        self._canvas.bind('<Leave>', lambda e: self._set_hover(-1))
+        self._canvas.bind('<Button-1>', self._on_click)
+        self._canvas.bind('<MouseWheel>', self._on_mouse_wheel)
+        self._canvas.bind('<Button-4>', lambda e: self.scroll_rows(-WHEEL_ROWS))
+        self._canvas.bind('<Button-5>', lambda e: self.scroll_rows(WHEEL_ROWS))
+
+    def rebind(self, on_select: Optional[Callable[[str], None]] = None, row_height: int = ROW_HEIGHT,
+               text_color=TEXT_COLOR, selected_color=SELECTED_COLOR, hover_color=HOVER_COLOR):
+        """ربط القائمة بحقل آخر عند إعادة استخدام نافذتها: الإجراء والألوان وارتفاع الصف"""
+        self.on_select = on_select
+        self._text_color = text_color
+        self._selected_color = selected_color
+        self._hover_color = hover_color
+        self._row_height = self._scaled_row_height(row_height)
+        color = self._apply_appearance_mode(text_color)
+        for _, text_id in self._rows:
+            self._canvas.itemconfigure(text_id, fill=color)
+        self.set_items(())
+
+    def _scaled_row_height(self, row_height: int) -> int:
+        return max(1, round(self._apply_widget_scaling(row_height)))
+
+    # =============== المحتوى ===============
+
+    def set_items(self, items: Sequence[str], keep_scroll: bool = False):
+        """عرض قائمة قيم جديدة (بالمرجع، بدون نسخ)"""
+        self._items = items if items is not None else ()
+        self._selected = -1
+        self._hover = -1
+        if not keep_scroll:
+            self._top = 0
+        self._clear_message()
+        self._redraw()
+
+    def show_message(self, text: str):
+        """عرض رسالة بدل الصفوف (مثل عدم وجود نتائج)"""
+        self._items = ()
+        self._selected = -1
+        self._hover = -1
+        self._top = 0
+        self._redraw()
+        self._clear_message()
+        width = max(self._canvas.winfo_width(), 1)
+        self._message_id = self._canvas.create_text(
+            width // 2, self._row_height, text=text, font=self._message_font,
+            fill=self._apply_appearance_mode(MESSAGE_COLOR))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # =============== التمييز ===============
+
+    @property
+    def selected_index(self) -> int:
+        return self._selected
+
+    def set_selected(self, index: int):
+        """تمييز صف لوحة المفاتيح (‎-1 لإلغاء التمييز)"""
+        previous, self._selected = self._selected, index
+        self._paint_row(previous)
+        self._paint_row(index)
+
+    def _set_hover(self, index: int):
+        if index == self._hover:
+            return
+        previous, self._hover = self._hover, index
+        self._paint_row(previous)
+        self._paint_row(index)
+
+    # =============== التمرير ===============
+
+    def see(self, index: int, context: int = 1):
+        """تمرير أقل مسافة لإظهار الصف مع context صف قبله أو بعده إن أمكن"""
+        if not (0 <= index < len(self._items)):
+            return
+        height = self._viewport_height()
+        row = self._row_height
+        top = max(0, (index - context) * row)
+        bottom = min(len(self._items), index + 1 + context) * row
+        if top < self._top:
+            self._scroll_to(top)
+        elif bottom > self._top + height:
+            self._scroll_to(bottom - height)
+
+    def scroll_to_top(self):
+        self._scroll_to(0)
+
+    def scroll_to_bottom(self):
+        self._scroll_to(self._max_top())
+
+    def scroll_rows(self, rows: int):
+        self._scroll_to(self._top + rows * self._row_height)
+
+    def yview(self, *args):
+        """واجهة شريط التمرير: moveto / scroll units|pages"""
+        if not args:
+            return self._view_fractions()
+        if args[0] == 'moveto':
+            self._scroll_to(round(float(args[1]) * self._content_height()))
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            if args[2] == 'pages':
+                self._scroll_to(self._top + amount * max(self._row_height, self._viewport_height() - self._row_height))
+            else:
+                self.scroll_rows(amount)
+
+    def _scroll_to(self, top: int):
+        top = max(0, min(int(top), self._max_top()))
+        if top != self._top:
+            self._top = top
+            self._hover = -1  # الصف تحت المؤشر تغير؛ يُحدث مع حركة الماوس التالية
+            self._redraw()
+
+    def _on_mouse_wheel(self, event):
+        if event.delta:
+            # ويندوز: 120 لكل خطوة، ماك: قيم صغيرة
+            steps = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+            self.scroll_rows(-steps * WHEEL_ROWS)
+        return "break"
+
+    # =============== أحداث الماوس ===============
+
+    def _index_at(self, y: int) -> int:
+        index = (self._top + y) // self._row_height
+        return index if 0 <= index < len(self._items) else -1
+
+    def _on_motion(self, event):
+        self._set_hover(self._index_at(event.y))
+
+    def _on_click(self, event):
+        index = self._index_at(event.y)
+        if index >= 0 and self.on_select:
+            self.on_select(self._items[index])
+
+    # =============== الرسم ===============
+
+    def _viewport_height(self) -> int:
+        height = self._canvas.winfo_height()
+        return height if height > 1 else self._canvas.winfo_reqheight()
+
+    def _content_height(self) -> int:
+        return len(self._items) * self._row_height
+
+    def _max_top(self) -> int:
+        return max(0, self._content_height() - self._viewport_height())
+
+    def _view_fractions(self) -> Tuple[float, float]:
+        total = self._content_height()
+        if total <= 0:
+            return 0.0, 1.0
+        return self._top / total, min(1.0, (self._top + self._viewport_height()) / total)
+
+    def _row_color(self, index: int) -> str:
+        if index == self._selected:
+            return self._apply_appearance_mode(self._selected_color)
+        if index == self._hover:
+            return self._apply_appearance_mode(self._hover_color)
+        return self._canvas.cget("background")
+
+    def _redraw(self):
+        """ربط صفوف الرسم الظاهرة بالقيم الحالية حسب موضع التمرير"""
+        canvas = self._canvas
+        height = self._viewport_height()
+        width = max(canvas.winfo_width(), 1)
+        row = self._row_height
+        self._top = max(0, min(self._top, self._max_top()))
+
+        first = self._top // row
+        offset = self._top - first * row
+        needed = min(height // row + 2, max(len(self._items) - first, 0))
+        self._first_visible = first
+
+        # الصفوف تُنشأ مرة واحدة حسب ارتفاع القائمة ثم يُعاد استخدامها
+        text_color = self._apply_appearance_mode(self._text_color)
+        while len(self._rows) < needed:
+            self._rows.append((
+                canvas.create_rectangle(0, 0, 0, 0, width=0),
+                canvas.create_text(0, 0, anchor="w", font=self._font, fill=text_color),
+            ))
+
+        for slot, (rect_id, text_id) in enumerate(self._rows):
+            if slot >= needed:
+                canvas.itemconfigure(rect_id, state="hidden")
+                canvas.itemconfigure(text_id, state="hidden")
+                continue
+            index = first + slot
+            y = slot * row - offset
+            canvas.coords(rect_id, 2, y + 1, width - 2, y + row - 1)
+            canvas.coords(text_id, 12, y + row // 2)
+            canvas.itemconfigure(rect_id, state="normal", fill=self._row_color(index))
+            canvas.itemconfigure(text_id, state="normal", text=self._items[index])
+
+        self._update_scrollbar(height)
+
+    def _paint_row(self, index: int):
+        """تحديث لون صف واحد إذا كان ظاهراً"""
+        slot = index - self._first_visible
+        if index < 0 or not (0 <= slot < len(self._rows)) or index >= len(self._items):
+            return
+        rect_id, _ = self._rows[slot]
+        self._canvas.itemconfigure(rect_id, fill=self._row_color(index))
+
+    def _update_scrollbar(self, height: int):
+        needs_scrollbar = self._content_height() > height
+        if needs_scrollbar != self._scrollbar_visible:
+            if needs_scrollbar:
+                self._scrollbar.pack(side="right", fill="y", pady=2)
+            else:
+                self._scrollbar.pack_forget()
+            self._scrollbar_visible = needs_scrollbar
+        if needs_scrollbar:
+            self._scrollbar.set(*self._view_fractions())
+
+    def _clear_message(self):
+        if self._message_id is not None:
+            self._canvas.delete(self._message_id)
+            self._message_id = None
+
+    def _set_appearance_mode(self, mode_string):
+        """إعادة تلوين الصفوف عند تغيير الوضع الفاتح/الداكن"""
+        super()._set_appearance_mode(mode_string)
+        self._canvas.configure(background=self._apply_appearance_mode(self.cget("fg_color")))
+        text_color = self._apply_appearance_mode(self._text_color)
+        for _, text_id in self._rows:
+            self._canvas.itemconfigure(text_id, fill=text_color)
+        self._redraw()
@@ -25,6 +25,7 @@ import queue
 from core.language_manager import LanguageManager
 from core.theme_manager import ThemeManager
 from core.logger import logger
+from utils.ui_scheduler import get_scheduler
 
 # النظام الموحد للثيمات والألوان
 from core.theme_color_manager import ThemeColorManager, ThemedWindow
@@ -422,12 +423,14 @@ class LoginWindow(ctk.CTk):
     def _start_session_timer(self):
         """Start session timeout timer"""
         self._last_activity = time.time()
-        self._check_session_timeout()
+        # المهلة تُحسب والنافذة مصغرة أيضاً
+        get_scheduler(self).call_every(60000, self._check_session_timeout, owner=self,
+                                       pause_when_hidden=False)
 
     def _check_session_timeout(self):
         """Check for session timeout"""
         if self._closing or not self.winfo_exists():
-            return
+            return False
 
         if time.time() - self._last_activity > LoginConstants.SESSION_TIMEOUT:
             self._show_status(
@@ -435,8 +438,7 @@ class LoginWindow(ctk.CTk):
                 "warning"
             )
             self._on_close()
-        else:
-            self.after(60000, self._check_session_timeout)
+            return False
 
     def _update_activity(self):
         """Update last activity time"""
@@ -169,7 +169,7 @@ class MainWindow(ctk.CTk):
 
         # تطبيق ملء الشاشة وتحميل البيانات
         self.safe_after.schedule(100, self._apply_fullscreen_mode)
-        self.safe_after.schedule(500, self._load_data)
+        self.safe_after.schedule(0, self._load_data)
 
         # معالج الإغلاق
         self.protocol("WM_DELETE_WINDOW", self._on_close)
@@ -442,9 +442,13 @@ class MainWindow(ctk.CTk):
         # الجدول
         self.data_table = DataTableComponent(table_container, self.lang_manager,
                                            on_row_double_click=self._on_row_double_click,
-                                           on_selection_change=self._on_selection_change)
+                                           on_selection_change=self._on_selection_change,
+                                           on_render_progress=self._on_table_render_progress,
+                                           on_sort_change=self._on_table_sort_change)
         self.data_table.pack(fill="both", expand=True, padx=15, pady=15)
 
+        self._restore_table_sort()
+
     def _create_status_bar(self):
         """إنشاء شريط الحالة"""
         status_container = ctk.CTkFrame(self.main_container, height=35, corner_radius=0,
@@ -567,15 +571,56 @@ class MainWindow(ctk.CTk):
 
         def load_thread():
             try:
-                records = self.controller.fetch_all_records()
+                # 1. عرض فوري من اللقطة المحلية
+                cached_records, synced_at = self.controller.load_cached_records()
+                if cached_records and self._is_window_valid():
+                    self.safe_after.schedule(0, self._on_snapshot_loaded, cached_records, synced_at)
+
+                # 2. مزامنة في الخلفية (تفاضلية إن أمكن)
+                records, changed = self.controller.sync_records(synced_at if cached_records else None)
                 if self._is_window_valid():
-                    self.safe_after.schedule(0, self._on_data_loaded, records)
+                    self.safe_after.schedule(0, self._on_data_synced, records, changed)
             except Exception as e:
                 if self._is_window_valid():
                     self.safe_after.schedule(0, self._on_load_error, str(e))
 
         threading.Thread(target=load_thread, daemon=True).start()
 
+    @safe_operation
+    def _on_snapshot_loaded(self, records, synced_at):
+        """عرض اللقطة المحلية فوراً أثناء المزامنة"""
+        self.all_records = records
+        self.filtered_records = records
+
+        if self.window_state:
+            self.window_state.update_records(records)
+
+        if hasattr(self, 'data_table') and self.data_table:
+            try:
+                self.data_table.display_data(records)
+            except Exception as e:
+                logger.error(f"Display cached data error: {e}")
+
+        status_msg = (f"{self.lang_manager.get('cached_as_of', 'Cached as of')} {synced_at.strftime('%H:%M')}"
+                      f" • {self.lang_manager.get('syncing', 'Syncing...')}")
+        self._safe_status_update(status_msg, "loading")
+        self._update_stats()
+
+    @safe_operation
+    def _on_data_synced(self, records, changed):
+        """معالج انتهاء المزامنة بعد العرض من اللقطة"""
+        # لا داعي لإعادة رسم الجدول إذا لم يتغير شيء منذ اللقطة المعروضة
+        if changed == 0 and self.all_records:
+            self.all_records = records
+            if self.window_state:
+                self.window_state.is_loading = False
+            status_msg = self.lang_manager.get("status_load_complete", "{} records loaded").format(len(records))
+            self._safe_status_update(status_msg, "success")
+            self._safe_toolbar_update(set_loading=False)
+            return
+
+        self._on_data_loaded(records)
+
     @safe_operation
     def _on_data_loaded(self, records):
         """معالج تحميل البيانات"""
@@ -648,8 +693,10 @@ class MainWindow(ctk.CTk):
         self._safe_toolbar_update(set_loading=False)
         self._update_stats()
 
-        self.selected_records = []
-        self._safe_toolbar_update(update_selection=0)
+        # الجدول يحتفظ بتحديد السجلات التي ما زالت موجودة
+        data_table = getattr(self, 'data_table', None)
+        self.selected_records = data_table.get_selected_records() if data_table else []
+        self._safe_toolbar_update(update_selection=len(self.selected_records))
 
     @safe_operation
     def _on_refresh_error(self, error_message):
@@ -670,9 +717,7 @@ class MainWindow(ctk.CTk):
         if not search_text:
             self.filtered_records = self.all_records
         else:
-            search_lower = search_text.lower()
-            self.filtered_records = [r for r in self.all_records
-                                   if search_lower in str(r.get('fields', {})).lower()]
+            self.filtered_records = self.controller.booking_query.query().search(search_text).records()
 
         if self.window_state:
             self.window_state.filtered_records = self.filtered_records
@@ -708,13 +753,11 @@ class MainWindow(ctk.CTk):
     def _count_records(self, count_type):
         """عد السجلات حسب النوع"""
         try:
+            query = self.controller.booking_query.query()
             if count_type == 'today':
-                today = str(datetime.now().date())
-                return sum(1 for r in self.all_records
-                          if r.get('fields', {}).get('Date Trip', '')[:10] == today)
+                return query.where('Date Trip', '=', str(datetime.now().date())).count()
             elif count_type == 'pending':
-                return sum(1 for r in self.all_records
-                          if r.get('fields', {}).get('Booking Status', '').lower() == 'pending')
+                return query.where('Booking Status', '=', 'pending').count()
             return 0
         except Exception as e:
             logger.debug(f"Count records error: {e}")
@@ -836,6 +879,38 @@ class MainWindow(ctk.CTk):
             self._safe_toolbar_update(update_selection=1)
             self._edit_record()
 
+    @safe_operation
+    def _restore_table_sort(self):
+        """استعادة ترتيب الجدول المحفوظ مع حالة النافذة"""
+        if not hasattr(self.controller, 'config_mgr'):
+            return
+        saved_state = self.controller.config_mgr.get('main_window_state', {}) or {}
+        sort_column = saved_state.get('sort_column')
+        if not sort_column:
+            return
+        sort_order = saved_state.get('sort_order', 'asc')
+        self.data_table.set_sort(sort_column, sort_order)
+        if self.window_state:
+            self.window_state.sort_column = sort_column
+            self.window_state.sort_order = sort_order
+
+    @safe_operation
+    def _on_table_sort_change(self, column, order):
+        """حفظ ترتيب الجدول في حالة النافذة"""
+        if self.window_state:
+            self.window_state.sort_column = column
+            self.window_state.sort_order = order
+
+    @safe_operation
+    def _on_table_render_progress(self, done, total):
+        """تقدم عرض صفوف الجدول على دفعات في شريط الحالة"""
+        if not hasattr(self, 'status_bar') or not self.status_bar:
+            return
+        if done < total:
+            self.status_bar.show_progress(done / total)
+        else:
+            self.status_bar.hide_progress(reset_status=False)
+
     @safe_operation
     def _on_selection_change(self, selected_records):
         """معالج تغيير التحديد"""
@@ -1038,9 +1113,9 @@ class MainWindow(ctk.CTk):
     @safe_operation
     def _select_all(self):
         """تحديد جميع السجلات"""
-        if hasattr(self.data_table, 'tree') and self.data_table.tree:
-            self.data_table.tree.selection_set(self.data_table.tree.get_children())
-            self._on_selection_change(self.all_records)
+        if hasattr(self.data_table, 'select_all'):
+            self.data_table.select_all()
+            self._on_selection_change(self.data_table.get_selected_records())
 
     @safe_operation
     def _clear_selection(self):
@@ -1129,12 +1204,23 @@ class MainWindow(ctk.CTk):
     @error_handler
     def _show_statistics(self):
         """عرض الإحصائيات"""
+        query_engine = self.controller.booking_query
+        by_status = "\n".join(
+            f"  • {self.lang_manager.get('status_' + group['key'].lower(), group['key']) if group['key'] else '-'}: {group['count']}"
+            for group in query_engine.query().group_by('Booking Status')
+        )
         stats_msg = f"""
 {self.lang_manager.get("statistics", "Statistics")}:
 
 {self.lang_manager.get("total_records", "Total Records")}: {len(self.all_records)}
 {self.lang_manager.get("today_bookings", "Today's Bookings")}: {self._count_records('today')}
 {self.lang_manager.get("pending_bookings", "Pending Bookings")}: {self._count_records('pending')}
+
+{self.lang_manager.get("total_net_rate", "Total Net Rate")}: {query_engine.query().sum('Net Rate'):,.2f}
+{self.lang_manager.get("average_net_rate", "Average Net Rate")}: {query_engine.query().avg('Net Rate'):,.2f}
+
+{self.lang_manager.get("bookings_by_status", "Bookings by Status")}:
+{by_status}
 """
         messagebox.showinfo(self.lang_manager.get("statistics", "Statistics"), stats_msg)
 
@@ -1148,9 +1234,30 @@ class MainWindow(ctk.CTk):
     @error_handler
     def _clear_cache(self):
         """مسح الذاكرة المؤقتة"""
-        if messagebox.askyesno(self.lang_manager.get("confirm", "Confirm"),
-                             self.lang_manager.get("confirm_clear_cache", "Clear all cached data?")):
-            self._safe_status_update(self.lang_manager.get("cache_cleared", "Cache cleared successfully"), "success")
+        if not messagebox.askyesno(self.lang_manager.get("confirm", "Confirm"),
+                                   self.lang_manager.get("confirm_clear_cache", "Clear all cached data?")):
+            return
+
+        self._safe_status_update(self.lang_manager.get("clearing_cache", "Clearing cache..."))
+
+        def clear_thread():
+            try:
+                freed = self.controller.clear_local_cache()
+                if self._is_window_valid():
+                    self.safe_after.schedule(0, self._on_cache_cleared, freed)
+            except Exception as e:
+                logger.error(f"خطأ في مسح الكاش: {e}")
+                if self._is_window_valid():
+                    self.safe_after.schedule(0, self._safe_status_update,
+                                             self.lang_manager.get("cache_clear_failed", "Failed to clear cache"), "error")
+
+        threading.Thread(target=clear_thread, daemon=True).start()
+
+    def _on_cache_cleared(self, freed: int):
+        """بعد مسح الكاش"""
+        msg = (f"{self.lang_manager.get('cache_cleared', 'Cache cleared successfully')} "
+               f"({self.lang_manager.get('freed', 'freed')} {freed / (1024 * 1024):.1f} MB)")
+        self._safe_status_update(msg, "success")
 
     @error_handler
     def _show_help(self):
@@ -1223,6 +1330,9 @@ class MainWindow(ctk.CTk):
                 'geometry': self.geometry() if not self._is_fullscreen else None,
                 'state': self.state() if hasattr(self, 'state') else None
             }
+            if self.window_state:
+                window_state['sort_column'] = self.window_state.sort_column
+                window_state['sort_order'] = self.window_state.sort_order
 
             if hasattr(self.controller, 'config_mgr'):
                 self.controller.config_mgr.set('main_window_state', window_state)